@@ -21,6 +21,7 @@ switch_model = define_AbstractModel(
     'switch_mod', 'project.no_commit', 'fuel_cost', 'sunk_costs')
 switch_instance = switch_model.load_inputs(inputs_dir="inputs")
 
+# This uses the default profile in solver_profiles.ini, if there is one.
 opt = switch_mod.utilities.default_solver()
 
 results = opt.solve(switch_instance, keepfiles=False, tee=False)
@@ -0,0 +1,144 @@
+"""
+
+Benchmark for selective dual import (utilities.register_duals()).
+
+This solves the same model twice, each time in a fresh process: once
+with a dual suffix for the whole model, so the solver plugin reads and
+stores the duals of every constraint, and once with only the duals of
+Energy_Balance registered, as Chile.exporting does. For each run it
+reports the time taken to solve and load the solution, the number of
+duals stored on the instance and the memory in use before and after
+the solve.
+
+Use --scale to repeat each timeseries of the inputs (see
+benchmark_instance_checkpoint.py); with inputs-chile-small, which has 48
+timepoints, --scale 183 gives a run with about 8760 timepoints. This
+needs a solver; only GLPK and CBC read the registered duals alone (with
+switch_mod.solution_reader). Other solvers read every dual and the
+unregistered ones are dropped after loading, so they save memory
+afterwards but not time or peak memory.
+
+With --synthetic, no solver is run: the problem is written to an LP
+file and a CBC solution file with made-up values for every row and
+column is read onto the instance with solution_reader, which measures
+the import of the solution alone.
+
+Usage (from the root of the repository):
+    python python_utility_scripts/benchmark_dual_import.py \\
+        --inputs-dir inputs-chile-small --scale 183 --solver cbc
+
+"""
+
+import argparse, multiprocessing, os, shutil, sys, tempfile, time
+
+from pyomo.environ import Suffix, Var
+from pyomo.opt import SolverResults
+
+import switch_mod.solve
+import switch_mod.utilities as utilities
+from switch_mod import solution_reader
+from benchmark_instance_checkpoint import scale_inputs
+
+
+def run(inputs_dir, solver, mode, queue):
+    (model, instance) = switch_mod.solve.load(inputs_dir, args=[])
+    del instance.dual_constraints[:]
+    if mode == 'model-wide':
+        if not hasattr(instance, 'dual'):
+            instance.dual = Suffix(direction=Suffix.IMPORT)
+    else:
+        utilities.register_duals(instance, 'Energy_Balance')
+    if solver is None:
+        read = synthetic_solution(instance)
+    else:
+        opt = utilities.make_solver({'solver': solver})
+        read = lambda: utilities.load_solution(
+            instance, switch_mod.solve.solve_instance(model, instance, opt))
+    (rss_before, peak) = utilities.memory_usage()
+    start = time.time()
+    read()
+    solve_time = time.time() - start
+    (rss_after, peak) = utilities.memory_usage()
+    queue.put((mode, solve_time, len(instance.dual), rss_before, rss_after,
+               peak))
+
+
+def synthetic_solution(instance):
+    """
+    Write instance to an LP file and a CBC solution file for it with
+    made-up values, and return a function that reads the solution onto
+    the instance.
+    """
+    temp_dir = tempfile.mkdtemp(prefix='switch_bench_')
+    (lp_path, smap_id) = instance.write(os.path.join(temp_dir, 'problem.lp'))
+    symbol_map = instance.solutions.symbol_map[smap_id]
+    soln_path = os.path.join(temp_dir, 'problem.soln')
+    with open(soln_path, 'w') as f:
+        f.write('Optimal - objective value 1.0\n')
+        rows = sorted(label for label in symbol_map.aliases
+                      if label[:2] in ('c_', 'r_'))
+        for (i, label) in enumerate(rows):
+            f.write('{} {} 0 {}\n'.format(i, label, i * 0.5))
+        cols = [symbol_map.byObject.get(id(v))
+                for v in instance.component_data_objects(Var)]
+        for (i, label) in enumerate(label for label in cols if label):
+            f.write('{} {} {} 0\n'.format(i, label, i * 0.5))
+
+    def read():
+        try:
+            duals = instance.dual_constraints or None
+            loader = solution_reader.SolutionLoader(
+                instance, symbol_map, duals=duals)
+            solution_reader.read_cbc_solution(
+                soln_path, SolverResults(), loader)
+            loader.finish()
+        finally:
+            shutil.rmtree(temp_dir)
+    return read
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Compare model-wide and selective dual import.')
+    parser.add_argument(
+        '--inputs-dir', type=str, default='inputs',
+        help='Directory containing input files (default is "inputs")')
+    parser.add_argument(
+        '--scale', type=int, default=1,
+        help='Number of times to repeat each timeseries (default is 1)')
+    parser.add_argument(
+        '--solver', type=str, default='glpk',
+        help='Linear program solver to use (default is "glpk")')
+    parser.add_argument(
+        '--synthetic', default=False, action='store_true',
+        help='Read a made-up CBC solution instead of solving')
+    args = parser.parse_args()
+    solver = None if args.synthetic else args.solver
+
+    temp_dir = tempfile.mkdtemp(prefix='switch_bench_')
+    try:
+        inputs_dir = args.inputs_dir
+        if args.scale > 1:
+            inputs_dir = os.path.join(temp_dir, 'inputs')
+            scale_inputs(args.inputs_dir, inputs_dir, args.scale)
+        print("{:<12} {:>10} {:>10} {:>12} {:>12} {:>10}".format(
+            'duals', 'solve (s)', 'stored', 'before (MB)', 'after (MB)',
+            'peak (MB)'))
+        for mode in ('model-wide', 'registered'):
+            # Each run gets its own process so peak memory is comparable.
+            queue = multiprocessing.Queue()
+            proc = multiprocessing.Process(
+                target=run, args=(inputs_dir, solver, mode, queue))
+            proc.start()
+            proc.join()
+            if proc.exitcode != 0:
+                sys.exit('The {} run failed.'.format(mode))
+            row = queue.get()
+            print("{:<12} {:>10.2f} {:>10,d} {:>12.1f} {:>12.1f} "
+                  "{:>10.1f}".format(*row))
+    finally:
+        shutil.rmtree(temp_dir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+"""
+
+Benchmark for instance checkpoints (switch_mod.solve --checkpoint).
+
+This loads an inputs directory, optionally scaled up by repeating every
+timeseries several times, and compares the time needed to construct the
+model instance from the inputs with the time needed to save it to a
+checkpoint and load it back. The LP files written from the constructed
+and the loaded instances are compared to check that they are identical.
+
+When --scale is greater than 1, a copy of the inputs is made in which
+each timeseries is repeated that many times, with new timepoints and
+ts_scale_to_period divided by the scale so the time weights still add
+up. Rows of any .tab file with a timepoint column are repeated for the
+new timepoints.
+
+Usage (from the root of the repository):
+    python python_utility_scripts/benchmark_instance_checkpoint.py \\
+        --inputs-dir inputs-chile-small --scale 10
+
+"""
+
+import argparse, csv, filecmp, os, shutil, sys, tempfile, time
+
+import switch_mod.utilities as utilities
+
+
+TIMEPOINT_COLUMNS = ('timepoint', 'timepoint_id')
+
+
+def scale_inputs(inputs_dir, scaled_dir, scale):
+    """Copy inputs_dir to scaled_dir, repeating each timeseries scale times."""
+    def read(name):
+        with open(os.path.join(inputs_dir, name), 'rb') as f:
+            rows = [row for row in csv.reader(f, delimiter='\t') if row]
+        return (rows[0], rows[1:])
+
+    def write(name, headers, rows):
+        with open(os.path.join(scaled_dir, name), 'wb') as f:
+            writer = csv.writer(f, dialect='ampl-tab')
+            writer.writerow(headers)
+            writer.writerows(rows)
+
+    def copy_name(value, i):
+        return value if i == 0 else '{}_{}'.format(value, i)
+
+    shutil.copytree(inputs_dir, scaled_dir)
+    (headers, rows) = read('timeseries.tab')
+    scale_col = headers.index('ts_scale_to_period')
+    new_rows = []
+    for i in range(scale):
+        for row in rows:
+            row = list(row)
+            row[0] = copy_name(row[0], i)
+            row[scale_col] = repr(float(row[scale_col]) / scale)
+            new_rows.append(row)
+    write('timeseries.tab', headers, new_rows)
+    for name in os.listdir(inputs_dir):
+        if not name.endswith('.tab') or name == 'timeseries.tab':
+            continue
+        (headers, rows) = read(name)
+        tp_cols = [c for (c, h) in enumerate(headers)
+                   if h.lower() in TIMEPOINT_COLUMNS]
+        if not tp_cols:
+            continue
+        ts_cols = [c for (c, h) in enumerate(headers) if h == 'timeseries']
+        new_rows = []
+        for i in range(scale):
+            for row in rows:
+                row = list(row)
+                for c in tp_cols + ts_cols:
+                    row[c] = copy_name(row[c], i)
+                new_rows.append(row)
+        write(name, headers, new_rows)
+
+
+def timed(label, func, *a, **kw):
+    start = time.time()
+    result = func(*a, **kw)
+    print("{:<32} {:8.2f}s".format(label, time.time() - start))
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Time instance construction against checkpoint loading.')
+    parser.add_argument(
+        '--inputs-dir', type=str, default='inputs',
+        help='Directory containing input files (default is "inputs")')
+    parser.add_argument(
+        '--scale', type=int, default=1,
+        help='Number of times to repeat each timeseries (default is 1)')
+    args = parser.parse_args()
+
+    temp_dir = tempfile.mkdtemp(prefix='switch_bench_')
+    try:
+        inputs_dir = args.inputs_dir
+        if args.scale > 1:
+            inputs_dir = os.path.join(temp_dir, 'inputs')
+            scale_inputs(args.inputs_dir, inputs_dir, args.scale)
+        with open(os.path.join(inputs_dir, 'modules')) as module_fh:
+            module_list = [line.rstrip('\n') for line in module_fh]
+        # Pass an empty argument list so the model doesn't parse this
+        # script's options.
+        model = utilities.define_AbstractModel(
+            'switch_mod', *module_list, args=[])
+        instance = timed('construct from inputs',
+                         model.load_inputs, inputs_dir=inputs_dir)
+        fingerprint = timed('fingerprint inputs', utilities.model_fingerprint,
+                            model, inputs_dir)
+        path = os.path.join(temp_dir, 'instance.pkl')
+        timed('save checkpoint', utilities.save_instance_checkpoint,
+              instance, path, fingerprint)
+        loaded = timed('load checkpoint', utilities.load_instance_checkpoint,
+                       model, path, fingerprint, inputs_dir)
+        print("Checkpoint size: {:,d} bytes".format(os.path.getsize(path)))
+        lp_paths = [os.path.join(temp_dir, name)
+                    for name in ('constructed.lp', 'loaded.lp')]
+        for (m, lp_path) in zip((instance, loaded), lp_paths):
+            m.write(lp_path, io_options={'symbolic_solver_labels': True})
+        if not filecmp.cmp(lp_paths[0], lp_paths[1], shallow=False):
+            sys.exit('The loaded instance does not match the constructed one.')
+        print("The loaded instance matches the constructed one.")
+    finally:
+        shutil.rmtree(temp_dir)
+
+
+if __name__ == '__main__':
+    main()
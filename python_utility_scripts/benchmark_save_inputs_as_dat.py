@@ -0,0 +1,92 @@
+"""
+
+Round-trip benchmark for switch_mod.utilities.save_inputs_as_dat().
+
+This mirrors tests/utilities_test.py: it loads an inputs directory, writes
+the complete inputs as .dat data in several modes, reloads each result
+into a DataPortal and checks that it matches the original data. Timings
+for the write and reload steps are printed for each mode.
+
+Usage (from the root of the repository):
+    python python_utility_scripts/benchmark_save_inputs_as_dat.py \\
+        --inputs-dir inputs-chile-small --workers 4
+
+"""
+
+import argparse, os, shutil, sys, tempfile, time, gzip
+
+from pyomo.environ import DataPortal
+from testfixtures import compare
+
+import switch_mod.utilities as utilities
+
+
+parser = argparse.ArgumentParser(
+    description='Time save_inputs_as_dat() write and reload in each mode.')
+parser.add_argument(
+    '--inputs-dir', type=str, default='inputs',
+    help='Directory containing input files (default is "inputs")')
+parser.add_argument(
+    '--workers', type=int, default=4,
+    help='Number of threads used for split output (default is 4)')
+args = parser.parse_args()
+
+start = time.time()
+with open(os.path.join(args.inputs_dir, 'modules')) as module_fh:
+    module_list = [line.rstrip('\n') for line in module_fh]
+# Pass an empty argument list so the model doesn't parse this script's options.
+model = utilities.define_AbstractModel('switch_mod', *module_list, args=[])
+instance = model.load_inputs(inputs_dir=args.inputs_dir)
+print("Loaded {} in {:.2f}s".format(args.inputs_dir, time.time() - start))
+
+modes = [
+    ('single file', 'complete_inputs.dat', {}),
+    ('single file, sorted', 'complete_inputs.dat',
+        {'determistic_order': True}),
+    ('single file, gzip', 'complete_inputs.dat.gz', {}),
+    ('split, {} workers'.format(args.workers), 'complete_inputs',
+        {'split_components': True, 'num_workers': args.workers}),
+    ('split, gzip, {} workers'.format(args.workers), 'complete_inputs.gz',
+        {'split_components': True, 'num_workers': args.workers}),
+]
+
+def normalize(data):
+    # Components without data aren't written, and sorted output may reorder
+    # the elements of unordered sets, so compare those as sorted lists.
+    return dict(
+        (name, dict((k, sorted(v) if isinstance(v, list) else v)
+                    for (k, v) in values.items())
+             if isinstance(values, dict) else values)
+        for (name, values) in data.items()
+        if not (isinstance(values, dict) and len(values) == 0))
+
+# Parameters stored densely are saved along with the data portal.
+expected_data = dict(instance.DataPortal.data())
+for (name, dense) in instance.DataPortal.dense_params.iteritems():
+    expected_data[name] = dict(dense.iteritems())
+
+temp_dir = tempfile.mkdtemp(prefix='switch_bench_')
+try:
+    for (label, file_name, kwargs) in modes:
+        save_path = os.path.join(temp_dir, label.replace(' ', '_').replace(',', ''), file_name)
+        os.makedirs(os.path.dirname(save_path))
+        start = time.time()
+        paths = utilities.save_inputs_as_dat(
+            model, instance, save_path=save_path, **kwargs)
+        write_time = time.time() - start
+        start = time.time()
+        reloaded_data = DataPortal(model=model)
+        for path in paths:
+            if path.endswith('.gz'):
+                with gzip.open(path, 'rb') as src:
+                    with open(path[:-len('.gz')], 'wb') as dst:
+                        shutil.copyfileobj(src, dst)
+                path = path[:-len('.gz')]
+            reloaded_data.load(filename=path)
+        reload_time = time.time() - start
+        compare(normalize(reloaded_data.data()), normalize(expected_data))
+        size = sum(os.path.getsize(p) for p in paths)
+        print("{:<28} write {:7.2f}s  reload {:7.2f}s  {:>12,d} bytes".format(
+            label, write_time, reload_time, size))
+finally:
+    shutil.rmtree(temp_dir)
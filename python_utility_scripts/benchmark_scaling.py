@@ -0,0 +1,114 @@
+"""
+
+Benchmark for problem scaling (switch_mod.scaling).
+
+For each example model, this reports the range of the constraint
+coefficients and objective coefficients before and after scaling and
+the time taken to compute the scaling factors. If the solver is
+available, it also solves each model with and without scaling, each
+time on a freshly constructed instance, and reports the solve times and
+the objective values, which should agree.
+
+Use --scale to repeat each timeseries of the inputs (see
+benchmark_instance_checkpoint.py) for timings on larger models.
+
+Usage (from the root of the repository):
+    python python_utility_scripts/benchmark_scaling.py --solver cbc \\
+        examples/3zone_toy/inputs examples/discrete_build/inputs
+
+"""
+
+import argparse, os, shutil, tempfile, time
+
+from pyomo.environ import Objective, value
+
+import switch_mod.solve
+import switch_mod.scaling
+import switch_mod.utilities as utilities
+from benchmark_instance_checkpoint import scale_inputs
+
+
+def ratio(coef_range):
+    (smallest, largest) = coef_range
+    return largest / smallest if largest > 0 else 1.0
+
+
+def objective_range(problem, scaled):
+    (cols, coefs) = problem.obj_row
+    mags = [
+        abs(a) * (problem.col_scale[j] * problem.obj_scale if scaled else 1)
+        for (j, a) in zip(cols, coefs) if a != 0]
+    return (min(mags), max(mags)) if mags else (1.0, 1.0)
+
+
+def solve_time(inputs_dir, opt, scaled):
+    (model, instance) = switch_mod.solve.load(inputs_dir, args=[])
+    start = time.time()
+    if scaled:
+        results = switch_mod.scaling.solve(
+            opt, instance, keepfiles=False, tee=False)
+    else:
+        results = opt.solve(instance, keepfiles=False, tee=False)
+    elapsed = time.time() - start
+    utilities.load_solution(instance, results)
+    obj = next(instance.component_data_objects(Objective, active=True))
+    return (elapsed, value(obj), results.solver.termination_condition)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Compare scaled and unscaled problems.')
+    parser.add_argument(
+        'inputs_dirs', nargs='+', metavar='INPUTS_DIR',
+        help='Directories containing input files')
+    parser.add_argument(
+        '--scale', type=int, default=1,
+        help='Number of times to repeat each timeseries (default is 1)')
+    parser.add_argument(
+        '--solver', type=str, default='glpk',
+        help='Solver to use, GLPK or CBC (default is "glpk")')
+    args = parser.parse_args()
+    opt = utilities.make_solver({'solver': args.solver})
+    can_solve = opt.available(exception_flag=False)
+    if not can_solve:
+        print("{} is not available; only the coefficients are compared.\n"
+              .format(args.solver))
+
+    temp_dir = tempfile.mkdtemp(prefix='switch_bench_')
+    try:
+        for inputs_dir in args.inputs_dirs:
+            if args.scale > 1:
+                scaled_dir = os.path.join(
+                    temp_dir, str(args.inputs_dirs.index(inputs_dir)))
+                scale_inputs(inputs_dir, scaled_dir, args.scale)
+                inputs_dir = scaled_dir
+            (model, instance) = switch_mod.solve.load(inputs_dir, args=[])
+            start = time.time()
+            problem = switch_mod.scaling.ScaledProblem(instance)
+            scaling_time = time.time() - start
+            print("{}: {:,d} rows, {:,d} columns, scaling factors in "
+                  "{:.2f} s".format(
+                      inputs_dir, len(problem.rows), len(problem.variables),
+                      scaling_time))
+            print("  {:<12} {:>22} {:>22}".format(
+                '', 'constraint max/min', 'objective max/min'))
+            for scaled in (False, True):
+                print("  {:<12} {:>22.3g} {:>22.3g}".format(
+                    'scaled' if scaled else 'unscaled',
+                    ratio(problem.coefficient_range(scaled)),
+                    ratio(objective_range(problem, scaled))))
+            if can_solve:
+                for scaled in (False, True):
+                    (elapsed, obj, status) = solve_time(
+                        inputs_dir, opt, scaled)
+                    print("  solve {:<10} {:>8.2f} s   objective {:.6g} "
+                          "({})".format(
+                              'scaled' if scaled else 'unscaled', elapsed,
+                              obj, status))
+            print("")
+    finally:
+        shutil.rmtree(temp_dir)
+
+
+if __name__ == '__main__':
+    main()
@@ -10,11 +10,11 @@ This tables are mostly useful for quick iterations when testing code.
 import os, time, sys
 from pyomo.environ import *
 from switch_mod.financials import *
+from switch_mod.utilities import register_duals
 
 def define_components(mod):
-    #Define dual variables, so that marginal costs can be computed eventually
-    if not hasattr(mod, 'dual'):
-        mod.dual = Suffix(direction=Suffix.IMPORT)
+    #Import the duals of the energy balance, so that marginal costs can be computed eventually
+    register_duals(mod, 'Energy_Balance')
 
     #Separate the computation of Investment and Operations cost, for comparison with stochastic problem
     import switch_mod.financials as fin
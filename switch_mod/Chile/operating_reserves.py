@@ -15,6 +15,7 @@ SYNOPSIS
 """
 import os
 from pyomo.environ import *
+from switch_mod.project.unitcommit.fuel_use import proj_fuel_use_segment
 
 
 def define_components(mod):
@@ -59,11 +60,11 @@ def define_components(mod):
         mod.DISPATCHABLE_PROJ_DISPATCH_POINTS,
         within=NonNegativeReals)
     
-    mod.DISPATCHABLE_PROJ_DISP_FUEL_PIECEWISE_CONS_SET = Set(
-        dimen=4,
-        initialize=mod.PROJ_DISP_FUEL_PIECEWISE_CONS_SET,
-        filter=lambda m, proj, t, intercept, incremental_heat_rate: (
-            (proj, t) in mod.DISPATCHABLE_PROJ_DISPATCH_POINTS))
+    mod.DISPATCHABLE_PROJ_WITH_FUEL_DISPATCH_POINTS = Set(
+        dimen=2,
+        initialize=mod.PROJ_WITH_FUEL_DISPATCH_POINTS,
+        filter=lambda m, proj, t: (
+            (proj, t) in m.DISPATCHABLE_PROJ_DISPATCH_POINTS))
     
     mod.ProjSpinningResFuelUseRate = Var(
         mod.PROJ_FUEL_DISPATCH_POINTS,
@@ -168,10 +169,16 @@ def define_components(mod):
             )
     )
     
-    mod.ProjSpinningResFuelUseRate_Calculate = Constraint(
-        mod.DISPATCHABLE_PROJ_DISP_FUEL_PIECEWISE_CONS_SET,
-        rule=lambda m, proj, t, intercept, incremental_heat_rate: (
+    def ProjSpinningResFuelUseRate_Calculate_rule(m, proj, t, n):
+        if n > m.proj_fuel_use_segment_count[proj]:
+            return Constraint.Skip
+        (intercept, incremental_heat_rate) = proj_fuel_use_segment(m, proj, n)
+        return (
             sum(m.ProjSpinningResFuelUseRate[proj, t, f] 
-                for f in m.G_FUELS[m.proj_gen_tech[pr]]) >=
-            incremental_heat_rate * m.SpinningReserveProj[proj, t]))
+                for f in m.G_FUELS[m.proj_gen_tech[proj]]) >=
+            incremental_heat_rate * m.SpinningReserveProj[proj, t])
+    mod.ProjSpinningResFuelUseRate_Calculate = Constraint(
+        mod.DISPATCHABLE_PROJ_WITH_FUEL_DISPATCH_POINTS,
+        mod.FUEL_USE_SEGMENT_NUMBERS,
+        rule=ProjSpinningResFuelUseRate_Calculate_rule)
     
\ No newline at end of file
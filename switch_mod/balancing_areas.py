@@ -110,7 +110,7 @@ def load_inputs(mod, switch_data, inputs_dir):
         select=('LOAD_ZONE', 'balancing_area'),
         param=(mod.lz_balancing_area))
     path = os.path.join(inputs_dir, 'balancing_areas.tab')
-    if os.path.isfile(path):
+    if switch_data.input_exists(path):
         # Load balancing area data from a file if it exists.
         switch_data.load(
             filename=path,
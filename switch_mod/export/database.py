@@ -0,0 +1,183 @@
+# Copyright 2016 The Switch Authors. All rights reserved.
+# Licensed under the Apache License, Version 2, which is in the LICENSE file.
+
+"""
+Save the solution of a model instance to a relational database in bulk.
+
+Each variable is written to a table of the same name, with one column
+per index (named like the columns of the .tab files written by
+save_results(), e.g., PROJ_BUILDYEARS_1), a value column named after the
+variable and a scenario_id column. If the instance has a dual suffix,
+the duals of each constraint are written to a table named dual_<name>
+with the same layout. A summary table holds the objective values, the
+annual cost of each cost component in each period and the discounted
+total cost of each period (SystemCostPerPeriod).
+Tables are created if they don't exist yet.
+
+All rows for a scenario are written in a single transaction, after the
+rows previously saved for that scenario are deleted, so re-running a
+scenario replaces its results. Rows are inserted batch_size at a time
+with executemany(), or with COPY when the connection comes from
+psycopg2. SQLite is the default local target; see
+switch_mod.solve --results-db.
+
+SYNOPSIS
+>>> import sqlite3
+>>> import switch_mod.utilities as utilities
+>>> from switch_mod.export.database import save_results_to_db
+>>> model = utilities.define_AbstractModel(
+...     'timescales', 'financials', 'load_zones', 'local_td', args=[])
+>>> instance = model.load_inputs(inputs_dir='test_dat')
+>>> for k in instance.BuildLocalTD:
+...     instance.BuildLocalTD[k].value = 10.0
+>>> con = sqlite3.connect(':memory:')
+>>> save_results_to_db(instance, con, scenario_id=7)
+>>> con.execute('SELECT COUNT(*), SUM(BuildLocalTD), MIN(scenario_id) '
+...     'FROM BuildLocalTD').fetchone()
+(9, 90.0, 7)
+>>> con.execute('SELECT COUNT(*) FROM summary WHERE name = ?',
+...     ('SystemCostPerPeriod',)).fetchone()
+(2,)
+
+"""
+import cStringIO
+
+from pyomo.environ import Objective, Var, value
+
+from switch_mod.utilities import constraint_components, make_iterable
+
+
+def save_results_to_db(instance, connection, scenario_id, placeholder='?',
+                       batch_size=10000):
+    """
+    Write all variable values, duals and cost summaries of a solved
+    instance to the database behind connection, tagged with scenario_id.
+    placeholder is the parameter marker used by the database driver ('?'
+    for sqlite3, '%s' for psycopg2).
+    """
+    cur = connection.cursor()
+    try:
+        for var in instance.component_objects(Var):
+            _write_component(
+                cur, placeholder, batch_size, scenario_id,
+                var.name, var, var.name,
+                ((k, v.value) for (k, v) in var.iteritems()))
+        if hasattr(instance, 'dual'):
+            for con in constraint_components(instance):
+                rows = [(k, instance.dual.get(c))
+                        for (k, c) in con.iteritems()]
+                if any(d is not None for (k, d) in rows):
+                    _write_component(
+                        cur, placeholder, batch_size, scenario_id,
+                        'dual_' + con.name, con, 'dual', rows)
+        _create_table(cur, 'summary', [
+            ('scenario_id', 'INTEGER'), ('name', 'TEXT'),
+            ('period', 'INTEGER'), ('value', 'DOUBLE PRECISION')])
+        _delete_scenario(cur, placeholder, 'summary', scenario_id)
+        _insert_rows(
+            cur, placeholder, batch_size, 'summary',
+            ['scenario_id', 'name', 'period', 'value'],
+            ((scenario_id,) + row for row in _summary_rows(instance)))
+        connection.commit()
+    except:
+        connection.rollback()
+        raise
+    finally:
+        cur.close()
+
+
+def _summary_rows(instance):
+    """
+    Yield (name, period, value) rows with the objective values and, if
+    the financials module is loaded, the annual cost of each cost
+    component and the discounted total cost in each period. Hourly cost
+    components are weighted by tp_weight_in_year, as in
+    SystemCostPerPeriod.
+    """
+    for obj in instance.component_objects(Objective):
+        yield (obj.name, None, value(obj, exception=False))
+    if not hasattr(instance, 'SystemCostPerPeriod'):
+        return
+    for p in instance.PERIODS:
+        for name in instance.cost_components_annual:
+            yield (name, p, value(
+                getattr(instance, name)[p], exception=False))
+        for name in instance.cost_components_tp:
+            component = getattr(instance, name)
+            yield (name, p, value(
+                sum(component[t] * instance.tp_weight_in_year[t]
+                    for t in instance.PERIOD_TPS[p]),
+                exception=False))
+        yield ('SystemCostPerPeriod', p, value(
+            instance.SystemCostPerPeriod[p], exception=False))
+
+
+def _write_component(cur, placeholder, batch_size, scenario_id,
+                     table, component, value_column, rows):
+    """
+    Replace the rows of one component for this scenario. rows yields
+    (index, value) pairs.
+    """
+    index_set = component.index_set()
+    index_name = index_set.name
+    dimen = index_set.dimen
+    index_columns = ['%s_%d' % (index_name, i + 1) for i in xrange(dimen)]
+    first_key = next(iter(component.keys()), None)
+    index_types = [_sql_type(k) for k in make_iterable(first_key)][:dimen]
+    index_types += ['TEXT'] * (dimen - len(index_types))
+    _create_table(
+        cur, table,
+        [('scenario_id', 'INTEGER')] + zip(index_columns, index_types) +
+        [(value_column, 'DOUBLE PRECISION')])
+    _delete_scenario(cur, placeholder, table, scenario_id)
+    _insert_rows(
+        cur, placeholder, batch_size, table,
+        ['scenario_id'] + index_columns + [value_column],
+        ((scenario_id,) + tuple(make_iterable(k))[:dimen] + (v,)
+         for (k, v) in rows))
+
+
+def _sql_type(val):
+    if isinstance(val, (int, long)):
+        return 'INTEGER'
+    if isinstance(val, float):
+        return 'DOUBLE PRECISION'
+    return 'TEXT'
+
+
+def _create_table(cur, table, columns):
+    cur.execute('CREATE TABLE IF NOT EXISTS {} ({})'.format(
+        table, ', '.join('{} {}'.format(c, t) for (c, t) in columns)))
+
+
+def _delete_scenario(cur, placeholder, table, scenario_id):
+    cur.execute(
+        'DELETE FROM {} WHERE scenario_id = {}'.format(table, placeholder),
+        (scenario_id,))
+
+
+def _insert_rows(cur, placeholder, batch_size, table, columns, rows):
+    """Insert rows in batches, using COPY if the driver supports it."""
+    sql = 'INSERT INTO {} ({}) VALUES ({})'.format(
+        table, ', '.join(columns), ', '.join([placeholder] * len(columns)))
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            _insert_batch(cur, sql, table, columns, batch)
+            batch = []
+    if batch:
+        _insert_batch(cur, sql, table, columns, batch)
+
+
+def _insert_batch(cur, sql, table, columns, batch):
+    if hasattr(cur, 'copy_from'):
+        buf = cStringIO.StringIO()
+        for row in batch:
+            buf.write('\t'.join(
+                '\\N' if v is None else repr(v) if isinstance(v, float)
+                else str(v) for v in row) + '\n')
+        buf.seek(0)
+        cur.copy_from(buf, table, columns=columns)
+    else:
+        cur.executemany(sql, batch)
@@ -15,7 +15,6 @@ SYNOPSIS
 """
 
 import os
-import csv
 from pyomo.environ import *
 
 
@@ -373,7 +372,7 @@ def load_inputs(mod, switch_data, inputs_dir):
         set=mod.LZ_RFM)
     # Load load zone fuel cost adder data if the file is available.
     path = os.path.join(inputs_dir, 'lz_fuel_cost_diff.tab')
-    if os.path.isfile(path):
+    if switch_data.input_exists(path):
         switch_data.load(
             filename=path,
             select=('load_zone', 'fuel', 'period', 'fuel_cost_adder'),
@@ -383,68 +382,67 @@ def load_inputs(mod, switch_data, inputs_dir):
     # actual loading, error checking, and casting into a supply curve is
     # slightly complicated, so I moved that logic to a separate function.
     path = os.path.join(inputs_dir, 'fuel_cost.tab')
-    if os.path.isfile(path):
+    if switch_data.input_exists(path):
         _load_simple_cost_data(mod, switch_data, path)
 
 
 def _load_simple_cost_data(mod, switch_data, path):
-    with open(path, 'rb') as simple_cost_file:
-        simple_cost_dat = list(csv.DictReader(simple_cost_file, delimiter='	'))
-        # Scan once for error checking
-        for row in simple_cost_dat:
-            lz = row['load_zone']
-            f = row['fuel']
-            p = int(row['period'])
-            f_cost = float(row['fuel_cost'])
-            # Basic data validity checks
-            if lz not in switch_data.data(name='LOAD_ZONES'):
+    simple_cost_dat = switch_data.read_input_rows(path)
+    # Scan once for error checking
+    for row in simple_cost_dat:
+        lz = row['load_zone']
+        f = row['fuel']
+        p = int(row['period'])
+        f_cost = float(row['fuel_cost'])
+        # Basic data validity checks
+        if lz not in switch_data.data(name='LOAD_ZONES'):
+            raise ValueError(
+                "Load zone " + lz + " in lz_simple_fuel_cost.tab is not " +
+                "a known load zone from load_zones.tab.")
+        if f not in switch_data.data(name='FUELS'):
+            raise ValueError(
+                "Fuel " + f + " in lz_simple_fuel_cost.tab is not " +
+                "a known fuel from fuels.tab.")
+        if p not in switch_data.data(name='PERIODS'):
+            raise ValueError(
+                "Period " + p + " in lz_simple_fuel_cost.tab is not " +
+                "a known investment period.")
+        # Make sure they aren't overriding a supply curve or
+        # regional fuel market defined in previous files.
+        for (z, rfm) in switch_data.data(name='LZ_RFM'):
+            if(z == lz and
+               switch_data.data(name='rfm_fuel')[rfm] == f):
                 raise ValueError(
-                    "Load zone " + lz + " in lz_simple_fuel_cost.tab is not " +
-                    "a known load zone from load_zones.tab.")
-            if f not in switch_data.data(name='FUELS'):
-                raise ValueError(
-                    "Fuel " + f + " in lz_simple_fuel_cost.tab is not " +
-                    "a known fuel from fuels.tab.")
-            if p not in switch_data.data(name='PERIODS'):
-                raise ValueError(
-                    "Period " + p + " in lz_simple_fuel_cost.tab is not " +
-                    "a known investment period.")
-            # Make sure they aren't overriding a supply curve or
-            # regional fuel market defined in previous files.
-            for (z, rfm) in switch_data.data(name='LZ_RFM'):
-                if(z == lz and
-                   switch_data.data(name='rfm_fuel')[rfm] == f):
-                    raise ValueError(
-                        "The supply for fuel '" + f + "' for load_zone '" + lz +
-                        "' was already registered with the regional fuel " +
-                        "market '" + rfm + "', so you cannot " +
-                        "specify a simple fuel cost for it in " +
-                        "lz_simple_fuel_cost.tab. You either need to delete " +
-                        "that entry from lz_to_regional_fuel_market.tab, or " +
-                        "remove those entries in lz_simple_fuel_cost.tab.")
-            # Make a new single-load zone regional fuel market.
-            rfm = lz + "_" + f
-            if rfm in switch_data.data(name='REGIONAL_FUEL_MARKET'):
-                raise ValueError(
-                    "Trying to construct a simple Regional Fuel Market " +
-                    "called " + rfm + " from data in lz_simple_fuel_cost.tab" +
-                    ", but an RFM of that name already exists. Bailing out!")
-        # Scan again and actually import the data
-        for row in simple_cost_dat:
-            lz = row['load_zone']
-            f = row['fuel']
-            p = int(row['period'])
-            f_cost = float(row['fuel_cost'])
-            # Make a new single-load zone regional fuel market unless we
-            # already defined one in this loop for a different period.
-            rfm = lz + "_" + f
-            if(rfm not in switch_data.data(name='REGIONAL_FUEL_MARKET')):
-                switch_data.data(name='REGIONAL_FUEL_MARKET').append(rfm)
-                switch_data.data(name='rfm_fuel')[rfm] = f
-                switch_data.data(name='LZ_RFM').append((lz, rfm))
-            # Make a single supply tier for this RFM and period
-            st = 0
-            switch_data.data(name='RFM_SUPPLY_TIERS').append((rfm, p, st))
-            switch_data.data(name='rfm_supply_tier_cost')[rfm, p, st] = f_cost
-            switch_data.data(name='rfm_supply_tier_limit')[rfm, p, st] = \
-                float('inf')
+                    "The supply for fuel '" + f + "' for load_zone '" + lz +
+                    "' was already registered with the regional fuel " +
+                    "market '" + rfm + "', so you cannot " +
+                    "specify a simple fuel cost for it in " +
+                    "lz_simple_fuel_cost.tab. You either need to delete " +
+                    "that entry from lz_to_regional_fuel_market.tab, or " +
+                    "remove those entries in lz_simple_fuel_cost.tab.")
+        # Make a new single-load zone regional fuel market.
+        rfm = lz + "_" + f
+        if rfm in switch_data.data(name='REGIONAL_FUEL_MARKET'):
+            raise ValueError(
+                "Trying to construct a simple Regional Fuel Market " +
+                "called " + rfm + " from data in lz_simple_fuel_cost.tab" +
+                ", but an RFM of that name already exists. Bailing out!")
+    # Scan again and actually import the data
+    for row in simple_cost_dat:
+        lz = row['load_zone']
+        f = row['fuel']
+        p = int(row['period'])
+        f_cost = float(row['fuel_cost'])
+        # Make a new single-load zone regional fuel market unless we
+        # already defined one in this loop for a different period.
+        rfm = lz + "_" + f
+        if(rfm not in switch_data.data(name='REGIONAL_FUEL_MARKET')):
+            switch_data.data(name='REGIONAL_FUEL_MARKET').append(rfm)
+            switch_data.data(name='rfm_fuel')[rfm] = f
+            switch_data.data(name='LZ_RFM').append((lz, rfm))
+        # Make a single supply tier for this RFM and period
+        st = 0
+        switch_data.data(name='RFM_SUPPLY_TIERS').append((rfm, p, st))
+        switch_data.data(name='rfm_supply_tier_cost')[rfm, p, st] = f_cost
+        switch_data.data(name='rfm_supply_tier_limit')[rfm, p, st] = \
+            float('inf')
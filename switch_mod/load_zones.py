@@ -157,10 +157,13 @@ def load_inputs(mod, switch_data, inputs_dir):
         index=mod.LOAD_ZONES,
         param=(mod.lz_cost_multipliers, mod.lz_ccs_distance_km,
                mod.lz_dbid))
-    switch_data.load_aug(
+    # Demand is stored densely by load zone and timepoint to keep hourly
+    # datasets small in memory.
+    switch_data.load_dense(
         filename=os.path.join(inputs_dir, 'loads.tab'),
-        auto_select=True,
-        param=(mod.lz_demand_mw))
+        select=('LOAD_ZONE', 'TIMEPOINT', 'lz_demand_mw'),
+        param=mod.lz_demand_mw,
+        columns=mod.TIMEPOINTS)
 
 
 def save_results(model, instance, outdir):
@@ -70,10 +70,12 @@ def define_components(mod):
     based on ReEDS Solar Vision documentation:
     http://www1.eere.energy.gov/solar/pdfs/svs_appendix_a_model_descriptions_data.pdf
 
-    distribution_losses[lz, t] is a derived parameter describing the
+    distribution_losses[lz, t] is a derived expression describing the
     energy that is lost in the distribution network in each timepoint
     while delivering energy to load. For the moment, this equals
-    load[lz, t] multiplied by distribution_loss_rate.
+    load[lz, t] multiplied by distribution_loss_rate. It is an expression
+    rather than a parameter so that it follows lz_demand_mw when that is
+    declared mutable and updated between solves.
 
     Meet_Local_TD[lz, period] is a constraint that enforces minimal
     local T&D requirements. Demand response may specify a more complex
@@ -143,7 +145,7 @@ def define_components(mod):
         mod.LOAD_ZONES, mod.PERIODS,
         within=NonNegativeReals,
         default=lambda m, lz, p: max(
-            m.lz_demand_mw[lz, t] for t in m.PERIOD_TPS[p]))
+            value(m.lz_demand_mw[lz, t]) for t in m.PERIOD_TPS[p]))
     mod.min_data_check('existing_local_td')
     mod.LOCAL_TD_BUILD_YEARS = Set(
         dimen=2,
@@ -173,9 +175,9 @@ def define_components(mod):
             for (lz2, bld_yr) in m.LOCAL_TD_BUILD_YEARS
             if lz2 == lz and (bld_yr == 'Legacy' or bld_yr <= period)))
     mod.distribution_loss_rate = Param(default=0.053)
-    mod.distribution_losses = Param(
+    mod.distribution_losses = Expression(
         mod.LOAD_ZONES, mod.TIMEPOINTS,
-        initialize=lambda m, lz, t: (
+        rule=lambda m, lz, t: (
             m.lz_demand_mw[lz, t] * m.distribution_loss_rate))
     mod.LZ_Energy_Components_Consume.append('distribution_losses')
     mod.Meet_Local_TD = Constraint(
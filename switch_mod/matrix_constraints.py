@@ -0,0 +1,315 @@
+# Copyright 2016 The Switch Authors. All rights reserved.
+# Licensed under the Apache License, Version 2, which is in the LICENSE file.
+
+"""
+Experimental: generate the constraint families that repeat for every
+timepoint directly as sparse coefficient arrays instead of Pyomo
+constraint objects.
+
+Energy_Balance, Maximum_DispatchTrans, and the Enforce_Dispatch_Upper_Limit
+and ProjFuelUseRate_Calculate constraints of project.no_commit have one
+row per timepoint (times load zones, lines or projects), and building a
+Pyomo expression and constraint object for each row, and then a
+canonical representation of each one when the problem is written, is
+most of the time it takes to construct and write large models. With the
+--matrix-constraints option, these constraints are not constructed.
+Instead, each one is replaced on the instance by a MatrixConstraint that
+holds its index and builds its rows in compressed sparse row (CSR)
+arrays when the problem is written, from the model's parameters and the
+linear form of the capacity expressions that the rows share, which is
+computed once per project or line and period. Constraint families
+defined by other modules (e.g., the Enforce_Dispatch_Upper_Limit of
+project.unitcommit) are left alone.
+
+The rows are written to the LP file by switch_mod.scaling.ScaledProblem,
+so an instance with matrix constraints can only be solved with GLPK or
+CBC, through switch_mod.solve or scaling.solve(). Variable values are
+loaded onto the model's variables as usual, and duals of the rows are
+stored in the dual suffix under the objects that
+instance.Energy_Balance[lz, t] etc. return, so export code can look them
+up the same way as for Pyomo constraints.
+
+"""
+import array
+
+from pyomo.environ import Constraint, value
+from pyomo.repn import canonical_is_nonlinear, generate_canonical_repn
+
+
+def replace_constraints(model):
+    """
+    Keep the constraint families listed in FAMILIES that model defines
+    from being constructed, and list their names in
+    model.matrix_constraints. attach() replaces them on the instance
+    after construction.
+    """
+    model.matrix_constraints = []
+    for (name, module_name, builder) in FAMILIES:
+        component = getattr(model, name, None)
+        if not isinstance(component, Constraint):
+            continue
+        if getattr(component.rule, '__module__', None) != module_name:
+            continue
+        component.rule = _skip_row
+        model.matrix_constraints.append(name)
+
+
+def attach(instance):
+    """
+    Replace the empty constraints named in instance.matrix_constraints
+    with MatrixConstraint objects that have the same index.
+    """
+    builders = dict((name, builder) for (name, module_name, builder)
+                    in FAMILIES)
+    for name in instance.matrix_constraints:
+        component = getattr(instance, name)
+        if not isinstance(component, Constraint):
+            continue
+        index_set = component.index_set()
+        instance.del_component(name)
+        setattr(instance, name, MatrixConstraint(
+            instance, name, index_set, builders[name]))
+
+
+def _skip_row(m, *index):
+    return Constraint.Skip
+
+
+class MatrixConstraint(object):
+    """
+    A family of linear constraints stored as sparse arrays rather than
+    Pyomo objects. It can be indexed like the constraint it replaces;
+    the objects it returns identify rows in the dual suffix.
+    """
+
+    def __init__(self, instance, name, index_set, builder):
+        self.instance = instance
+        self.name = name
+        self._index_set = index_set
+        self.index = list(index_set)
+        self.builder = builder
+        self._rows = {}
+        self._position = None
+
+    def __len__(self):
+        return len(self.index)
+
+    def __iter__(self):
+        return iter(self.index)
+
+    def __contains__(self, key):
+        return key in self.index_position()
+
+    def __getitem__(self, key):
+        row = self._rows.get(key)
+        if row is None:
+            if key not in self.index_position():
+                raise KeyError(
+                    "Index '{}' is not valid for matrix constraint {}".format(
+                        key, self.name))
+            row = self._rows[key] = _MatrixRow(self, key)
+        return row
+
+    def keys(self):
+        return list(self.index)
+
+    def index_set(self):
+        return self._index_set
+
+    def itervalues(self):
+        return (self[key] for key in self.index)
+
+    def iteritems(self):
+        return ((key, self[key]) for key in self.index)
+
+    def index_position(self):
+        if self._position is None:
+            self._position = dict(
+                (key, i) for (i, key) in enumerate(self.index))
+        return self._position
+
+    def matrix(self):
+        """
+        Build the rows from the current values of the model's
+        parameters and return a SparseRows object. Row i is the row for
+        self.index[i].
+        """
+        rows = SparseRows()
+        self.builder(self.instance, self.index, rows)
+        return rows
+
+
+class _MatrixRow(object):
+    """The row of a MatrixConstraint for one index."""
+    __slots__ = ('_parent', '_index', '__weakref__')
+
+    def __init__(self, parent, index):
+        self._parent = parent
+        self._index = index
+
+    def parent_component(self):
+        return self._parent
+
+    def index(self):
+        return self._index
+
+    def cname(self, fully_qualified=False):
+        return '{}[{}]'.format(self._parent.name, self._index)
+
+
+class SparseRows(object):
+    """
+    Rows of linear constraints lower <= sum(coef * var) <= upper in CSR
+    form: the nonzeros of row i are at positions indptr[i] to
+    indptr[i + 1] of cols and coefs, and cols refer to the variables in
+    self.variables. Missing bounds are infinite.
+    """
+
+    def __init__(self):
+        self.variables = []
+        self.indptr = array.array('l', [0])
+        self.cols = array.array('l')
+        self.coefs = array.array('d')
+        self.lower = array.array('d')
+        self.upper = array.array('d')
+        self._col = {}
+        self._fixed = []
+
+    def column(self, var):
+        j = self._col.get(id(var))
+        if j is None:
+            j = self._col[id(var)] = len(self.variables)
+            self.variables.append(var)
+            self._fixed.append(var.fixed)
+        return j
+
+    def linear(self, expr):
+        """
+        Return the linear form of a Pyomo expression, variable or
+        parameter as a list of (column, coefficient) pairs and a
+        constant.
+        """
+        if isinstance(expr, (int, long, float)):
+            return ([], float(expr))
+        repn = generate_canonical_repn(expr)
+        if canonical_is_nonlinear(repn):
+            raise ValueError(
+                "Matrix constraints can only hold linear terms.")
+        terms = []
+        if repn.linear is not None:
+            terms = [
+                (self.column(var), float(a))
+                for (var, a) in zip(repn.variables, repn.linear)]
+        return (terms, float(repn.constant or 0.0))
+
+    def add_row(self, terms, lower, upper):
+        """
+        Add a row with the (column, coefficient) pairs in terms, adding
+        up the coefficients of columns that appear more than once and
+        moving fixed variables to the bounds.
+        """
+        coefs = {}
+        fixed = self._fixed
+        for (j, a) in terms:
+            if fixed[j]:
+                val = self.variables[j].value
+                lower -= a * val
+                upper -= a * val
+            else:
+                coefs[j] = coefs.get(j, 0.0) + a
+        for (j, a) in coefs.iteritems():
+            if a != 0:
+                self.cols.append(j)
+                self.coefs.append(a)
+        self.indptr.append(len(self.cols))
+        self.lower.append(lower)
+        self.upper.append(upper)
+
+    def row(self, i):
+        """Return the columns and coefficients of row i."""
+        (start, end) = (self.indptr[i], self.indptr[i + 1])
+        return (self.cols[start:end], self.coefs[start:end])
+
+
+_INF = float('inf')
+
+
+def _energy_balance(m, index, rows):
+    # Production minus consumption == 0 (see load_zones).
+    components = (
+        [(getattr(m, c), 1.0) for c in m.LZ_Energy_Components_Produce] +
+        [(getattr(m, c), -1.0) for c in m.LZ_Energy_Components_Consume])
+    for (lz, t) in index:
+        terms = []
+        constant = 0.0
+        for (component, sign) in components:
+            (linear, c) = rows.linear(component[lz, t])
+            terms.extend((j, sign * a) for (j, a) in linear)
+            constant += sign * c
+        rows.add_row(terms, -constant, -constant)
+
+
+def _maximum_dispatch_trans(m, index, rows):
+    # DispatchTrans <= TransCapacityAvailable (see trans_dispatch).
+    period = dict(m.tp_period.iteritems())
+    capacity = {}
+    for (lz_from, lz_to, t) in index:
+        key = (m.trans_d_line[lz_from, lz_to], period[t])
+        if key not in capacity:
+            capacity[key] = rows.linear(m.TransCapacityAvailable[key])
+        (cap_terms, c) = capacity[key]
+        terms = [(rows.column(m.DispatchTrans[lz_from, lz_to, t]), 1.0)]
+        terms.extend((j, -a) for (j, a) in cap_terms)
+        rows.add_row(terms, -_INF, c)
+
+
+def _enforce_dispatch_upper_limit(m, index, rows):
+    # DispatchProj <= DispatchUpperLimit (see project.no_commit), where
+    # the limit is the project's capacity in the period times its
+    # availability and, for variable projects, its capacity factor.
+    period = dict(m.tp_period.iteritems())
+    variable = set(m.VARIABLE_PROJECTS)
+    availability = {}
+    capacity = {}
+    for (proj, t) in index:
+        if proj not in availability:
+            availability[proj] = value(m.proj_availability[proj])
+        factor = availability[proj]
+        if proj in variable:
+            factor *= value(m.proj_max_capacity_factor[proj, t])
+        key = (proj, period[t])
+        if key not in capacity:
+            capacity[key] = rows.linear(m.ProjCapacity[key])
+        (cap_terms, c) = capacity[key]
+        terms = [(rows.column(m.DispatchProj[proj, t]), 1.0)]
+        terms.extend((j, -factor * a) for (j, a) in cap_terms)
+        rows.add_row(terms, -_INF, factor * c)
+
+
+def _proj_fuel_use_rate_calculate(m, index, rows):
+    # Fuel use of all fuels == dispatch * heat rate (see
+    # project.no_commit).
+    fuels = {}
+    heat_rate = {}
+    for (proj, t) in index:
+        if proj not in fuels:
+            fuels[proj] = list(m.G_FUELS[m.proj_gen_tech[proj]])
+            heat_rate[proj] = value(m.proj_full_load_heat_rate[proj])
+        terms = [
+            (rows.column(m.ProjFuelUseRate[proj, t, f]), 1.0)
+            for f in fuels[proj]]
+        terms.append((rows.column(m.DispatchProj[proj, t]), -heat_rate[proj]))
+        rows.add_row(terms, 0.0, 0.0)
+
+
+# Constraint families that can be generated as matrices, with the
+# modules whose definitions the builders reproduce.
+FAMILIES = [
+    ('Energy_Balance', 'switch_mod.load_zones', _energy_balance),
+    ('Maximum_DispatchTrans', 'switch_mod.trans_dispatch',
+     _maximum_dispatch_trans),
+    ('Enforce_Dispatch_Upper_Limit', 'switch_mod.project.no_commit',
+     _enforce_dispatch_upper_limit),
+    ('ProjFuelUseRate_Calculate', 'switch_mod.project.no_commit',
+     _proj_fuel_use_rate_calculate),
+]
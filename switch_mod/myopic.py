@@ -0,0 +1,295 @@
+# Copyright 2016 The Switch Authors. All rights reserved.
+# Licensed under the Apache License, Version 2, which is in the LICENSE file.
+
+"""
+Solve a model one investment period at a time, with foresight limited
+to the period being solved (--myopic in switch_mod.solve).
+
+The inputs are read once. For each period, in order, an instance is
+constructed from a copy of the input data that only holds that period,
+its timeseries and timepoints, and the technologies and projects that
+can be built in it. The capacity built in earlier periods is added to
+the existing capacity of the instance: projects built in period p are
+added to EXISTING_PROJ_BUILDYEARS as build year p, with proj_existing_cap
+set to the amount built and the overnight and fixed O&M costs they were
+built at, and the transmission and local T&D capacity available in p
+becomes existing_trans_cap and existing_local_td. Transmission and
+local T&D costs are charged per MW of capacity regardless of when it
+was built, so the costs of the later periods are the same as if the
+earlier builds had been decided in the same model.
+
+After the last period, the solutions of all periods are loaded onto an
+instance of the whole model (constructed from the same input data), so
+the usual output files cover every period and total_cost.txt holds the
+cost of the myopic plan over the whole study. Where periods share a
+variable (the existing builds), the value from the earliest period is
+kept.
+
+Keys of the input data are matched to periods, timeseries and
+timepoints through the index sets of the components they are loaded
+into. KEY_KINDS lists the components whose index sets don't show
+which positions of their keys hold periods or build years.
+
+"""
+from pyomo.environ import Set, Var, value
+from pyomo.core.base.sets import _SetProduct
+
+import switch_mod.utilities
+
+BUILD_YEAR = 'build_year'
+_TIME_SETS = ('PERIODS', 'TIMESERIES', 'TIMEPOINTS')
+
+# What each position in the keys of these components (or of the data
+# of components indexed by them) holds, where the index set doesn't
+# show it.
+KEY_KINDS = {
+    'EXISTING_PROJ_BUILDYEARS': (None, BUILD_YEAR),
+    'proj_existing_cap': (None, BUILD_YEAR),
+    'proj_overnight_cost': (None, BUILD_YEAR),
+    'proj_fixed_om': (None, BUILD_YEAR),
+    'PROJ_DISPATCH_POINTS': (None, 'TIMEPOINTS'),
+    'RFM_SUPPLY_TIERS': (None, 'PERIODS', None),
+    'rfm_supply_tier_cost': (None, 'PERIODS', None),
+    'rfm_supply_tier_limit': (None, 'PERIODS', None),
+}
+
+
+def solve(switch_model, data, solve_step, callback=None):
+    """
+    Solve the model period by period from the input data in data (a
+    DataPortal made by utilities._load_data_portal()). solve_step(instance)
+    solves the instance of one period and returns the solver results,
+    and callback(period, instance, results), if given, is called after
+    each period is solved.
+
+    Returns the instance of the whole model with the solutions of all
+    periods loaded onto it and a list of (period, results) for the
+    periods solved. If a period can't be solved, the periods after it
+    are not solved and the instance is None.
+    """
+    full_data = data.data()
+    all_periods = sorted(full_data['PERIODS'][None])
+    kinds = data_kinds(switch_model, full_data)
+    carried = CarriedCapacity()
+    steps = []
+    step_results = []
+    for period in all_periods:
+        step_data = period_data(
+            full_data, kinds, period, all_periods, carried)
+        instance = switch_mod.utilities._create_instance(
+            switch_model, {None: step_data}, data.dense_params)
+        results = solve_step(instance)
+        step_results.append((period, results))
+        if not switch_mod.utilities.load_solution(instance, results):
+            return (None, step_results)
+        if callback is not None:
+            callback(period, instance, results)
+        carried.add(instance, period)
+        steps.append(instance)
+
+    full_instance = switch_mod.utilities._create_instance(switch_model, data)
+    full_instance.DataPortal = data
+    merge_solutions(full_instance, steps)
+    return (full_instance, step_results)
+
+
+def period_data(full_data, kinds, period, all_periods, carried):
+    """
+    Return a copy of the input data in full_data (a dictionary of
+    component data, as in DataPortal.data()) that only holds one period,
+    with the capacity in carried added to the existing capacity.
+    kinds holds the key kinds of each component (see data_kinds()).
+    """
+    ts_period = full_data['ts_period']
+    members = timeseries_members(full_data, [
+        ts for ts in full_data['TIMESERIES'][None]
+        if ts_period[ts] == period])
+    step_data = select_data(
+        full_data, kinds, members, set(all_periods) - set([period]))
+    carried.update_data(step_data)
+    return step_data
+
+
+def timeseries_members(full_data, timeseries):
+    """
+    Return the periods, timeseries and timepoints to keep when the input
+    data is cut down to the given timeseries, as a dictionary of sets
+    keyed by the names in _TIME_SETS.
+    """
+    ts_period = full_data['ts_period']
+    tp_ts = full_data['tp_ts']
+    timeseries = set(timeseries)
+    return {
+        'PERIODS': set(ts_period[ts] for ts in timeseries),
+        'TIMESERIES': timeseries,
+        'TIMEPOINTS': set(
+            tp for tp in full_data['TIMEPOINTS'][None]
+            if tp_ts[tp] in timeseries),
+    }
+
+
+def select_data(full_data, kinds, members, excluded_build_years=()):
+    """
+    Return a copy of the input data in full_data that only holds the
+    keys (and set members) whose periods, timeseries and timepoints are
+    in members (see timeseries_members()) and whose build years are not
+    in excluded_build_years. kinds holds the key kinds of each component
+    (see data_kinds()).
+    """
+    excluded_build_years = set(excluded_build_years)
+
+    def keep(key, key_kinds):
+        return key_selected(key, key_kinds, members, excluded_build_years)
+
+    selected = {}
+    for (name, component_data) in full_data.iteritems():
+        (key_kinds, member_kinds) = kinds[name]
+        if member_kinds:
+            # The members of a set are filtered, not its index.
+            selected[name] = dict(
+                (index, [m for m in elements if keep(m, member_kinds)])
+                for (index, elements) in component_data.iteritems())
+        elif key_kinds:
+            selected[name] = dict(
+                (key, val) for (key, val) in component_data.iteritems()
+                if keep(key, key_kinds))
+        else:
+            selected[name] = dict(component_data)
+    return selected
+
+
+def key_selected(key, key_kinds, members, excluded_build_years=()):
+    """
+    Return True if the periods, timeseries and timepoints in a key with
+    the given kinds are in members and its build year (if any) is not
+    in excluded_build_years.
+    """
+    if len(key_kinds) == 1:
+        key = (key,)
+    for (k, kind) in zip(key, key_kinds):
+        if kind is None:
+            continue
+        if kind == BUILD_YEAR:
+            if k in excluded_build_years:
+                return False
+        elif k not in members[kind]:
+            return False
+    return True
+
+
+def data_kinds(model, full_data):
+    """
+    Return the key kinds of the data for each component in full_data,
+    or each component named in a list (see _key_kinds()).
+    """
+    return dict((name, _key_kinds(model, name)) for name in full_data)
+
+
+def _key_kinds(model, name):
+    """
+    Return the kinds (a name from _TIME_SETS, BUILD_YEAR or None) of the
+    positions in the keys of the data for a model component, as a tuple
+    of kinds for the keys of parameters and indexed sets and a tuple of
+    kinds for the members of a set that isn't indexed. The other tuple
+    is empty.
+    """
+    component = getattr(model, name, None)
+    if component is None:
+        return ((), ())
+    if name in KEY_KINDS:
+        if isinstance(component, Set) and not component.is_indexed():
+            return ((), KEY_KINDS[name])
+        return (KEY_KINDS[name], ())
+    if isinstance(component, Set) and not component.is_indexed():
+        member_kinds = _set_kinds(component)
+        return ((), member_kinds if any(member_kinds) else ())
+    if component.is_indexed():
+        key_kinds = _set_kinds(component._index)
+        return (key_kinds if any(key_kinds) else (), ())
+    return ((), ())
+
+
+def _set_kinds(s):
+    name = getattr(s, 'name', None)
+    if name in _TIME_SETS:
+        return (name,)
+    if name in KEY_KINDS:
+        return KEY_KINDS[name]
+    if isinstance(s, _SetProduct):
+        return sum((_set_kinds(part) for part in s.set_tuple), ())
+    # Subsets declared with within= or initialized (and filtered) from
+    # another set have the kinds of that set.
+    for parent in (getattr(s, 'domain', None),
+                   getattr(s, 'initialize', None)):
+        if parent is not None and parent is not s and isinstance(parent, Set):
+            return _set_kinds(parent)
+    return (None,) * (getattr(s, 'dimen', 1) or 1)
+
+
+class CarriedCapacity(object):
+    """
+    The capacity built in the periods solved so far, in the form of the
+    existing capacity inputs of the next period.
+    """
+
+    def __init__(self):
+        # (proj, build_year): (capacity, overnight cost, fixed O&M)
+        self.projects = {}
+        self.trans = {}
+        self.local_td = {}
+
+    def add(self, instance, period):
+        if hasattr(instance, 'NEW_PROJ_BUILDYEARS'):
+            for (proj, bld_yr) in instance.NEW_PROJ_BUILDYEARS:
+                cap = value(instance.BuildProj[proj, bld_yr])
+                if cap > 0:
+                    self.projects[proj, bld_yr] = (
+                        cap, value(instance.proj_overnight_cost[proj, bld_yr]),
+                        value(instance.proj_fixed_om[proj, bld_yr]))
+        if hasattr(instance, 'TransCapacity'):
+            for tx in instance.TRANSMISSION_LINES:
+                self.trans[tx] = value(instance.TransCapacity[tx, period])
+        if hasattr(instance, 'LocalTDCapacity'):
+            for lz in instance.LOAD_ZONES:
+                self.local_td[lz] = value(
+                    instance.LocalTDCapacity[lz, period])
+
+    def update_data(self, data):
+        """Add the carried capacity to the data of the next period."""
+        if self.projects:
+            data['EXISTING_PROJ_BUILDYEARS'][None].extend(
+                sorted(self.projects))
+            for (key, (cap, overnight, fixed_om)) in (
+                    self.projects.iteritems()):
+                data['proj_existing_cap'][key] = cap
+                data.setdefault('proj_overnight_cost', {})[key] = overnight
+                data.setdefault('proj_fixed_om', {})[key] = fixed_om
+        data.get('existing_trans_cap', {}).update(self.trans)
+        data.get('existing_local_td', {}).update(self.local_td)
+
+
+def merge_solutions(instance, steps):
+    """
+    Load the variable values and duals of the instances in steps onto
+    instance, an instance of the same model that covers all of their
+    periods. Values from earlier steps are kept where steps share a
+    variable.
+    """
+    done = set()
+    for step in steps:
+        for var in step.component_objects(Var, active=True):
+            target = getattr(instance, var.name)
+            for (key, var_data) in var.iteritems():
+                if var_data.value is None or (var.name, key) in done:
+                    continue
+                if key in target:
+                    target[key].value = var_data.value
+                    done.add((var.name, key))
+        if not hasattr(step, 'dual'):
+            continue
+        switch_mod.utilities.register_duals(
+            instance, *step.dual_constraints)
+        for (con, dual) in step.dual.iteritems():
+            target = getattr(instance, con.parent_component().name)
+            if con.index() in target:
+                instance.dual[target[con.index()]] = dual
@@ -312,6 +312,13 @@ def load_inputs(mod, switch_data, inputs_dir):
     variable_capacity_factors.tab
         PROJECT, timepoint, proj_max_capacity_factor
 
+    For very large datasets, variable_capacity_factors.npy can be given
+    instead, with variable_capacity_factors_projects.txt and
+    variable_capacity_factors_timepoints.txt listing its rows and
+    columns. That file is memory-mapped rather than read into memory, so
+    several workers solving scenarios on one machine share a single copy
+    (see utilities.load_mapped() and utilities.write_npy_param()).
+
     project_info.tab is used by project.build and project.dispatch. The
     columns listed here are optional because they override values given
     by descriptions of generation technologies. Every project needs to
@@ -327,11 +334,26 @@ def load_inputs(mod, switch_data, inputs_dir):
 
     """
 
-    switch_data.load_aug(
-        optional=True,
-        filename=os.path.join(inputs_dir, 'variable_capacity_factors.tab'),
-        select=('PROJECT', 'timepoint', 'proj_max_capacity_factor'),
-        param=(mod.proj_max_capacity_factor))
+    # Capacity factors are stored densely by project and timepoint to
+    # keep hourly datasets small in memory, or memory-mapped from a
+    # binary file if one is provided.
+    npy_path = os.path.join(inputs_dir, 'variable_capacity_factors.npy')
+    if switch_data.db_inputs is None and os.path.isfile(npy_path):
+        switch_data.load_mapped(
+            filename=npy_path,
+            param=mod.proj_max_capacity_factor,
+            rows_filename=os.path.join(
+                inputs_dir, 'variable_capacity_factors_projects.txt'),
+            columns_filename=os.path.join(
+                inputs_dir, 'variable_capacity_factors_timepoints.txt'))
+    else:
+        switch_data.load_dense(
+            optional=True,
+            filename=os.path.join(
+                inputs_dir, 'variable_capacity_factors.tab'),
+            select=('PROJECT', 'timepoint', 'proj_max_capacity_factor'),
+            param=mod.proj_max_capacity_factor,
+            columns=mod.TIMEPOINTS)
     switch_data.load_aug(
         optional=True,
         filename=os.path.join(inputs_dir, 'project_info.tab'),
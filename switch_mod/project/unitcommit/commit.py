@@ -105,7 +105,16 @@ def define_components(mod):
     Commit_Startup_Shutdown_Consistency[(proj, t) in
     PROJ_DISPATCH_POINTS] is a constraint that forces consistency
     between commitment decision from one hour to the next with startup
-    and shutdown.
+    and shutdown. The commitment before the first timepoint of a
+    timeseries is normally taken from its last timepoint, since
+    timeseries are circular.
+
+    proj_initial_commit[(proj, t) in PROJ_DISPATCH_POINTS] is the
+    capacity committed before timepoint t, which replaces the
+    commitment in the previous timepoint in
+    Commit_Startup_Shutdown_Consistency. This optional parameter is
+    given for the first timepoint of a timeseries that continues from
+    an earlier solution, e.g., by switch_mod.rolling_horizon.
 
     g_startup_fuel[g in GEN_TECH_WITH_FUEL] describes fuel
     requirements of starting up additional generation capacity expressed
@@ -225,10 +234,15 @@ def define_components(mod):
     mod.Shutdown = Var(
         mod.PROJ_DISPATCH_POINTS,
         within=NonNegativeReals)
+    mod.proj_initial_commit = Param(
+        mod.PROJ_DISPATCH_POINTS,
+        within=NonNegativeReals)
     mod.Commit_Startup_Shutdown_Consistency = Constraint(
         mod.PROJ_DISPATCH_POINTS,
         rule=lambda m, pr, t: (
-            m.CommitProject[pr, m.tp_previous[t]] +
+            (m.proj_initial_commit[pr, t]
+             if (pr, t) in m.proj_initial_commit
+             else m.CommitProject[pr, m.tp_previous[t]]) +
             m.Startup[pr, t] - m.Shutdown[pr, t] == m.CommitProject[pr, t]))
     mod.g_startup_fuel = Param(mod.GEN_TECH_WITH_FUEL, default=0.0)
     mod.g_startup_om = Param(mod.GENERATION_TECHNOLOGIES, default=0.0)
@@ -309,6 +323,9 @@ def load_inputs(mod, switch_data, inputs_dir):
         PROJECT, TIMEPOINT, proj_min_commit_fraction, proj_max_commit_fraction,
         proj_min_load_fraction
 
+    proj_initial_commit.tab
+        PROJECT, TIMEPOINT, proj_initial_commit
+
     """
     switch_data.load_aug(
         optional=True,
@@ -322,3 +339,8 @@ def load_inputs(mod, switch_data, inputs_dir):
         auto_select=True,
         param=(mod.proj_min_commit_fraction, mod.proj_max_commit_fraction,
                mod.proj_min_load_fraction))
+    switch_data.load_aug(
+        optional=True,
+        filename=os.path.join(inputs_dir, 'proj_initial_commit.tab'),
+        auto_select=True,
+        param=(mod.proj_initial_commit))
@@ -90,60 +90,104 @@ def define_components(mod):
     level. Data is read in in that format, then processed to describe
     the individual line segments.
 
-    GEN_FUEL_USE_SEGMENTS[g in GEN_TECH_WITH_FUEL] is a set of line segments
-    that collectively describe fuel requirements for a given generation
-    technology. Each element of this set is a tuple of (y-intercept,
-    slope) where the y-intercept is in units of MMBTU/(hr * MW-capacity)
-    and slope is incremental heat rate in units of MMBTU / MWh-energy.
-    We normalize the y-intercept by capacity so that we can scale it to
-    arbitrary sizes of generation, or stacks of individual generation
-    units. This code can be used in conjunction with discrete unit sizes
-    but it not dependent on that. This set is optional.
-
-    PROJ_FUEL_USE_SEGMENTS[proj in FUEL_BASED_PROJECTS] is the same as
-    GEN_FUEL_USE_SEGMENTS but scoped to projects. This set is optional
-    and will default to GEN_FUEL_USE_SEGMENTS if that is available;
-    otherwise it will default to an intercept of 0 and a slope of its
-    full load heat rate.
+    GEN_FUEL_USE_SEGMENTS is a set of (g, n) pairs that number the line
+    segments 1, 2, ... that collectively describe fuel requirements for
+    a given generation technology g in GEN_TECH_WITH_FUEL. This set is
+    optional.
+
+    g_fuel_use_intercept[g, n] and g_fuel_use_incremental_heat_rate[g,
+    n] describe each line segment. The y-intercept is in units of
+    MMBTU/(hr * MW-capacity) and the slope is incremental heat rate in
+    units of MMBTU / MWh-energy. We normalize the y-intercept by
+    capacity so that we can scale it to arbitrary sizes of generation,
+    or stacks of individual generation units. This code can be used in
+    conjunction with discrete unit sizes but it not dependent on that.
+
+    PROJ_FUEL_USE_SEGMENTS, proj_fuel_use_intercept[proj, n] and
+    proj_fuel_use_incremental_heat_rate[proj, n] are the same, but
+    scoped to projects in FUEL_BASED_PROJECTS. These are optional and
+    only need to be given for projects whose fuel use curve differs
+    from that of their generation technology.
+
+    proj_fuel_use_segment_count[proj] is the number of line segments
+    that describe the fuel use of a project. Projects without their own
+    segments share the segments of their generation technology if that
+    has any; otherwise they have a single segment with an intercept of
+    0 and a slope of their full load heat rate. The segments themselves
+    are not copied for each project; see proj_fuel_use_segment().
+
+    FUEL_USE_SEGMENT_NUMBERS is the set of segment numbers 1 to the
+    largest number of segments of any project. The fuel use constraints
+    are indexed by PROJ_WITH_FUEL_DISPATCH_POINTS and these numbers, and
+    skipped for numbers beyond a project's segment count.
 
     """
 
-    # Pyomo doesn't allow default for sets, so I need to specify default
-    # data in the data load function.
     mod.GEN_FUEL_USE_SEGMENTS = Set(
-        mod.GEN_TECH_WITH_FUEL,
-        dimen=2)
+        dimen=2,
+        validate=lambda m, g, n: (
+            g in m.GEN_TECH_WITH_FUEL and n in PositiveIntegers))
+    mod.g_fuel_use_intercept = Param(mod.GEN_FUEL_USE_SEGMENTS)
+    mod.g_fuel_use_incremental_heat_rate = Param(mod.GEN_FUEL_USE_SEGMENTS)
     mod.PROJ_FUEL_USE_SEGMENTS = Set(
+        dimen=2,
+        validate=lambda m, pr, n: (
+            pr in m.FUEL_BASED_PROJECTS and n in PositiveIntegers))
+    mod.proj_fuel_use_intercept = Param(mod.PROJ_FUEL_USE_SEGMENTS)
+    mod.proj_fuel_use_incremental_heat_rate = Param(
+        mod.PROJ_FUEL_USE_SEGMENTS)
+
+    def proj_fuel_use_segment_count_rule(m, pr):
+        for (segments, unit) in (
+                (m.PROJ_FUEL_USE_SEGMENTS, pr),
+                (m.GEN_FUEL_USE_SEGMENTS, m.proj_gen_tech[pr])):
+            n = 0
+            while (unit, n + 1) in segments:
+                n += 1
+            if n > 0:
+                return n
+        return 1
+    mod.proj_fuel_use_segment_count = Param(
         mod.FUEL_BASED_PROJECTS,
-        dimen=2)
-
-    # Use BuildAction to populate a set's default values.
-    def PROJ_FUEL_USE_SEGMENTS_default_rule(m, pr):
-        if pr not in m.PROJ_FUEL_USE_SEGMENTS:
-            g = m.proj_gen_tech[pr]
-            if g in m.GEN_FUEL_USE_SEGMENTS:
-                m.PROJ_FUEL_USE_SEGMENTS[pr] = m.GEN_FUEL_USE_SEGMENTS[g]
-            else:
-                heat_rate = m.proj_full_load_heat_rate[pr]
-                m.PROJ_FUEL_USE_SEGMENTS[pr] = [(0, heat_rate)]
-    mod.PROJ_FUEL_USE_SEGMENTS_default = BuildAction(
-        mod.FUEL_BASED_PROJECTS,
-        rule=PROJ_FUEL_USE_SEGMENTS_default_rule)
-
-    mod.PROJ_DISP_FUEL_PIECEWISE_CONS_SET = Set(
-        dimen=4,
-        initialize=lambda m: set(
-            (proj, t, intercept, slope)
-            for (proj, t) in m.PROJ_WITH_FUEL_DISPATCH_POINTS
-            for (intercept, slope) in m.PROJ_FUEL_USE_SEGMENTS[proj]))
-    mod.ProjFuelUseRate_Calculate = Constraint(
-        mod.PROJ_DISP_FUEL_PIECEWISE_CONS_SET,
-        rule=lambda m, pr, t, intercept, incremental_heat_rate: (
+        within=PositiveIntegers,
+        initialize=proj_fuel_use_segment_count_rule)
+    mod.FUEL_USE_SEGMENT_NUMBERS = Set(
+        ordered=True,
+        initialize=lambda m: range(1, 1 + max(
+            [1] + [m.proj_fuel_use_segment_count[pr]
+                   for pr in m.FUEL_BASED_PROJECTS])))
+
+    def ProjFuelUseRate_Calculate_rule(m, pr, t, n):
+        if n > m.proj_fuel_use_segment_count[pr]:
+            return Constraint.Skip
+        (intercept, incremental_heat_rate) = proj_fuel_use_segment(m, pr, n)
+        return (
             sum(m.ProjFuelUseRate[pr, t, f] for f in m.G_FUELS[m.proj_gen_tech[pr]]) >=
             # Do the startup
             m.Startup[pr, t] * m.proj_startup_fuel[pr] / m.tp_duration_hrs[t] +
             intercept * m.CommitProject[pr, t] +
-            incremental_heat_rate * m.DispatchProj[pr, t]))
+            incremental_heat_rate * m.DispatchProj[pr, t])
+    mod.ProjFuelUseRate_Calculate = Constraint(
+        mod.PROJ_WITH_FUEL_DISPATCH_POINTS, mod.FUEL_USE_SEGMENT_NUMBERS,
+        rule=ProjFuelUseRate_Calculate_rule)
+
+
+def proj_fuel_use_segment(m, pr, n):
+    """
+    Return the (intercept, incremental heat rate) of line segment n of
+    the fuel use curve of project pr, taken from the project's own
+    segments, those of its generation technology or its full load heat
+    rate, in that order of preference.
+
+    """
+    if (pr, 1) in m.PROJ_FUEL_USE_SEGMENTS:
+        return (m.proj_fuel_use_intercept[pr, n],
+                m.proj_fuel_use_incremental_heat_rate[pr, n])
+    g = m.proj_gen_tech[pr]
+    if (g, 1) in m.GEN_FUEL_USE_SEGMENTS:
+        return (m.g_fuel_use_intercept[g, n],
+                m.g_fuel_use_incremental_heat_rate[g, n])
+    return (0, m.proj_full_load_heat_rate[pr])
 
 
 def load_inputs(mod, switch_data, inputs_dir):
@@ -194,9 +238,10 @@ def load_inputs(mod, switch_data, inputs_dir):
 
     """
     path = os.path.join(inputs_dir, 'gen_inc_heat_rates.tab')
-    if os.path.isfile(path):
+    if switch_data.input_exists(path):
         (fuel_rate_segments, min_load, full_hr) = _parse_inc_heat_rate_file(
-            path, id_column="generation_technology")
+            path, id_column="generation_technology",
+            rows=switch_data.read_input_rows(path))
         # Check implied minimum loading level for consistency with
         # g_min_load_fraction if g_min_load_fraction was provided. If
         # g_min_load_fraction wasn't provided, set it to implied minimum
@@ -227,12 +272,14 @@ def load_inputs(mod, switch_data, inputs_dir):
             else:
                 switch_data.data(name='g_full_load_heat_rate')[g] = full_hr[g]
         # Copy parsed data into the data portal.
-        switch_data.data()['GEN_FUEL_USE_SEGMENTS'] = fuel_rate_segments
+        _store_segments(
+            switch_data, fuel_rate_segments, 'GEN_FUEL_USE_SEGMENTS',
+            'g_fuel_use_intercept', 'g_fuel_use_incremental_heat_rate')
 
     path = os.path.join(inputs_dir, 'proj_inc_heat_rates.tab')
-    if os.path.isfile(path):
+    if switch_data.input_exists(path):
         (fuel_rate_segments, min_load, full_hr) = _parse_inc_heat_rate_file(
-            path, id_column="project")
+            path, id_column="project", rows=switch_data.read_input_rows(path))
         # Check implied minimum loading level for consistency with
         # proj_min_load_fraction if proj_min_load_fraction was provided. If
         # proj_min_load_fraction wasn't provided, set it to implied minimum
@@ -265,13 +312,37 @@ def load_inputs(mod, switch_data, inputs_dir):
             else:
                 dp_dict[pr] = full_hr[pr]
         # Copy parsed data into the data portal.
-        switch_data.data()['PROJ_FUEL_USE_SEGMENTS'] = fuel_rate_segments
+        _store_segments(
+            switch_data, fuel_rate_segments, 'PROJ_FUEL_USE_SEGMENTS',
+            'proj_fuel_use_intercept', 'proj_fuel_use_incremental_heat_rate')
 
 
-def _parse_inc_heat_rate_file(path, id_column):
+def _store_segments(switch_data, fuel_rate_segments, set_name,
+                    intercept_name, ihr_name):
+    """
+    Store line segments parsed by _parse_inc_heat_rate_file() in the
+    data portal, numbered from 1 for each unit.
+
+    """
+    keys = []
+    intercepts = {}
+    ihrs = {}
+    for (u, segments) in fuel_rate_segments.iteritems():
+        for (n, (intercept, ihr)) in enumerate(segments, 1):
+            keys.append((u, n))
+            intercepts[u, n] = intercept
+            ihrs[u, n] = ihr
+    switch_data.data()[set_name] = {None: keys}
+    switch_data.data()[intercept_name] = intercepts
+    switch_data.data()[ihr_name] = ihrs
+
+
+def _parse_inc_heat_rate_file(path, id_column, rows=None):
     """
     Parse tabular incremental heat rate data, calculate a series of
     lines that describe each segment, and perform various error checks.
+    The rows are read from path unless they are given as a list of
+    dictionaries keyed by column name (see utilities.read_input_rows()).
 
     SYNOPSIS:
     >>> import switch_mod.project.unitcommit.fuel_use as f
@@ -298,37 +369,38 @@ def _parse_inc_heat_rate_file(path, id_column):
     full_load_hr = {}
     # Scan the file and stuff the data into dictionaries for easy access.
     # Parse the file and stuff data into dictionaries indexed by units.
-    with open(path, 'rb') as hr_file:
-        dat = list(csv.DictReader(hr_file, delimiter='	'))
-        for row in dat:
-            u = row[id_column]
-            p1 = float(row['power_start_mw'])
-            p2 = row['power_end_mw']
-            ihr = row['incremental_heat_rate_mbtu_per_mwhr']
-            fr = row['fuel_use_rate_mmbtu_per_h']
-            # Does this row give the first point?
-            if(p2 == '.' and ihr == '.'):
-                fr = float(fr)
-                if(u in fuel_rate_points):
-                    ValueError(
-                        "Error processing incremental heat rates for " +
-                        u + " in " + path + ". More than one row has " +
-                        "a fuel use rate specified.")
-                fuel_rate_points[u] = {p1: fr}
-            # Does this row give a line segment?
-            elif(fr == '.'):
-                p2 = float(p2)
-                ihr = float(ihr)
-                if(u not in ihr_dat):
-                    ihr_dat[u] = []
-                ihr_dat[u].append((p1, p2, ihr))
-            # Throw an error if the row's format is not recognized.
-            else:
+    if rows is None:
+        with open(path, 'rb') as hr_file:
+            rows = list(csv.DictReader(hr_file, delimiter='	'))
+    for row in rows:
+        u = row[id_column]
+        p1 = float(row['power_start_mw'])
+        p2 = row['power_end_mw']
+        ihr = row['incremental_heat_rate_mbtu_per_mwhr']
+        fr = row['fuel_use_rate_mmbtu_per_h']
+        # Does this row give the first point?
+        if(p2 == '.' and ihr == '.'):
+            fr = float(fr)
+            if(u in fuel_rate_points):
                 ValueError(
-                    "Error processing incremental heat rates for row " +
-                    u + " in " + path + ". Row format not recognized for " +
-                    "row " + str(row) + ". See documentation for acceptable " +
-                    "formats.")
+                    "Error processing incremental heat rates for " +
+                    u + " in " + path + ". More than one row has " +
+                    "a fuel use rate specified.")
+            fuel_rate_points[u] = {p1: fr}
+        # Does this row give a line segment?
+        elif(fr == '.'):
+            p2 = float(p2)
+            ihr = float(ihr)
+            if(u not in ihr_dat):
+                ihr_dat[u] = []
+            ihr_dat[u].append((p1, p2, ihr))
+        # Throw an error if the row's format is not recognized.
+        else:
+            ValueError(
+                "Error processing incremental heat rates for row " +
+                u + " in " + path + ". Row format not recognized for " +
+                "row " + str(row) + ". See documentation for acceptable " +
+                "formats.")
     # Make sure that each project that have a incremental heat rates defined
     # also have a starting point defined.
     if ihr_dat.keys() != fuel_rate_points.keys():
@@ -0,0 +1,168 @@
+# Copyright 2016 The Switch Authors. All rights reserved.
+# Licensed under the Apache License, Version 2, which is in the LICENSE file.
+
+"""
+Heuristic solution of models with integer variables, such as BuildUnits
+of project.discrete_build and CommitUnits of project.unitcommit.discrete,
+by rounding the solution of their linear relaxation
+(--relax-and-round in switch_mod.solve).
+
+First the integer variables are made continuous and the linear program
+is solved. Its objective value is a lower bound on the cost of any
+solution of the original model. Then every integer variable is rounded
+to the nearest integer within its bounds and fixed there, and the
+linear program is solved again for the continuous variables. If that
+is infeasible, a repair pass rounds all the relaxed values up instead
+(more units built or committed), and if that is also infeasible, down.
+The integer variables are left at their rounded values and unfixed
+afterwards.
+
+With mip_start, the original model is then solved with the rounded
+solution as a warm start (MIP start), so solve_step must be able to pass
+one to the solver (see switch_mod.solution_reader.warm_start_capable()).
+
+solve() reports the objective values and the gap between the final
+solution and the relaxation bound, (objective - bound) / |objective|,
+which bounds how far the solution can be from the optimum.
+
+"""
+import math
+
+from pyomo.environ import (
+    Binary, Integers, NegativeIntegers, NegativeReals, NonNegativeIntegers,
+    NonNegativeReals, NonPositiveIntegers, NonPositiveReals, Objective,
+    PercentFraction, PositiveIntegers, PositiveReals, Reals, Var, value)
+
+import switch_mod.utilities
+
+# Continuous domains that replace the integer ones in the relaxation.
+RELAXED_DOMAINS = {
+    Binary: PercentFraction,
+    Integers: Reals,
+    NegativeIntegers: NegativeReals,
+    NonNegativeIntegers: NonNegativeReals,
+    NonPositiveIntegers: NonPositiveReals,
+    PositiveIntegers: PositiveReals,
+}
+
+# Rounding rules, in the order they are tried.
+ROUNDING = [
+    ('nearest', lambda x: math.floor(x + 0.5)),
+    ('up', math.ceil),
+    ('down', math.floor),
+]
+
+# Relaxed values within this distance of an integer count as integers.
+_TOLERANCE = 1e-6
+
+
+def solve(instance, solve_step, mip_start=False):
+    """
+    Solve the instance with the relax-and-round heuristic. solve_step
+    (instance, **kwds) solves the instance and returns the solver
+    results; with mip_start, it is called with warmstart=True for the
+    final solve. Returns the results of the last solve and a dictionary
+    that summarizes the heuristic for run_metrics.tab.
+    """
+    integer_vars = [
+        var for var in instance.component_objects(Var, active=True)
+        if var.domain in RELAXED_DOMAINS]
+    summary = {'integer_variables': sum(len(var) for var in integer_vars)}
+    domains = relax_integrality(integer_vars)
+    try:
+        results = solve_step(instance)
+        if not switch_mod.utilities.load_solution(instance, results):
+            summary['heuristic_rounding'] = 'relaxation infeasible'
+            return (results, summary)
+        bound = _objective_value(instance)
+        summary['relaxation_objective'] = bound
+        relaxed = [
+            (var_data, var_data.value)
+            for var in integer_vars for var_data in var.itervalues()
+            if var_data.value is not None]
+        success = False
+        for (rule_name, rule) in ROUNDING:
+            for (var_data, x) in relaxed:
+                var_data.fix(round_within_bounds(var_data, x, rule))
+            results = solve_step(instance)
+            success = switch_mod.utilities.load_solution(instance, results)
+            if success:
+                break
+        summary['heuristic_rounding'] = rule_name if success else 'failed'
+        for (var_data, x) in relaxed:
+            var_data.unfix()
+    finally:
+        restore_integrality(domains)
+    if not success:
+        return (results, summary)
+    objective = _objective_value(instance)
+    summary['heuristic_objective'] = objective
+    summary['heuristic_gap'] = gap(objective, bound)
+    if mip_start:
+        results = solve_step(instance, warmstart=True)
+        if switch_mod.utilities.load_solution(instance, results):
+            objective = _objective_value(instance)
+            summary['mip_objective'] = objective
+            summary['mip_gap'] = gap(objective, bound)
+    return (results, summary)
+
+
+def relax_integrality(variables):
+    """
+    Make the given integer variable components continuous and return
+    their original domains for restore_integrality().
+    """
+    domains = [(var, var.domain) for var in variables]
+    for var in variables:
+        var.domain = RELAXED_DOMAINS[var.domain]
+    return domains
+
+
+def restore_integrality(domains):
+    for (var, domain) in domains:
+        var.domain = domain
+
+
+def round_within_bounds(var_data, x, rule):
+    """
+    Round a relaxed value x with rule, keeping the result within the
+    bounds of the variable. Values that are integers to within a small
+    tolerance are kept as they are.
+
+    >>> from pyomo.environ import ConcreteModel, NonNegativeIntegers, Var
+    >>> m = ConcreteModel()
+    >>> m.x = Var(within=NonNegativeIntegers, bounds=(0, 3))
+    >>> [round_within_bounds(m.x, x, rule) for (name, rule) in ROUNDING
+    ...  for x in (0.4, 2.999999999, 3.5)]
+    [0.0, 3.0, 3.0, 1.0, 3.0, 3.0, 0.0, 3.0, 3.0]
+    """
+    nearest = math.floor(x + 0.5)
+    if abs(x - nearest) <= _TOLERANCE:
+        rounded = nearest
+    else:
+        rounded = rule(x)
+    (lb, ub) = var_data.bounds
+    if lb is not None:
+        rounded = max(rounded, math.ceil(lb - _TOLERANCE))
+    if ub is not None:
+        rounded = min(rounded, math.floor(ub + _TOLERANCE))
+    return float(rounded)
+
+
+def gap(objective, bound):
+    """
+    Return the relative gap between an objective value and a lower
+    bound on it.
+
+    >>> gap(110.0, 100.0)
+    0.09090909090909091
+    >>> gap(0.0, 0.0)
+    0.0
+    """
+    if objective == bound:
+        return 0.0
+    return (objective - bound) / abs(objective)
+
+
+def _objective_value(instance):
+    return value(next(instance.component_data_objects(Objective, active=True)))
@@ -0,0 +1,441 @@
+# Copyright 2016 The Switch Authors. All rights reserved.
+# Licensed under the Apache License, Version 2, which is in the LICENSE file.
+
+"""
+Command line front-end for solving production cost models over a
+rolling horizon.
+
+Usage:  python -m switch_mod.rolling_horizon [--window N] [--overlap K]
+            [--chronological] [--workers W] [ARGS]
+
+Instead of one problem covering every timepoint, the model is solved
+for windows of --window timeseries at a time, each as a separate
+instance constructed from the inputs, which are read only once. The
+timeseries of each window are weighted up (by scaling
+ts_scale_to_period) to stand for their whole period, which keeps the
+time weights valid and only scales the objective of the window. The
+solutions of all windows are then loaded onto an instance of the whole
+model and written to the usual output files, with the duals scaled
+back to the weights of the whole model. Windows never span two
+periods.
+
+By default, timeseries are taken to be independent samples, each
+circular as in the full model, so windows don't depend on each other
+and are solved concurrently by --workers processes.
+
+With --chronological, the timeseries of a period follow each other in
+the order they are listed in the inputs (e.g., the days of a year), and
+the timeseries of each window are joined into one timeseries that is
+not circular: the capacity committed before its first timepoint
+(proj_initial_commit of project.unitcommit.commit) is the commitment at
+the end of the previous window. The commitment of discrete units
+(CommitUnits of project.unitcommit.discrete) is fixed by CommitProject,
+so it carries over with it. Each window also looks ahead --overlap
+timeseries, whose solution is discarded and solved again as part of the
+next window. Windows are then solved in order, one at a time. Joined
+timeseries need the same ts_duration_of_tp and ts_scale_to_period.
+Variables indexed by timeseries are reported under the first
+timeseries of each window.
+
+The model must not be able to build new generation (i.e., all
+generation capacity must be existing capacity, as in the production cost
+examples). Other capacity that is built in the model (BuildLocalTD of
+local_td, BuildTrans of trans_build and BuildUnits of
+project.discrete_build) would be chosen separately by each window, so
+after all windows are solved, each of these variables is fixed at the
+largest value chosen by any window, which is feasible for all of them,
+and the windows that chose less are solved again (with --chronological,
+along with all the windows that follow the first of them). The number
+of windows solved again is reported as capacity_resolves.
+
+Like switch_mod.sweep, the solver settings and times are written to
+run_metrics.tab in the outputs directory, and any arguments that are
+not recognized here are passed on to the model.
+"""
+
+import argparse
+import multiprocessing
+import sys
+import time
+
+from pyomo.environ import Var
+
+import switch_mod.myopic
+import switch_mod.solve
+import switch_mod.utilities
+
+# Model, input data and solver kept resident in each worker process.
+# This is populated by _init_worker().
+_worker_state = {}
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(
+        prog='python -m switch_mod.rolling_horizon',
+        description='Solves a production cost model of Switch over a '
+                    'rolling horizon of timeseries.')
+    parser.add_argument(
+        '--inputs-dir', type=str, default='inputs',
+        help='Directory containing input files (default is "inputs")')
+    parser.add_argument(
+        '--outputs-dir', type=str, default='outputs',
+        help='Directory to write output files (default is "outputs")')
+    parser.add_argument(
+        '--window', type=int, default=1,
+        help='Number of timeseries solved together (default is 1)')
+    parser.add_argument(
+        '--overlap', type=int, default=0,
+        help='Number of timeseries each window looks ahead with '
+             '--chronological (default is 0)')
+    parser.add_argument(
+        '--chronological', default=False, action='store_true',
+        help='Timeseries follow each other, so commitment carries over '
+             'from one window to the next')
+    parser.add_argument(
+        '--workers', type=int, default=1,
+        help='Number of worker processes for independent windows '
+             '(default is 1)')
+    switch_mod.utilities.add_solver_arguments(parser)
+    (args, model_args) = parser.parse_known_args(argv)
+    try:
+        settings = switch_mod.utilities.solver_settings(args)
+    except switch_mod.utilities.InputError as e:
+        parser.error(e.value)
+    if args.window < 1 or args.overlap < 0:
+        parser.error('--window must be at least 1 and --overlap at least 0.')
+    if args.overlap and not args.chronological:
+        parser.error('--overlap requires --chronological.')
+    if args.workers > 1 and args.chronological:
+        parser.error('Chronological windows are solved one at a time, so '
+                     '--workers cannot be used with --chronological.')
+
+    start = time.time()
+    _init_worker(args.inputs_dir, model_args, settings)
+    switch_model = _worker_state['model']
+    data = _worker_state['portal']
+    full_data = data.data()
+    if full_data.get('NEW_GENERATION_BUILDYEARS', {}).get(None):
+        parser.error('Rolling horizons are only for models that cannot '
+                     'build new generation capacity.')
+    if args.chronological and not hasattr(switch_model, 'proj_initial_commit'):
+        parser.error('--chronological requires project.unitcommit.')
+    windows = [
+        window
+        for timeseries in period_timeseries(full_data)
+        for window in make_windows(timeseries, args.window, args.overlap)]
+
+    pool = None
+    if args.workers > 1:
+        pool = multiprocessing.Pool(
+            min(args.workers, len(windows)), initializer=_init_worker,
+            initargs=(args.inputs_dir, model_args, settings))
+    try:
+        (solutions, resolved) = solve_windows(
+            windows, period_timeseries(full_data), args.chronological, pool)
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    metrics = dict(settings)
+    metrics.update(
+        solver_profile=args.solver_profile, windows=len(windows),
+        workers=args.workers, capacity_resolves=len(resolved),
+        solve_time_s=round(
+            sum(s['solve_time'] for s in solutions + resolved), 2),
+        termination_condition=next(
+            (s['termination_condition'] for s in solutions
+             if not s['success']),
+            solutions[-1]['termination_condition']))
+    failed = [s for s in solutions if not s['success']]
+    if failed:
+        metrics['run_time_s'] = round(time.time() - start, 2)
+        switch_mod.utilities.write_run_metrics(args.outputs_dir, metrics)
+        sys.exit('Window starting with timeseries {} could not be solved; '
+                 'no outputs were written.'.format(failed[0]['window'][0]))
+
+    switch_instance = switch_mod.utilities._create_instance(
+        switch_model, data)
+    switch_instance.DataPortal = data
+    load_window_solutions(switch_instance, solutions)
+    switch_mod.utilities.export_results(
+        switch_model, switch_instance, args.outputs_dir)
+    metrics['run_time_s'] = round(time.time() - start, 2)
+    switch_mod.utilities.write_run_metrics(args.outputs_dir, metrics)
+    if switch_mod.utilities.interactive_session:
+        print("Solved {} windows in {:.2f}s.".format(
+            len(windows), metrics['run_time_s']))
+
+
+def period_timeseries(full_data):
+    """
+    Return the timeseries of each period in the input data, as one list
+    per period in the order they are listed.
+    """
+    ts_period = full_data['ts_period']
+    return [
+        [ts for ts in full_data['TIMESERIES'][None] if ts_period[ts] == p]
+        for p in sorted(full_data['PERIODS'][None])]
+
+
+def make_windows(timeseries, size, overlap=0):
+    """
+    Split a list of timeseries into windows of size timeseries, each
+    extended by the overlap timeseries that follow it. Returns a list of
+    (window, kept) pairs, where kept is the part of the window whose
+    solution is kept.
+
+    >>> make_windows(['a', 'b', 'c', 'd', 'e'], 2)
+    [(['a', 'b'], ['a', 'b']), (['c', 'd'], ['c', 'd']), (['e'], ['e'])]
+    >>> make_windows(['a', 'b', 'c', 'd', 'e'], 2, 1)
+    [(['a', 'b', 'c'], ['a', 'b']), (['c', 'd', 'e'], ['c', 'd']), (['e'], ['e'])]
+    """
+    return [
+        (list(timeseries[i:i + size + overlap]), list(timeseries[i:i + size]))
+        for i in range(0, len(timeseries), size)]
+
+
+def window_data(full_data, kinds, window, chronological=False,
+                initial_commit=None):
+    """
+    Return a copy of the input data in full_data (see
+    myopic.select_data()) that only holds the timeseries in window, with
+    their weights scaled up to fill their period. With chronological,
+    the timeseries are joined into one that starts from the commitment
+    in initial_commit ({proj: MW}) if it is given. Also returns the
+    factor by which the weights were scaled.
+    """
+    members = switch_mod.myopic.timeseries_members(full_data, window)
+    (period,) = members['PERIODS']
+    other_periods = set(full_data['PERIODS'][None]) - members['PERIODS']
+    data = switch_mod.myopic.select_data(
+        full_data, kinds, members, other_periods)
+
+    def hours(ts):
+        return (full_data['ts_duration_of_tp'][ts] *
+                full_data['ts_num_tps'][ts] *
+                full_data['ts_scale_to_period'][ts])
+    factor = (
+        sum(hours(ts) for ts in full_data['TIMESERIES'][None]
+            if full_data['ts_period'][ts] == period) /
+        float(sum(hours(ts) for ts in window)))
+    scale = data['ts_scale_to_period']
+    for ts in window:
+        scale[ts] *= factor
+
+    if chronological:
+        first = window[0]
+        for name in ('ts_duration_of_tp', 'ts_scale_to_period'):
+            if len(set(data[name][ts] for ts in window)) > 1:
+                raise switch_mod.utilities.InputError(
+                    'Timeseries {} to {} cannot be joined because their '
+                    '{} differs.'.format(first, window[-1], name))
+        data = switch_mod.myopic.select_data(
+            data, kinds, dict(members, TIMESERIES=set([first])))
+        data['ts_num_tps'][first] = sum(
+            full_data['ts_num_tps'][ts] for ts in window)
+        timepoints = [
+            tp for tp in full_data['TIMEPOINTS'][None]
+            if tp in members['TIMEPOINTS']]
+        data['tp_ts'] = dict((tp, first) for tp in timepoints)
+        if initial_commit:
+            commit = data.setdefault('proj_initial_commit', {})
+            for (proj, mw) in initial_commit.iteritems():
+                commit[proj, timepoints[0]] = mw
+    return (data, factor)
+
+
+def solve_windows(windows, periods, chronological=False, pool=None):
+    """
+    Solve the windows (see make_windows()) of the timeseries of each
+    period in periods, as lists of timeseries, concurrently with pool
+    if it is given. Windows whose capacity differs from the largest one
+    chosen by any window are then solved again with that capacity (see
+    shared_capacity()). Returns the solution of each window from
+    _solve_window() and the list of solutions that were replaced.
+    """
+    period_starts = set(timeseries[0] for timeseries in periods)
+    solutions = _solve_windows(windows, period_starts, chronological, pool)
+    if not all(s['success'] for s in solutions):
+        return (solutions, [])
+    capacity = shared_capacity(solutions)
+    redo = [
+        i for (i, solution) in enumerate(solutions)
+        if not _capacity_agrees(solution, capacity)]
+    if not redo:
+        return (solutions, [])
+    if chronological:
+        # Later windows start from the commitment of the ones redone.
+        redo = range(redo[0], len(windows))
+    previous = solutions[redo[0] - 1] if chronological and redo[0] else None
+    new_solutions = _solve_windows(
+        [windows[i] for i in redo], period_starts, chronological, pool,
+        capacity, previous)
+    resolved = []
+    for (i, solution) in zip(redo, new_solutions):
+        resolved.append(solutions[i])
+        solutions[i] = solution
+    return (solutions, resolved)
+
+
+def _solve_windows(windows, period_starts, chronological, pool,
+                   capacity=None, previous=None):
+    if not chronological:
+        tasks = [
+            (window, kept, False, None, capacity)
+            for (window, kept) in windows]
+        if pool is not None:
+            return pool.map(_solve_window, tasks, chunksize=1)
+        return [_solve_window(task) for task in tasks]
+    solutions = []
+    initial_commit = previous['terminal_commit'] if previous else None
+    for (window, kept) in windows:
+        if window[0] in period_starts:
+            # The first window of a period starts afresh.
+            initial_commit = None
+        solution = _solve_window(
+            (window, kept, True, initial_commit, capacity))
+        solutions.append(solution)
+        if not solution['success']:
+            break
+        initial_commit = solution['terminal_commit']
+    return solutions
+
+
+# Capacity variables that windows choose separately.
+CAPACITY_VARIABLES = ['BuildLocalTD', 'BuildTrans', 'BuildUnits']
+
+
+def shared_capacity(solutions):
+    """
+    Return the largest value of each capacity variable in the solutions
+    of the windows, as {name: {key: value}}. More capacity never makes
+    a window infeasible, so these values are feasible for every window.
+    """
+    capacity = {}
+    for solution in solutions:
+        for name in CAPACITY_VARIABLES:
+            for (key, val) in solution['values'].get(name, []):
+                values = capacity.setdefault(name, {})
+                values[key] = max(val, values.get(key, val))
+    return capacity
+
+
+def _capacity_agrees(solution, capacity):
+    return all(
+        switch_mod.utilities.approx_equal(
+            val, capacity[name][key], tolerance=1e-6)
+        for name in CAPACITY_VARIABLES
+        for (key, val) in solution['values'].get(name, []))
+
+
+def _init_worker(inputs_dir, model_args, settings):
+    """
+    Read the inputs once for this process. Worker processes forked from
+    the main process already hold them.
+    """
+    if _worker_state.get('inputs_dir') == inputs_dir:
+        return
+    switch_model = switch_mod.solve.define_model(inputs_dir, model_args)
+    data = switch_mod.utilities._load_data_portal(switch_model, inputs_dir)
+    if not switch_model.options.skip_input_validation:
+        switch_mod.utilities.validate_inputs(switch_model, data)
+    _worker_state.clear()
+    _worker_state.update(
+        inputs_dir=inputs_dir, model=switch_model, portal=data,
+        kinds=switch_mod.myopic.data_kinds(switch_model, data.data()),
+        opt=switch_mod.utilities.make_solver(settings))
+
+
+def _solve_window(task):
+    """
+    Construct and solve the instance for one window and return its
+    solution as a dictionary of plain values, which can be sent back
+    from a worker process. The capacity variables are fixed at the
+    values in capacity ({name: {key: value}}) if it is given.
+    """
+    (window, kept, chronological, initial_commit, capacity) = task
+    switch_model = _worker_state['model']
+    full_data = _worker_state['portal'].data()
+    (data, factor) = window_data(
+        full_data, _worker_state['kinds'], window, chronological,
+        initial_commit)
+    instance = switch_mod.utilities._create_instance(
+        switch_model, {None: data}, _worker_state['portal'].dense_params)
+    for (name, values) in (capacity or {}).iteritems():
+        var = getattr(instance, name)
+        for (key, val) in values.iteritems():
+            if key in var:
+                var[key].fix(val)
+    start = time.time()
+    results = switch_mod.solve.solve_instance(
+        switch_model, instance, _worker_state['opt'])
+    solution = {
+        'window': window,
+        'solve_time': time.time() - start,
+        'termination_condition': str(results.solver.termination_condition),
+        'success': switch_mod.utilities.load_solution(instance, results),
+        'values': {}, 'duals': {}, 'terminal_commit': {},
+    }
+    if not solution['success']:
+        return solution
+
+    members = switch_mod.myopic.timeseries_members(full_data, kept)
+    if chronological:
+        # Timeseries of the window were joined under the first one.
+        members['TIMESERIES'].add(window[0])
+    names = [var.name for var in instance.component_objects(Var)]
+    kinds = switch_mod.myopic.data_kinds(switch_model, names)
+    for name in names:
+        key_kinds = kinds[name][0]
+        solution['values'][name] = [
+            (key, var.value)
+            for (key, var) in getattr(instance, name).iteritems()
+            if var.value is not None and (
+                not key_kinds or
+                switch_mod.myopic.key_selected(key, key_kinds, members))]
+    if hasattr(instance, 'dual'):
+        duals = solution['duals']
+        for (con, dual) in instance.dual.iteritems():
+            name = con.parent_component().name
+            duals.setdefault(name, []).append((con.index(), dual / factor))
+        kinds = switch_mod.myopic.data_kinds(switch_model, duals)
+        for (name, items) in duals.items():
+            key_kinds = kinds[name][0]
+            if key_kinds:
+                duals[name] = [
+                    (key, dual) for (key, dual) in items
+                    if switch_mod.myopic.key_selected(
+                        key, key_kinds, members)]
+    if hasattr(instance, 'CommitProject'):
+        last = [
+            tp for tp in instance.TIMEPOINTS
+            if tp in members['TIMEPOINTS']][-1]
+        solution['terminal_commit'] = dict(
+            (proj, instance.CommitProject[proj, t].value)
+            for (proj, t) in instance.PROJ_DISPATCH_POINTS if t == last)
+    return solution
+
+
+def load_window_solutions(instance, solutions):
+    """
+    Load the variable values and duals returned by _solve_window() onto
+    an instance of the whole model.
+    """
+    for solution in solutions:
+        for (name, items) in solution['values'].iteritems():
+            var = getattr(instance, name)
+            for (key, val) in items:
+                if key in var:
+                    var[key].value = val
+        if solution['duals']:
+            switch_mod.utilities.register_duals(instance)
+        for (name, items) in solution['duals'].iteritems():
+            con = getattr(instance, name)
+            for (key, dual) in items:
+                if key in con:
+                    instance.dual[con[key]] = dual
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,396 @@
+# Copyright 2016 The Switch Authors. All rights reserved.
+# Licensed under the Apache License, Version 2, which is in the LICENSE file.
+
+"""
+Scale the rows and columns of the linear program of a model instance
+before it is passed to the solver, and unscale the solution.
+
+The costs in the objective are discounted to present value with factors
+from switch_mod.financials, so capital costs of new projects and hourly
+variable costs in the same objective can differ by many orders of
+magnitude, and so can the coefficients of the constraints that mix
+capacity in MW with energy in MWh. Badly scaled problems take more
+simplex iterations and can fail numerically.
+
+ScaledProblem computes factors for each constraint row and each
+continuous variable with the geometric mean method (the one GLPK uses
+with --scale): each pass divides every row, and then every column, by
+the geometric mean of the largest and smallest magnitudes of its
+coefficients. The objective is scaled the same way. Factors are rounded
+to powers of 2 so scaling doesn't introduce rounding errors. The scaled
+problem is written in CPLEX LP format, and the values and duals read
+back from the solution file are converted to the units of the original
+model before they are stored on the instance. Integer variables are not
+scaled.
+
+solve() does all of this for GLPK and CBC, whose solution files are read
+with switch_mod.solution_reader. Commercial solvers scale problems
+internally and are solved without it.
+
+"""
+import math
+import os
+import tempfile
+
+import pyutilib.services
+from pyomo.core.base.symbol_map import SymbolMap
+from pyomo.environ import Constraint, Objective, maximize, value
+from pyomo.repn import canonical_is_nonlinear, generate_canonical_repn
+from pyomo.solvers.plugins.solvers.CBCplugin import CBCSHELL
+from pyomo.solvers.plugins.solvers.GLPK import GLPKSHELL
+
+from switch_mod import solution_reader
+
+
+def solve(opt, instance, passes=4, variables=None, duals=None, **kwds):
+    """
+    Scale the linear program of instance, solve it with opt and load the
+    unscaled solution onto the instance, like solution_reader.solve(),
+    and return the results. passes is the number of rounds of row and
+    column scaling. Solvers other than GLPK and CBC are passed the
+    instance without scaling, unless it has matrix constraints (see
+    switch_mod.matrix_constraints), which only this module can write.
+    With warmstart=True, CBC is given the values of the integer
+    variables as a MIP start, which need no scaling since integer
+    columns are never scaled.
+    """
+    if not isinstance(opt, (GLPKSHELL, CBCSHELL)):
+        if getattr(instance, 'matrix_constraints', None):
+            raise ValueError(
+                "Instances with matrix constraints can only be solved with "
+                "GLPK or CBC.")
+        return solution_reader.solve(opt, instance, variables, duals, **kwds)
+    problem = ScaledProblem(instance, passes)
+    (fd, path) = tempfile.mkstemp(
+        suffix='.lp', dir=pyutilib.services.TempfileManager.tempdir)
+    os.close(fd)
+    try:
+        problem.write(path)
+        results = solution_reader.solve_with_loader(
+            opt, path, lambda: problem.loader(variables, duals),
+            lambda: (('x{}'.format(j), var)
+                     for (j, var) in enumerate(problem.variables)),
+            **kwds)
+    finally:
+        if os.path.exists(path):
+            os.remove(path)
+    problem.unscale_bounds(results)
+    return results
+
+
+class ScaledProblem(object):
+    """
+    The linear program of an instance, as lists of the rows and columns
+    that appear in its active constraints and objective, with scaling
+    factors for each of them. Row i is
+    lower[i] <= sum(coefs[i][k] * x[cols[i][k]]) <= upper[i], with None
+    for a missing bound. Scaled column j holds the value of variable j
+    divided by col_scale[j], scaled row i is row i multiplied by
+    row_scale[i] and the scaled objective is the objective multiplied by
+    obj_scale. The rows of matrix constraints come after the rows of the
+    Pyomo constraints, and are identified in self.constraints by the
+    matrix constraint and the position of the row in it. With passes=0,
+    the problem is written without scaling.
+    """
+
+    def __init__(self, instance, passes=4):
+        self.instance = instance
+        self.variables = []
+        self.constraints = []
+        self.rows = []
+        self.lower = []
+        self.upper = []
+        col_index = {}
+
+        def columns(repn):
+            if canonical_is_nonlinear(repn):
+                raise ValueError("Only linear programs can be scaled.")
+            if repn.linear is None:
+                return ([], [])
+            cols = []
+            for var in repn.variables:
+                j = col_index.get(id(var))
+                if j is None:
+                    j = col_index[id(var)] = len(self.variables)
+                    self.variables.append(var)
+                cols.append(j)
+            return (cols, [float(a) for a in repn.linear])
+
+        objectives = list(instance.component_data_objects(
+            Objective, active=True))
+        if len(objectives) != 1:
+            raise ValueError("The instance must have exactly one objective.")
+        self.objective = objectives[0]
+        repn = generate_canonical_repn(self.objective.expr)
+        self.obj_row = columns(repn)
+        self.obj_constant = float(repn.constant or 0.0)
+        for con in instance.component_data_objects(Constraint, active=True):
+            repn = generate_canonical_repn(con.body)
+            (cols, coefs) = columns(repn)
+            if not cols:
+                continue
+            constant = float(repn.constant or 0.0)
+            self.constraints.append(con)
+            self.rows.append((cols, coefs))
+            self.lower.append(
+                None if con.lower is None else value(con.lower) - constant)
+            self.upper.append(
+                None if con.upper is None else value(con.upper) - constant)
+        # Rows of the constraints that switch_mod.matrix_constraints
+        # generates as sparse arrays are identified by the constraint
+        # and the position of the row in it.
+        for name in getattr(instance, 'matrix_constraints', []):
+            family = getattr(instance, name)
+            sparse = family.matrix()
+            col_map = []
+            for var in sparse.variables:
+                j = col_index.get(id(var))
+                if j is None:
+                    j = col_index[id(var)] = len(self.variables)
+                    self.variables.append(var)
+                col_map.append(j)
+            for k in range(len(family)):
+                (cols, coefs) = sparse.row(k)
+                if not cols:
+                    continue
+                self.constraints.append((family, k))
+                self.rows.append(([col_map[j] for j in cols], list(coefs)))
+                self.lower.append(
+                    None if sparse.lower[k] == -_INF else sparse.lower[k])
+                self.upper.append(
+                    None if sparse.upper[k] == _INF else sparse.upper[k])
+        self.compute_scaling(passes)
+
+    def compute_scaling(self, passes):
+        """Set the scaling factors, starting from an unscaled problem."""
+        self.row_scale = [1.0] * len(self.rows)
+        self.col_scale = [1.0] * len(self.variables)
+        scalable = [var.is_continuous() for var in self.variables]
+        for _ in range(passes):
+            for (i, (cols, coefs)) in enumerate(self.rows):
+                self.row_scale[i] = _geometric_mean_factor(
+                    abs(a) * self.col_scale[j] for (j, a) in zip(cols, coefs))
+            col_min = [float('inf')] * len(self.variables)
+            col_max = [0.0] * len(self.variables)
+            for (i, (cols, coefs)) in enumerate(self.rows):
+                r = self.row_scale[i]
+                for (j, a) in zip(cols, coefs):
+                    a = abs(a) * r
+                    if a > 0:
+                        col_min[j] = min(col_min[j], a)
+                        col_max[j] = max(col_max[j], a)
+            for j in range(len(self.variables)):
+                if scalable[j] and col_max[j] > 0:
+                    self.col_scale[j] = _power_of_2(
+                        1.0 / math.sqrt(col_min[j] * col_max[j]))
+        (cols, coefs) = self.obj_row
+        self.obj_scale = 1.0
+        if passes > 0:
+            self.obj_scale = _geometric_mean_factor(
+                abs(a) * self.col_scale[j] for (j, a) in zip(cols, coefs))
+
+    def coefficient_range(self, scaled=True):
+        """
+        Return the smallest and largest magnitudes of the nonzero
+        constraint coefficients, after scaling if scaled is True.
+        """
+        smallest = float('inf')
+        largest = 0.0
+        for (i, (cols, coefs)) in enumerate(self.rows):
+            r = self.row_scale[i] if scaled else 1.0
+            for (j, a) in zip(cols, coefs):
+                a = abs(a) * r * (self.col_scale[j] if scaled else 1.0)
+                if a > 0:
+                    smallest = min(smallest, a)
+                    largest = max(largest, a)
+        return (smallest, largest)
+
+    def write(self, path):
+        """Write the scaled problem to path in CPLEX LP format."""
+        with open(path, 'w') as f:
+            f.write('\\* Scaled problem of model {} *\\\n\n'.format(
+                self.instance.name))
+            f.write('max\n' if self.objective.sense == maximize else 'min\n')
+            f.write('obj:\n')
+            (cols, coefs) = self.obj_row
+            s = self.obj_scale
+            for (j, a) in zip(cols, coefs):
+                f.write(_term(a * self.col_scale[j] * s, j))
+            # The constant term is the coefficient of a variable fixed at
+            # 1, as in the files Pyomo writes, so the objective value that
+            # the solver reports is complete.
+            f.write(_term(self.obj_constant * s, None))
+            f.write('\n')
+            f.write('s.t.\n\n')
+            for (i, (cols, coefs)) in enumerate(self.rows):
+                r = self.row_scale[i]
+                terms = ''.join(
+                    _term(a * r * self.col_scale[j], j)
+                    for (j, a) in zip(cols, coefs))
+                (lower, upper) = (self.lower[i], self.upper[i])
+                if lower is not None and lower == upper:
+                    f.write('c_e_r{}_:\n{}= {!r}\n\n'.format(
+                        i, terms, lower * r))
+                elif upper is None:
+                    f.write('c_l_r{}_:\n{}>= {!r}\n\n'.format(
+                        i, terms, lower * r))
+                elif lower is None:
+                    f.write('c_u_r{}_:\n{}<= {!r}\n\n'.format(
+                        i, terms, upper * r))
+                else:
+                    f.write('r_l_r{}_:\n{}>= {!r}\n\n'.format(
+                        i, terms, lower * r))
+                    f.write('r_u_r{}_:\n{}<= {!r}\n\n'.format(
+                        i, terms, upper * r))
+            f.write('bounds\n')
+            f.write('   1 <= ONE_VAR_CONSTANT <= 1\n')
+            integers = []
+            binaries = []
+            for (j, var) in enumerate(self.variables):
+                c = self.col_scale[j]
+                lb = '-inf' if var.lb is None else repr(var.lb / c)
+                ub = '+inf' if var.ub is None else repr(var.ub / c)
+                f.write('   {} <= x{} <= {}\n'.format(lb, j, ub))
+                if var.is_binary():
+                    binaries.append(j)
+                elif var.is_integer():
+                    integers.append(j)
+            if integers:
+                f.write('general\n')
+                f.write(''.join('  x{}\n'.format(j) for j in integers))
+            if binaries:
+                f.write('binary\n')
+                f.write(''.join('  x{}\n'.format(j) for j in binaries))
+            f.write('end\n')
+
+    def symbol_map(self):
+        """
+        Return a symbol map from the row and column labels of the scaled
+        problem to the constraints and variables of the instance.
+        """
+        symbol_map = SymbolMap()
+        for (j, var) in enumerate(self.variables):
+            symbol_map.addSymbol(var, 'x{}'.format(j))
+        for (i, con) in enumerate(self.constraints):
+            if isinstance(con, tuple):
+                # Rows of matrix constraints are handled by the loader.
+                continue
+            symbol_map.addSymbol(con, 'r{}'.format(i))
+            (lower, upper) = (self.lower[i], self.upper[i])
+            if lower is not None and lower == upper:
+                prefixes = ['c_e_']
+            elif upper is None:
+                prefixes = ['c_l_']
+            elif lower is None:
+                prefixes = ['c_u_']
+            else:
+                prefixes = ['r_l_', 'r_u_']
+            for prefix in prefixes:
+                symbol_map.alias(con, '{}r{}_'.format(prefix, i))
+        return symbol_map
+
+    def loader(self, variables=None, duals=None):
+        """
+        Return a solution_reader.SolutionLoader that unscales the values
+        and duals of the scaled problem.
+        """
+        return _ScaledSolutionLoader(self, variables, duals)
+
+    def unscale_bounds(self, results):
+        """Convert the objective bounds in results to the original units."""
+        for name in ('lower_bound', 'upper_bound'):
+            bound = getattr(results.problem, name)
+            if bound is not None and abs(bound) != float('inf'):
+                setattr(results.problem, name, bound / self.obj_scale)
+
+
+class _ScaledSolutionLoader(solution_reader.SolutionLoader):
+
+    def __init__(self, problem, variables=None, duals=None):
+        solution_reader.SolutionLoader.__init__(
+            self, problem.instance, problem.symbol_map(), variables, duals)
+        self.col_scale = problem.col_scale
+        self.row_scale = problem.row_scale
+        self.obj_scale = problem.obj_scale
+        # Duals of the rows of matrix constraints, which aren't in the
+        # symbol map, are collected by row and stored in finish().
+        self.matrix_rows = {}
+        self.matrix_duals = {}
+        if hasattr(problem.instance, 'dual'):
+            for (i, con) in enumerate(problem.constraints):
+                if isinstance(con, tuple) and (
+                        duals is None or con[0].name in duals):
+                    self.matrix_rows[i] = con
+
+    def set_value(self, label, text):
+        ref = self.var_refs.get(label)
+        if ref is not None:
+            ref().value = float(text) * self.col_scale[int(label[1:])]
+
+    @property
+    def wants_duals(self):
+        return len(self.con_refs) > 0 or len(self.matrix_rows) > 0
+
+    def set_dual(self, label, text):
+        # Labels are like c_e_r12_.
+        i = int(label[5:-1])
+        dual = float(text) * self.row_scale[i] / self.obj_scale
+        if i in self.matrix_rows:
+            # As in SolutionLoader, the dual of a range constraint is the
+            # one of its two rows with the larger magnitude.
+            if abs(dual) >= abs(self.matrix_duals.get(i, 0.0)):
+                self.matrix_duals[i] = dual
+        else:
+            solution_reader.SolutionLoader.set_dual(self, label, dual)
+
+    def finish(self):
+        solution_reader.SolutionLoader.finish(self)
+        for (i, dual) in self.matrix_duals.iteritems():
+            (family, k) = self.matrix_rows[i]
+            self.instance.dual[family[family.index[k]]] = dual
+        self.matrix_duals = {}
+
+
+_INF = float('inf')
+
+
+def _term(coef, j):
+    """
+    Return a line with one term of an LP file for column j, or for the
+    constant column if j is None.
+
+    >>> _term(0.5, 3)
+    '+0.5 x3\\n'
+    >>> _term(-2.0, None)
+    '-2.0 ONE_VAR_CONSTANT\\n'
+    """
+    name = 'ONE_VAR_CONSTANT' if j is None else 'x{}'.format(j)
+    return '{}{!r} {}\n'.format('+' if coef >= 0 else '', coef, name)
+
+
+def _geometric_mean_factor(magnitudes):
+    """
+    Return the power of 2 closest to 1 / sqrt(smallest * largest) for
+    the nonzero values in magnitudes, or 1 if there are none.
+    """
+    smallest = float('inf')
+    largest = 0.0
+    for a in magnitudes:
+        if a > 0:
+            if a < smallest:
+                smallest = a
+            if a > largest:
+                largest = a
+    if largest == 0:
+        return 1.0
+    return _power_of_2(1.0 / math.sqrt(smallest * largest))
+
+
+def _power_of_2(x):
+    """
+    >>> _power_of_2(0.3)
+    0.25
+    >>> _power_of_2(1000.0)
+    1024.0
+    """
+    return 2.0 ** round(math.log(x, 2))
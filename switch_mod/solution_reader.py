@@ -0,0 +1,447 @@
+# Copyright 2016 The Switch Authors. All rights reserved.
+# Licensed under the Apache License, Version 2, which is in the LICENSE file.
+
+"""
+Read the solution files written by GLPK and CBC directly onto a model
+instance.
+
+Pyomo normally parses the whole solution file into a SolverResults
+object, with a dictionary for every variable and constraint, and then
+looks up each entry in the symbol map again when the solution is loaded
+onto the instance. For models with millions of variables these two
+steps can take longer than the solve. solve() replaces the parser of
+the solver plugin for one call with a streaming reader that assigns
+values from the file to the variables as it goes. It can also be told
+to load values only for some variable components and duals only for
+some constraints, e.g., the ones listed in model.dual_constraints by
+the modules that use them.
+
+The results returned by solve() hold the solver status, termination
+condition and objective bounds but no solution, so passing them on to
+utilities.save_results() or utilities.load_solution() leaves the values
+that were already loaded in place. Solvers other than GLPK (4.42 or
+later) and CBC with its native solution format are solved and loaded
+the usual way.
+
+The CBC plugin of Pyomo doesn't accept warm starts, so with
+warmstart=True solve() writes the values of the integer variables to a
+MIP start file with the labels of the problem file instead and passes it
+to CBC with -mipstart. warm_start_capable() tells whether a solver can
+be given a warm start this way or by its own plugin; GLPK can't.
+
+export_problem() and ingest_solution() split a solve into two steps, so
+the problem can be solved by a solver on another machine or by a
+scheduler outside Python. export_problem() writes the problem in CPLEX
+LP format to a directory along with the labels of its rows and columns
+and a fingerprint of the instance. After the solver has written its
+solution to the same directory, ingest_solution() reads it onto an
+instance built again from the same code and inputs:
+
+    cbc problem.lp -solve -printingOptions all -solu problem.soln
+    glpsol --lp problem.lp --write problem.raw --wglp problem.glp
+
+"""
+import cPickle
+import gzip
+import itertools
+import os
+
+import pyutilib.services
+from pyomo.core.base.symbol_map import SymbolMap
+from pyomo.environ import Constraint, Var
+from pyomo.opt import (
+    ResultsFormat, SolutionStatus, SolverResults, TerminationCondition)
+from pyomo.solvers.plugins.solvers.CBCplugin import CBCSHELL
+from pyomo.solvers.plugins.solvers.GLPK import GLPKSHELL
+
+
+def warm_start_capable(opt):
+    """
+    Return True if solve() can pass a warm start to opt: CBC, which is
+    given a MIP start file, or a solver whose plugin accepts warm starts.
+    """
+    return isinstance(opt, CBCSHELL) or opt.warm_start_capable()
+
+
+def solve(opt, instance, variables=None, duals=None, **kwds):
+    """
+    Solve instance with opt and load the solution, like opt.solve(), and
+    return the results. variables is a list of names of the variable
+    components to load values for, or None to load all of them. duals is
+    a list of names of the constraints to load duals for, or None to
+    load duals for all constraints; duals are only loaded for linear
+    programs and if the instance has a dual suffix. Other keyword
+    arguments are passed on to opt.solve().
+    """
+    if not isinstance(opt, (GLPKSHELL, CBCSHELL)):
+        return opt.solve(instance, **kwds)
+
+    def columns():
+        by_object = instance.solutions.symbol_map[opt._smap_id].byObject
+        return (
+            (by_object[id(var)], var)
+            for var in instance.component_data_objects(Var)
+            if id(var) in by_object)
+
+    return solve_with_loader(
+        opt, instance, lambda: SolutionLoader(
+            instance, instance.solutions.symbol_map[opt._smap_id],
+            variables, duals),
+        columns, load_solutions=False, **kwds)
+
+
+def solve_with_loader(opt, problem, make_loader, columns=None, **kwds):
+    """
+    Solve problem, which is a model instance or the path of a problem
+    file, with opt, which must be a GLPK or CBC solver plugin, and pass
+    the values in the solution file to the loader returned by
+    make_loader() (a SolutionLoader). Returns the results. With
+    warmstart=True, the solver must be CBC, and columns() must return
+    (label, variable) pairs for the columns of the problem file once it
+    has been written; the values of the integer variables among them are
+    passed to CBC as a MIP start.
+    """
+    if isinstance(opt, GLPKSHELL):
+        reader = lambda results, loader: read_glpk_solution(
+            opt._glpfile, opt._rawfile, results, loader)
+    elif isinstance(opt, CBCSHELL):
+        reader = lambda results, loader: read_cbc_solution(
+            opt._soln_file, results, loader)
+    else:
+        raise ValueError(
+            "Solution files of the {} solver can't be read directly.".format(
+                opt.name))
+
+    def process_soln_file(results):
+        if opt._results_format is not ResultsFormat.soln:
+            return type(opt).process_soln_file(opt, results)
+        loader = make_loader()
+        reader(results, loader)
+        loader.finish()
+
+    opt.process_soln_file = process_soln_file
+    if kwds.pop('warmstart', False):
+        if not isinstance(opt, CBCSHELL):
+            raise ValueError(
+                "The {} solver does not accept warm starts.".format(opt.name))
+
+        def create_command_line(executable, problem_files):
+            command = type(opt).create_command_line(
+                opt, executable, problem_files)
+            path = pyutilib.services.TempfileManager.create_tempfile(
+                suffix='.mst')
+            write_cbc_mip_start(path, columns())
+            # The plugin puts the options before -import, but CBC reads
+            # the MIP start for the problem that is already loaded.
+            i = command.cmd.index('-solve')
+            command.cmd[i:i] = ['-mipstart', path]
+            return command
+
+        opt.create_command_line = create_command_line
+    try:
+        return opt.solve(problem, **kwds)
+    finally:
+        del opt.process_soln_file
+        opt.__dict__.pop('create_command_line', None)
+
+
+def write_cbc_mip_start(path, columns):
+    """
+    Write a MIP start file for CBC with the values of the integer
+    variables among columns, (label, variable) pairs for the columns of
+    the problem file. Variables without a value are left out.
+    """
+    with open(path, 'w') as f:
+        f.write('Solution\n')
+        i = 0
+        for (label, var) in columns:
+            if var.value is None or var.is_continuous():
+                continue
+            f.write('{} {} {!r}\n'.format(i, label, var.value))
+            i += 1
+
+
+class SolutionLoader(object):
+    """
+    Assign values read from a solution file, identified by the labels
+    in the symbol map of the problem file, to variables and to the dual
+    suffix of the instance.
+    """
+
+    def __init__(self, instance, symbol_map, variables=None, duals=None):
+        self.instance = instance
+        if variables is None:
+            self.var_refs = symbol_map.bySymbol
+        else:
+            self.var_refs = {}
+            for name in variables:
+                for vardata in getattr(instance, name).itervalues():
+                    label = symbol_map.byObject.get(id(vardata))
+                    if label is not None:
+                        self.var_refs[label] = _Ref(vardata)
+        # Constraint rows are labeled with a prefix for the type of the
+        # constraint; range constraints have two rows.
+        self.con_refs = {}
+        self.range_duals = {}
+        if not hasattr(instance, 'dual'):
+            return
+        if duals is None:
+            for (label, ref) in symbol_map.aliases.iteritems():
+                if label[:2] in ('c_', 'r_'):
+                    self.con_refs[label] = ref
+        else:
+            for name in duals:
+                for condata in getattr(instance, name).itervalues():
+                    symbol = symbol_map.byObject.get(id(condata))
+                    if symbol is None:
+                        continue
+                    ref = _Ref(condata)
+                    for prefix in ('c_e_', 'c_l_', 'c_u_', 'r_l_', 'r_u_'):
+                        self.con_refs[prefix + symbol + '_'] = ref
+
+    @property
+    def wants_duals(self):
+        return len(self.con_refs) > 0
+
+    def set_value(self, label, text):
+        ref = self.var_refs.get(label)
+        if ref is not None:
+            ref().value = float(text)
+
+    def set_dual(self, label, text):
+        ref = self.con_refs.get(label)
+        if ref is None:
+            return
+        if label[:2] == 'r_':
+            # Only the dual with the larger magnitude of the two rows of a
+            # range constraint is kept (the other should be zero).
+            duals = self.range_duals.setdefault(label[4:], [ref, 0.0])
+            if abs(float(text)) > abs(duals[1]):
+                duals[1] = float(text)
+        else:
+            self.instance.dual[ref()] = float(text)
+
+    def finish(self):
+        for (ref, dual) in self.range_duals.itervalues():
+            self.instance.dual[ref()] = dual
+        self.range_duals = {}
+
+
+class _Ref(object):
+    """Strong reference with the call interface of a weakref."""
+    __slots__ = ('obj',)
+
+    def __init__(self, obj):
+        self.obj = obj
+
+    def __call__(self):
+        return self.obj
+
+
+# GLPK's solution status codes
+_GLPK_STATUS = {
+    1: SolutionStatus.other,        # undefined
+    2: SolutionStatus.feasible,
+    3: SolutionStatus.infeasible,
+    4: SolutionStatus.infeasible,   # no feasible solution exists
+    5: SolutionStatus.optimal,
+    6: SolutionStatus.unbounded,
+}
+
+
+def read_glpk_solution(glp_path, raw_path, results, loader):
+    """
+    Read the row and column names from the problem file that glpsol
+    wrote with --wglp and the solution that it wrote with --write (the
+    same files the GLPK plugin reads), setting the termination condition
+    and objective bounds of results and passing values to loader.
+    """
+    row_names = []
+    col_names = []
+    with open(glp_path, 'r') as f:
+        (pprob, ptype, psense, prows, pcols, pnonz) = f.readline().split()
+        is_integer = (ptype == 'mip')
+        for line in f:
+            if line[:2] == 'n ':
+                tokens = line.split()
+                if tokens[1] == 'i':
+                    row_names.append(tokens[3])
+                elif tokens[1] == 'j':
+                    col_names.append(tokens[3])
+    with open(raw_path, 'r') as f:
+        (prows, pcols) = [int(t) for t in f.readline().split()]
+        if is_integer:
+            (pstat, obj_val) = f.readline().split()
+        else:
+            (pstat, dstat, obj_val) = f.readline().split()
+        status = _GLPK_STATUS[int(pstat)]
+        solv = results.solver
+        if status is SolutionStatus.infeasible:
+            solv.termination_condition = TerminationCondition.infeasible
+            return
+        if status is SolutionStatus.unbounded:
+            solv.termination_condition = TerminationCondition.unbounded
+            return
+        if status not in (SolutionStatus.optimal, SolutionStatus.feasible):
+            if solv.termination_condition == TerminationCondition.unknown:
+                solv.termination_condition = TerminationCondition.other
+            return
+        solv.termination_condition = TerminationCondition.optimal
+        results.problem.lower_bound = float(obj_val)
+        results.problem.upper_bound = float(obj_val)
+        rows = itertools.islice(f, prows)
+        if is_integer or not loader.wants_duals:
+            for line in rows:
+                pass
+        else:
+            for (name, line) in itertools.izip(row_names, rows):
+                loader.set_dual(name, line.split()[2])
+        cols = itertools.islice(f, pcols)
+        if is_integer:
+            for (name, line) in itertools.izip(col_names, cols):
+                loader.set_value(name, line)
+        else:
+            for (name, line) in itertools.izip(col_names, cols):
+                loader.set_value(name, line.split()[1])
+
+
+def read_cbc_solution(soln_path, results, loader):
+    """
+    Read a solution file in CBC's native format: a status line followed
+    by one line per constraint row and one line per variable, each with
+    an index, a name, a value and a dual value or reduced cost. Rows are
+    told from columns by the c_ and r_ prefixes of their labels, since
+    unless CBC is run with -printingOptions all (as the Pyomo plugin
+    does) it writes only the nonzero columns and no rows. The
+    termination condition of results is set from the status line and
+    values are passed to loader. Raises ValueError if the file holds a
+    solution but no columns.
+    """
+    solv = results.solver
+    # The plugin adds a solution with the objective value while reading
+    # the log; values are loaded directly instead.
+    results.solution.clear()
+    if solv.termination_condition is TerminationCondition.infeasible:
+        return
+    columns = 0
+    with open(soln_path, 'r') as f:
+        status = f.readline().split()
+        if status and (
+                status[0] in ('Infeasible', 'PrimalInfeasible') or
+                status[:2] == ['Integer', 'infeasible']):
+            solv.termination_condition = TerminationCondition.infeasible
+            return
+        if status and (
+                status[0] == 'Unbounded' or status[:2] == ['Dual', 'infeasible']
+                or (len(status) > 2 and status[0] == 'Problem' and
+                    status[2] == 'unbounded')):
+            solv.termination_condition = TerminationCondition.unbounded
+            return
+        if status and status[0] == 'Optimal':
+            solv.termination_condition = TerminationCondition.optimal
+        for line in f:
+            tokens = line.split()
+            if tokens[0] == '**':
+                # Marks rows and columns that are infeasible.
+                tokens = tokens[1:]
+            if tokens[1][:2] in ('c_', 'r_'):
+                if loader.wants_duals:
+                    loader.set_dual(tokens[1], tokens[3])
+            else:
+                loader.set_value(tokens[1], tokens[2])
+                columns += 1
+    if columns == 0:
+        raise ValueError(
+            "The CBC solution file {} has no variable values.".format(
+                soln_path))
+
+
+PROBLEM_FILE = 'problem.lp'
+PROBLEM_INFO_FILE = 'problem_info.pkl.gz'
+
+
+class SolutionMismatchError(Exception):
+    """
+    Raised when a solution is ingested onto an instance that differs
+    from the one whose problem was exported.
+    """
+    pass
+
+
+def export_problem(instance, problem_dir, fingerprint):
+    """
+    Write instance to problem.lp in problem_dir, along with the labels
+    of its rows and columns and the fingerprint that identifies the
+    instance (e.g., from utilities.model_fingerprint()) in
+    problem_info.pkl.gz. Returns the path of the problem file.
+    """
+    if not os.path.exists(problem_dir):
+        os.makedirs(problem_dir)
+    problem_path = os.path.join(problem_dir, PROBLEM_FILE)
+    (problem_path, smap_id) = instance.write(problem_path)
+    symbol_map = instance.solutions.symbol_map[smap_id]
+    # Components are recorded by name and index, since the objects will
+    # be different when the instance is built again.
+    symbols = {}
+    for ctype in (Var, Constraint):
+        for component in instance.component_objects(ctype):
+            for (index, obj) in component.iteritems():
+                symbol = symbol_map.byObject.get(id(obj))
+                if symbol is not None:
+                    symbols[symbol] = (component.name, index)
+    aliases = {}
+    for (alias, ref) in symbol_map.aliases.iteritems():
+        symbol = symbol_map.byObject.get(id(ref()))
+        if symbol in symbols:
+            aliases[alias] = symbol
+    info = {
+        'version': 1,
+        'fingerprint': fingerprint,
+        'symbols': symbols,
+        'aliases': aliases,
+    }
+    with gzip.open(os.path.join(problem_dir, PROBLEM_INFO_FILE), 'wb') as fh:
+        cPickle.dump(info, fh, cPickle.HIGHEST_PROTOCOL)
+    return problem_path
+
+
+def ingest_solution(instance, problem_dir, fingerprint, variables=None,
+                    duals=None):
+    """
+    Read the solution that a solver wrote to problem_dir for a problem
+    saved there by export_problem() onto instance, and return a results
+    object with the termination condition and objective bounds, like
+    solve(). Reads a CBC solution from problem.soln or a GLPK solution
+    from problem.raw and problem.glp. variables and duals are as for
+    solve(). Raises SolutionMismatchError if the instance doesn't have
+    the fingerprint of the exported one and IOError if there is no
+    solution file.
+    """
+    with gzip.open(os.path.join(problem_dir, PROBLEM_INFO_FILE), 'rb') as fh:
+        info = cPickle.load(fh)
+    if info['fingerprint'] != fingerprint:
+        raise SolutionMismatchError(
+            "The problem in {} was exported from a different model, "
+            "inputs or options.".format(problem_dir))
+    symbol_map = SymbolMap()
+    for (symbol, (name, index)) in info['symbols'].iteritems():
+        symbol_map.addSymbol(getattr(instance, name)[index], symbol)
+    for (alias, symbol) in info['aliases'].iteritems():
+        symbol_map.alias(symbol_map.bySymbol[symbol](), alias)
+
+    results = SolverResults()
+    loader = SolutionLoader(instance, symbol_map, variables, duals)
+    soln_path = os.path.join(problem_dir, 'problem.soln')
+    raw_path = os.path.join(problem_dir, 'problem.raw')
+    if os.path.isfile(soln_path):
+        read_cbc_solution(soln_path, results, loader)
+    elif os.path.isfile(raw_path):
+        read_glpk_solution(
+            os.path.join(problem_dir, 'problem.glp'), raw_path, results,
+            loader)
+    else:
+        raise IOError(
+            "No solution file (problem.soln or problem.raw) in {}.".format(
+                problem_dir))
+    loader.finish()
+    return results
@@ -5,15 +5,116 @@
 Command line front-end for running the Switch model solver.
 
 Usage:  python -m switch_mod.solve [ARGS]
+
+With --inputs-db and --scenario-id, inputs are read from the tables of
+an SQLite database instead of from files (see utilities.DatabaseInputs).
+With --results-db and --scenario-id, the solution is also written to
+the tables of an SQLite database, replacing any results saved earlier
+for the same scenario (see switch_mod.export.database).
+
+With --from-snapshot, the solution saved by --save-solution-snapshot in
+a previous run is attached to the new instance and the output files are
+written again without solving, which is useful after changing export
+code.
+
+With --checkpoint, the constructed model instance is saved to a file
+and loaded from it on later runs with the same code, inputs and
+options, which skips construction when only solver settings or export
+code change between runs. Loading a checkpoint takes about 25% less
+time than constructing the instance, but saving it takes 1.5 to 2 times
+as long, so it is only worth it for inputs that are run several times.
+
+The solver and its settings (threads, time limit, MIP gap, LP algorithm,
+temporary file directory and other options) can be taken from a named
+profile in solver_profiles.ini (see utilities.solver_settings()) and
+overridden on the command line. The settings, construction and solve
+times and the solver's termination condition are written to
+run_metrics.tab in the outputs directory.
+
+With --fast-solution-reader, GLPK and CBC solution files are read
+directly onto the instance (see switch_mod.solution_reader), optionally
+only for the variables given with --load-vars. Duals are only read for
+the constraints that the modules registered (see
+utilities.register_duals()) and the ones given with --load-duals; if
+there are none, no duals are read unless a module adds a dual suffix
+of its own.
+
+With --export-problem, the constructed instance is written to a
+directory as an LP file for an external solver, and nothing is solved.
+Run the solver in that directory, e.g.,
+
+    cbc problem.lp -solve -printingOptions all -solu problem.soln
+    glpsol --lp problem.lp --write problem.raw --wglp problem.glp
+
+then run again with the same inputs and options and --ingest-solution
+to read the solution onto a new instance (from --checkpoint if one is
+given) and write the outputs. The directory holds a fingerprint of the
+code, inputs and options, so a solution is never read onto a different
+model (see switch_mod.solution_reader.export_problem()).
+
+With --scale-problem, the rows and columns of the linear program are
+scaled before it is written for GLPK or CBC, and the solution is
+unscaled as it is read, which helps when costs discounted to present
+value make coefficients differ by many orders of magnitude (see
+switch_mod.scaling).
+
+The experimental --matrix-constraints model option builds the energy
+balance and dispatch constraints that repeat for every timepoint as
+sparse arrays instead of Pyomo objects (see
+switch_mod.matrix_constraints). Such models are written by
+switch_mod.scaling, so they can only be solved with GLPK or CBC.
+
+With --relax-and-round, models with integer variables (e.g., discrete
+builds or unit commitment) are solved heuristically: the linear
+relaxation is solved, the integer variables are rounded and fixed, and
+the linear program is solved again, with a repair pass if the rounded
+solution is infeasible. With --mip-start, the rounded solution is then
+used as a warm start for solving the original model. The relaxation
+bound, objective values and gaps are written to run_metrics.tab (see
+switch_mod.relax_and_round).
+
+With --myopic, the investment periods are solved one at a time, in
+order, each with the capacity built in the earlier periods as existing
+capacity and no knowledge of the later ones. The inputs are read once,
+and the outputs of all periods are written to the usual files (see
+switch_mod.myopic).
+
+With --cache-dir, completed runs are stored in a cache directory under a
+fingerprint of the code, inputs, model options and solver settings (see
+utilities.model_fingerprint()), along with the output files that each
+run wrote. A later run with the same fingerprint copies the stored
+outputs to the outputs directory (and saves the stored
+solution to --results-db) instead of constructing and solving the model.
+After each new run is stored, entries older than --cache-max-age days
+are removed, followed by the least recently used ones until the cache is
+no larger than --cache-max-size megabytes.
+
+With --warm-start-from, the variable values saved in a previous outputs
+directory (or solution snapshot) are loaded onto the new instance before
+it is solved and passed to the solver as a starting point. CBC is given
+the values of the integer variables as a MIP start (see
+switch_mod.solution_reader); solvers that accept no warm start, such as
+GLPK, can't be used with --warm-start-from or --mip-start.
+
+Any arguments that are not recognized here are passed on to the model,
+so options defined by the Switch modules (such as --mutable-params) can
+be given on the same command line.
 """
 
 import argparse
 import os
+import sqlite3
 import sys
+import tempfile
+import time
 
-import pyomo.opt
-
+import switch_mod.export.database
+import switch_mod.myopic
+import switch_mod.relax_and_round
+import switch_mod.scaling
+import switch_mod.solution_reader
 import switch_mod.utilities
+from switch_mod.export.database import save_results_to_db
 
 
 def main(argv):
@@ -23,21 +124,255 @@ def main(argv):
     parser.add_argument(
         '--inputs-dir', type=str, default='inputs',
         help='Directory containing input files (default is "inputs")')
+    parser.add_argument(
+        '--inputs-db', type=str, default=None, metavar='FILE',
+        help='SQLite database to read inputs from instead of the inputs '
+             'directory (see utilities.DatabaseInputs for the layout)')
+    parser.add_argument(
+        '--scenario-id', type=int, default=None,
+        help='Scenario to read from --inputs-db or save to --results-db')
+    parser.add_argument(
+        '--results-db', type=str, default=None, metavar='FILE',
+        help='SQLite database to save the solution to, in addition to '
+             'the outputs directory')
     parser.add_argument(
         '--outputs-dir', type=str, default='outputs',
         help='Directory to write output files (default is "outputs")')
     parser.add_argument(
-        '--solver', type=str, default='glpk',
-        help='Linear program solver to use (default is "glpk")')
+        '--param-updates', nargs='+', default=[], metavar='FILE',
+        help='Tab files with new values for one parameter each. After the '
+             'base case is solved, each file is applied to the same '
+             'instance and the model is re-solved in place, with results '
+             'written to a subdirectory of the outputs directory named '
+             'after the file.')
+    parser.add_argument(
+        '--warm-start-from', type=str, default=None, metavar='OUTPUTS_DIR',
+        help='Outputs directory or solution snapshot file of a previous '
+             'run whose variable values should be used as the starting '
+             'point for this solve')
+    parser.add_argument(
+        '--from-snapshot', type=str, default=None, metavar='FILE',
+        help='Write outputs from a solution snapshot saved by a previous '
+             'run instead of solving the model')
+    parser.add_argument(
+        '--checkpoint', type=str, default=None, metavar='FILE',
+        help='Load the constructed model instance from this file if it '
+             'was saved from the same code, inputs and options, or '
+             'save it there after construction otherwise')
+    parser.add_argument(
+        '--cache-dir', type=str, default=None, metavar='DIR',
+        help='Directory for a cache of completed runs; a run whose code, '
+             'inputs and options match a cached one restores its outputs '
+             'instead of solving')
+    parser.add_argument(
+        '--cache-max-size', type=float, default=None, metavar='MB',
+        help='Remove the least recently used runs from --cache-dir when '
+             'it grows larger than this')
+    parser.add_argument(
+        '--cache-max-age', type=float, default=None, metavar='DAYS',
+        help='Remove runs from --cache-dir that have not been used for '
+             'this many days')
+    parser.add_argument(
+        '--fast-solution-reader', default=False, action='store_true',
+        help='Read GLPK and CBC solution files directly onto the instance '
+             'instead of through Pyomo\'s results object')
+    parser.add_argument(
+        '--load-vars', nargs='+', default=None, metavar='VAR',
+        help='With --fast-solution-reader, only load the values of these '
+             'variables')
+    parser.add_argument(
+        '--load-duals', nargs='+', default=None, metavar='CONSTRAINT',
+        help='Load the duals of these constraints, in addition to the '
+             'ones the modules use')
+    parser.add_argument(
+        '--scale-problem', default=False, action='store_true',
+        help='Scale the rows and columns of the problem before passing it '
+             'to GLPK or CBC, and unscale the solution')
+    parser.add_argument(
+        '--export-problem', type=str, default=None, metavar='DIR',
+        help='Write the problem to this directory for an external solver '
+             'instead of solving it')
+    parser.add_argument(
+        '--ingest-solution', type=str, default=None, metavar='DIR',
+        help='Read the solution that an external solver wrote to a '
+             'directory made by --export-problem and write the outputs')
+    parser.add_argument(
+        '--relax-and-round', default=False, action='store_true',
+        help='Solve the linear relaxation and round the integer '
+             'variables instead of solving the integer program')
+    parser.add_argument(
+        '--mip-start', default=False, action='store_true',
+        help='With --relax-and-round, solve the integer program from '
+             'the rounded solution as a warm start')
+    parser.add_argument(
+        '--myopic', default=False, action='store_true',
+        help='Solve one investment period at a time, carrying the '
+             'capacity built in each period over to the next')
     parser.add_argument(
         '--verbose', '-v', default=False, action='store_true',
         help='Dump data about internal workings to stdout')
-    args = parser.parse_args(argv)
+    switch_mod.utilities.add_solver_arguments(parser)
+    (args, model_args) = parser.parse_known_args(argv)
+    try:
+        settings = switch_mod.utilities.solver_settings(args)
+    except switch_mod.utilities.InputError as e:
+        parser.error(e.value)
+
+    param_updates = [
+        (path, switch_mod.utilities.load_param_updates(path))
+        for path in args.param_updates]
+    # Any parameter that will be updated must be mutable before the
+    # instance is constructed.
+    mutable_params = set(
+        name for (path, updates) in param_updates for name in updates)
 
-    (switch_model, switch_instance) = load(args.inputs_dir)
-    opt = pyomo.opt.SolverFactory(args.solver)
-    results = opt.solve(switch_instance, keepfiles=False, tee=False)
-    switch_model.save_results(results, switch_instance, args.outputs_dir)
+    db_inputs = None
+    if args.inputs_db is not None:
+        if args.scenario_id is None:
+            parser.error('--inputs-db requires --scenario-id.')
+        db_inputs = switch_mod.utilities.DatabaseInputs(
+            sqlite3.connect(args.inputs_db), args.scenario_id)
+    if args.results_db is not None and args.scenario_id is None:
+        parser.error('--results-db requires --scenario-id.')
+    if args.checkpoint is not None and db_inputs is not None:
+        parser.error('--checkpoint cannot be used with --inputs-db.')
+    if args.cache_dir is not None and db_inputs is not None:
+        parser.error('--cache-dir cannot be used with --inputs-db.')
+    if args.export_problem is not None and args.ingest_solution is not None:
+        parser.error(
+            '--export-problem cannot be used with --ingest-solution.')
+    offline = args.export_problem or args.ingest_solution
+    if offline is not None and db_inputs is not None:
+        parser.error('--export-problem and --ingest-solution cannot be '
+                     'used with --inputs-db.')
+    if args.mip_start and not args.relax_and_round:
+        parser.error('--mip-start requires --relax-and-round.')
+    if args.relax_and_round and args.warm_start_from is not None:
+        parser.error(
+            '--warm-start-from cannot be used with --relax-and-round.')
+    if args.myopic:
+        for (name, val) in [
+                ('--checkpoint', args.checkpoint),
+                ('--cache-dir', args.cache_dir),
+                ('--from-snapshot', args.from_snapshot),
+                ('--export-problem', args.export_problem),
+                ('--ingest-solution', args.ingest_solution),
+                ('--warm-start-from', args.warm_start_from),
+                ('--param-updates', args.param_updates or None),
+                ('--relax-and-round', args.relax_and_round or None)]:
+            if val is not None:
+                parser.error('{} cannot be used with --myopic.'.format(name))
+
+    switch_model = define_model(
+        args.inputs_dir, model_args, mutable_params, db_inputs)
+    if offline is not None and switch_model.options.matrix_constraints:
+        parser.error('--export-problem and --ingest-solution cannot be '
+                     'used with --matrix-constraints.')
+    if offline is not None:
+        solve_offline(switch_model, args, mutable_params)
+        return
+    if args.myopic:
+        solve_myopic(switch_model, args, settings, db_inputs)
+        return
+
+    opt = switch_mod.utilities.make_solver(settings)
+    if ((args.warm_start_from is not None or args.mip_start) and
+            not switch_mod.solution_reader.warm_start_capable(opt)):
+        sys.exit('The {} solver does not accept warm starts, so it cannot '
+                 'be used with --warm-start-from or --mip-start.'.format(
+                     settings['solver']))
+
+    fingerprint = None
+    if args.cache_dir is not None and args.from_snapshot is None:
+        fingerprint = result_fingerprint(
+            switch_model, args, settings, mutable_params)
+        snapshot_path = switch_mod.utilities.restore_cached_results(
+            args.cache_dir, fingerprint, args.outputs_dir)
+        if snapshot_path is not None:
+            if switch_mod.utilities.interactive_session:
+                print "Restored outputs of a cached run from {}.".format(
+                    args.cache_dir)
+            if args.results_db is not None:
+                switch_instance = construct(
+                    switch_model, args.inputs_dir, mutable_params,
+                    checkpoint=args.checkpoint)
+                switch_mod.utilities.load_solution_snapshot(
+                    switch_instance, snapshot_path)
+                save_to_results_db(switch_instance, args)
+            return
+        # Only the output files written from here on belong to this run.
+        output_times = switch_mod.utilities.output_file_times(
+            args.outputs_dir)
+
+    start = time.time()
+    switch_instance = construct(
+        switch_model, args.inputs_dir, mutable_params, db_inputs,
+        args.checkpoint)
+    construct_time = time.time() - start
+    if args.from_snapshot is not None:
+        switch_mod.utilities.load_solution_snapshot(
+            switch_instance, args.from_snapshot)
+        switch_mod.utilities.export_results(
+            switch_model, switch_instance, args.outputs_dir)
+        save_to_results_db(switch_instance, args)
+        return
+
+    solve_kwargs = {}
+    if args.warm_start_from is not None:
+        solve_kwargs = warm_start(switch_instance, args.warm_start_from)
+    start = time.time()
+    heuristic = {}
+    if args.relax_and_round:
+        (results, heuristic) = switch_mod.relax_and_round.solve(
+            switch_instance,
+            lambda instance, **kwds: solve_instance(
+                switch_model, instance, opt, args, **kwds),
+            args.mip_start)
+    else:
+        results = solve_instance(
+            switch_model, switch_instance, opt, args, **solve_kwargs)
+    solve_time = time.time() - start
+    success = switch_model.save_results(
+        results, switch_instance, args.outputs_dir)
+    metrics = dict(settings)
+    metrics.update(
+        solver_profile=args.solver_profile,
+        construct_time_s=round(construct_time, 2),
+        solve_time_s=round(solve_time, 2),
+        termination_condition=str(results.solver.termination_condition))
+    metrics.update(heuristic)
+    switch_mod.utilities.write_run_metrics(args.outputs_dir, metrics)
+    # Saving deletes the rows already stored for the scenario, so a
+    # failed solve must not replace them.
+    if success:
+        save_to_results_db(switch_instance, args)
+    snapshot_path = None
+    if fingerprint is not None and success:
+        # Keep the base solution for --results-db when this run is
+        # restored from the cache.
+        (fd, snapshot_path) = tempfile.mkstemp(suffix='.pkl.gz')
+        os.close(fd)
+        switch_mod.utilities.save_solution_snapshot(
+            switch_instance, snapshot_path)
+
+    for (path, updates) in param_updates:
+        case_name = os.path.splitext(os.path.basename(path))[0]
+        results = resolve(
+            switch_model, switch_instance, opt, updates,
+            os.path.join(args.outputs_dir, case_name), args)
+
+    if snapshot_path is not None:
+        try:
+            switch_mod.utilities.cache_results(
+                args.cache_dir, fingerprint, args.outputs_dir,
+                switch_mod.utilities.files_written_since(
+                    args.outputs_dir, output_times),
+                snapshot_path)
+        finally:
+            if os.path.exists(snapshot_path):
+                os.remove(snapshot_path)
+        switch_mod.utilities.evict_cached_results(
+            args.cache_dir, args.cache_max_size, args.cache_max_age)
 
     if args.verbose:
         # Print a dump of the results and model instance to standard output.
@@ -45,17 +380,276 @@ def main(argv):
         switch_instance.pprint()
 
 
-def load(inputs_dir):
-    try:
-        module_fh = open(os.path.join(inputs_dir, 'modules'), 'r')
-    except IOError, exc:
-        sys.exit('Failed to open input file: {}'.format(exc))
-    module_list = [line.rstrip('\n') for line in module_fh]
+def load(inputs_dir, args=[], mutable_params=[], db_inputs=None,
+         checkpoint=None):
+    """
+    Build the model for the modules listed in the inputs and construct
+    an instance from the inputs. If checkpoint is the path of a file,
+    the instance is loaded from that file when it was saved from the
+    same code, inputs and options, and saved to it otherwise (see
+    utilities.save_instance_checkpoint()). Checkpoints can't be used
+    with db_inputs.
+    """
+    switch_model = define_model(inputs_dir, args, mutable_params, db_inputs)
+    switch_instance = construct(
+        switch_model, inputs_dir, mutable_params, db_inputs, checkpoint)
+    return (switch_model, switch_instance)
+
+
+def define_model(inputs_dir, args=[], mutable_params=[], db_inputs=None):
+    """
+    Build the abstract model for the modules listed in the inputs, with
+    the named parameters made mutable.
+    """
+    if db_inputs is None:
+        try:
+            module_fh = open(os.path.join(inputs_dir, 'modules'), 'r')
+        except IOError, exc:
+            sys.exit('Failed to open input file: {}'.format(exc))
+        module_list = [line.rstrip('\n') for line in module_fh]
+    else:
+        # The modules table has a single module column.
+        module_list = [row[0] for row in db_inputs.rows('modules')]
 
     switch_model = switch_mod.utilities.define_AbstractModel(
-        'switch_mod', *module_list)
-    switch_instance = switch_model.load_inputs(inputs_dir=inputs_dir)
-    return (switch_model, switch_instance)
+        'switch_mod', *module_list, args=args)
+    switch_mod.utilities.make_params_mutable(switch_model, mutable_params)
+    return switch_model
+
+
+def construct(switch_model, inputs_dir, mutable_params=[], db_inputs=None,
+              checkpoint=None):
+    """
+    Construct an instance of a model built by define_model(), using the
+    checkpoint file if one is given (see load()).
+    """
+    if checkpoint is None:
+        return switch_model.load_inputs(
+            inputs_dir=inputs_dir, db_inputs=db_inputs)
+
+    fingerprint = switch_mod.utilities.model_fingerprint(
+        switch_model, inputs_dir, extra=sorted(mutable_params))
+    switch_instance = switch_mod.utilities.load_instance_checkpoint(
+        switch_model, checkpoint, fingerprint, inputs_dir)
+    if switch_instance is None:
+        switch_instance = switch_model.load_inputs(inputs_dir=inputs_dir)
+        switch_mod.utilities.save_instance_checkpoint(
+            switch_instance, checkpoint, fingerprint)
+    elif switch_mod.utilities.interactive_session:
+        print "Loaded model instance from checkpoint {}.".format(checkpoint)
+    return switch_instance
+
+
+def result_fingerprint(switch_model, args, settings, mutable_params=[]):
+    """
+    Return the fingerprint that identifies a run in the result cache: a
+    model_fingerprint() of the inputs that also covers the solver
+    settings (except the temporary directory), the parameters made
+    mutable, the name and contents of each --param-updates file and the
+    source code that solves the model and writes the results (this
+    file, solution_reader, scaling, relax_and_round and the export
+    package).
+    """
+    export_dir = os.path.dirname(switch_mod.export.database.__file__)
+    sources = [
+        os.path.splitext(module.__file__)[0] + '.py' for module in (
+            sys.modules[__name__], switch_mod.solution_reader,
+            switch_mod.scaling, switch_mod.relax_and_round)]
+    sources += [
+        os.path.join(export_dir, name)
+        for name in sorted(os.listdir(export_dir)) if name.endswith('.py')]
+    extra = [
+        ('sources', [
+            (os.path.basename(path), switch_mod.utilities._file_digest(path))
+            for path in sources]),
+        ('solver', sorted(
+            (name, val) for (name, val) in settings.iteritems()
+            if name != 'tmp_dir')),
+        ('mutable_params', sorted(mutable_params)),
+        ('load_vars', args.load_vars),
+        ('scale_problem', args.scale_problem),
+        ('relax_and_round', args.relax_and_round, args.mip_start),
+        ('param_updates', [
+            (os.path.basename(path), switch_mod.utilities._file_digest(path))
+            for path in args.param_updates]),
+    ]
+    return switch_mod.utilities.model_fingerprint(
+        switch_model, args.inputs_dir, extra=extra)
+
+
+def solve_offline(switch_model, args, mutable_params=[]):
+    """
+    Export the problem for an external solver (--export-problem) or read
+    the solution it wrote and save the results (--ingest-solution).
+    Both steps identify the instance by the same fingerprint as
+    --checkpoint, so they must be run with the same code, inputs and
+    options.
+    """
+    start = time.time()
+    switch_instance = construct(
+        switch_model, args.inputs_dir, mutable_params,
+        checkpoint=args.checkpoint)
+    construct_time = time.time() - start
+    fingerprint = switch_mod.utilities.model_fingerprint(
+        switch_model, args.inputs_dir, extra=sorted(mutable_params))
+    if args.export_problem is not None:
+        problem_path = switch_mod.solution_reader.export_problem(
+            switch_instance, args.export_problem, fingerprint)
+        if switch_mod.utilities.interactive_session:
+            print "Wrote problem to {}.".format(problem_path)
+        return
+
+    if args.load_duals:
+        switch_mod.utilities.register_duals(switch_instance, *args.load_duals)
+    start = time.time()
+    try:
+        results = switch_mod.solution_reader.ingest_solution(
+            switch_instance, args.ingest_solution, fingerprint,
+            variables=args.load_vars,
+            duals=switch_instance.dual_constraints or None)
+    except switch_mod.solution_reader.SolutionMismatchError as e:
+        sys.exit(str(e))
+    read_time = time.time() - start
+    success = switch_model.save_results(
+        results, switch_instance, args.outputs_dir)
+    # The solver ran outside this process, so only the times taken here
+    # are recorded.
+    switch_mod.utilities.write_run_metrics(args.outputs_dir, dict(
+        construct_time_s=round(construct_time, 2),
+        read_solution_time_s=round(read_time, 2),
+        termination_condition=str(results.solver.termination_condition)))
+    if success:
+        save_to_results_db(switch_instance, args)
+
+
+def solve_myopic(switch_model, args, settings, db_inputs=None):
+    """
+    Solve the investment periods one at a time with switch_mod.myopic,
+    reading the inputs only once, and write the outputs of all periods
+    to the outputs directory.
+    """
+    start = time.time()
+    data = switch_mod.utilities._load_data_portal(
+        switch_model, args.inputs_dir, db_inputs)
+    if not switch_model.options.skip_input_validation:
+        switch_mod.utilities.validate_inputs(switch_model, data)
+    read_time = time.time() - start
+    opt = switch_mod.utilities.make_solver(settings)
+    solve_times = []
+
+    def solve_step(instance):
+        start = time.time()
+        results = solve_instance(switch_model, instance, opt, args)
+        solve_times.append(time.time() - start)
+        return results
+
+    def report(period, instance, results):
+        if switch_mod.utilities.interactive_session:
+            print "Solved period {} in {:.2f} s.".format(
+                period, solve_times[-1])
+
+    start = time.time()
+    (switch_instance, step_results) = switch_mod.myopic.solve(
+        switch_model, data, solve_step, report)
+    solve_time = sum(solve_times)
+    metrics = dict(settings)
+    metrics.update(
+        solver_profile=args.solver_profile,
+        myopic_periods=' '.join(str(p) for (p, results) in step_results),
+        read_inputs_time_s=round(read_time, 2),
+        construct_time_s=round(time.time() - start - solve_time, 2),
+        solve_time_s=round(solve_time, 2),
+        termination_condition=str(
+            step_results[-1][1].solver.termination_condition))
+    if switch_instance is None:
+        switch_mod.utilities.write_run_metrics(args.outputs_dir, metrics)
+        sys.exit('Period {} could not be solved; no outputs were written.'
+                 .format(step_results[-1][0]))
+    switch_mod.utilities.export_results(
+        switch_model, switch_instance, args.outputs_dir)
+    switch_mod.utilities.write_run_metrics(args.outputs_dir, metrics)
+    save_to_results_db(switch_instance, args)
+
+
+def save_to_results_db(switch_instance, args):
+    if args.results_db is None:
+        return
+    con = sqlite3.connect(args.results_db)
+    try:
+        save_results_to_db(switch_instance, con, args.scenario_id)
+    finally:
+        con.close()
+
+
+def warm_start(switch_instance, solution_path):
+    """
+    Load the variable values saved in the outputs directory or solution
+    snapshot file at solution_path onto the instance and return the
+    extra keyword arguments that solve_instance() needs to use them as a
+    warm start.
+    """
+    if os.path.isfile(solution_path):
+        switch_mod.utilities.load_solution_snapshot(
+            switch_instance, solution_path)
+    else:
+        num_loaded = switch_mod.utilities.load_var_values(
+            switch_instance, solution_path)
+        if switch_mod.utilities.interactive_session:
+            print "Loaded {} variable values from {}.".format(
+                num_loaded, solution_path)
+    return {'warmstart': True}
+
+
+def solve_instance(switch_model, switch_instance, opt, args=None,
+                   **solve_kwargs):
+    """
+    Solve the instance and return the results. If --fast-solution-reader
+    was given in args, the solution is read onto the instance by
+    solution_reader.solve(), which loads the variables named by
+    --load-vars (or all of them). Duals are read the same way, but only
+    for the constraints named by --load-duals or registered by the
+    modules with utilities.register_duals(), if there are any. Otherwise
+    the solver plugin loads the solution, unless a warm start is given,
+    which CBC only gets through solution_reader.solve(). With
+    --scale-problem, or if the model was built with --matrix-constraints,
+    the problem is written and the solution read the same way by
+    scaling.solve().
+    """
+    if args is not None and args.load_duals:
+        switch_mod.utilities.register_duals(switch_instance, *args.load_duals)
+    duals = switch_instance.dual_constraints or None
+    scale = args is not None and args.scale_problem
+    if scale or getattr(switch_instance, 'matrix_constraints', None):
+        return switch_mod.scaling.solve(
+            opt, switch_instance, passes=4 if scale else 0,
+            variables=args.load_vars if args is not None else None,
+            duals=duals, keepfiles=False, tee=False, **solve_kwargs)
+    if args is not None and args.fast_solution_reader:
+        return switch_mod.solution_reader.solve(
+            opt, switch_instance, variables=args.load_vars, duals=duals,
+            keepfiles=False, tee=False, **solve_kwargs)
+    if duals is not None or solve_kwargs.get('warmstart'):
+        return switch_mod.solution_reader.solve(
+            opt, switch_instance, duals=duals,
+            keepfiles=False, tee=False, **solve_kwargs)
+    return opt.solve(
+        switch_instance, keepfiles=False, tee=False, **solve_kwargs)
+
+
+def resolve(switch_model, switch_instance, opt, updates, outputs_dir,
+            args=None):
+    """
+    Apply a batch of parameter updates to an instance that has already
+    been constructed (and usually solved), solve it again in place and
+    save the results to outputs_dir. The updated parameters must be
+    mutable. args are the parsed command-line arguments, which select
+    how the solution is read (see solve_instance()). Returns the solver
+    results.
+    """
+    switch_instance.update_params(updates)
+    results = solve_instance(switch_model, switch_instance, opt, args)
+    switch_model.save_results(results, switch_instance, outputs_dir)
+    return results
 
 
 if __name__ == '__main__':
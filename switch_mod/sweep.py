@@ -0,0 +1,280 @@
+# Copyright 2016 The Switch Authors. All rights reserved.
+# Licensed under the Apache License, Version 2, which is in the LICENSE file.
+
+"""
+Command line front-end for running sensitivity sweeps over one parameter.
+
+Usage:  python -m switch_mod.sweep --param PARAM [--multipliers M ...]
+            [--value-files FILE ...] [ARGS]
+
+Each point of the sweep is either a multiplier that is applied to every
+value of the parameter in the base inputs, or a tab file with new values
+for the parameter (see utilities.load_param_updates()). The parameter is
+declared mutable, so each worker process constructs the model instance
+once and re-solves it in place for every point it is given.
+
+Points are split into contiguous blocks, one per worker, and each worker
+solves its block in order. The variable values from one point are left
+on the instance as the starting point for the next one, and are passed
+to the solver as a warm start if the solver supports it.
+
+The results of all points are written to sweep_results.tab in the
+outputs directory, with one row per point that lists the objective
+value, new capacity built by generation technology (MW) and the average
+marginal cost of energy in each load zone ($/MWh, weighted by
+tp_weight). The solver settings (see switch_mod.solve) and the time
+taken by the whole sweep are written to run_metrics.tab. Any arguments
+that are not recognized here are passed on to the model, as with
+switch_mod.solve.
+"""
+
+import argparse
+import csv
+import multiprocessing
+import os
+import sys
+import time
+
+from pyomo.environ import value
+
+import switch_mod.export  # For ampl-tab dialect
+import switch_mod.solve
+import switch_mod.solution_reader
+import switch_mod.utilities
+
+# Model and instance kept resident in each worker process. This is
+# populated by _init_worker().
+_worker_state = {}
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(
+        prog='python -m switch_mod.sweep',
+        description='Runs a sensitivity sweep of the Switch model over '
+                    'the values of one parameter.')
+    parser.add_argument(
+        '--inputs-dir', type=str, default='inputs',
+        help='Directory containing input files (default is "inputs")')
+    parser.add_argument(
+        '--outputs-dir', type=str, default='outputs',
+        help='Directory to write output files (default is "outputs")')
+    parser.add_argument(
+        '--param', type=str, default=None,
+        help='Name of the parameter to scale with --multipliers')
+    parser.add_argument(
+        '--multipliers', type=float, nargs='+', default=[],
+        help='Multipliers to apply to the base values of --param')
+    parser.add_argument(
+        '--value-files', nargs='+', default=[], metavar='FILE',
+        help='Tab files that each give new values for one parameter')
+    parser.add_argument(
+        '--workers', type=int, default=1,
+        help='Number of worker processes (default is 1)')
+    parser.add_argument(
+        '--save-point-outputs', default=False, action='store_true',
+        help='Also write the standard output files for each point to a '
+             'subdirectory of the outputs directory')
+    switch_mod.utilities.add_solver_arguments(parser)
+    (args, model_args) = parser.parse_known_args(argv)
+    try:
+        settings = switch_mod.utilities.solver_settings(args)
+    except switch_mod.utilities.InputError as e:
+        parser.error(e.value)
+
+    points = make_points(args.param, args.multipliers, args.value_files)
+    if not points:
+        parser.error('No sweep points given; use --multipliers or '
+                     '--value-files.')
+    if args.multipliers and args.param is None:
+        parser.error('--multipliers requires --param.')
+    mutable_params = sorted(set(name for point in points for name in point[2]))
+
+    if not os.path.exists(args.outputs_dir):
+        os.makedirs(args.outputs_dir)
+    point_outputs_dir = args.outputs_dir if args.save_point_outputs else None
+    worker_args = (
+        args.inputs_dir, model_args, mutable_params, settings,
+        point_outputs_dir)
+
+    start = time.time()
+    blocks = split_into_blocks(points, args.workers)
+    if args.workers > 1:
+        pool = multiprocessing.Pool(
+            len(blocks), initializer=_init_worker, initargs=worker_args)
+        try:
+            block_rows = pool.map(_solve_block, blocks, chunksize=1)
+        finally:
+            pool.close()
+            pool.join()
+    else:
+        _init_worker(*worker_args)
+        block_rows = [_solve_block(block) for block in blocks]
+    rows = [row for block in block_rows for row in block]
+
+    write_sweep_results(
+        rows, os.path.join(args.outputs_dir, 'sweep_results.tab'))
+    sweep_time = time.time() - start
+    metrics = dict(settings)
+    metrics.update(
+        solver_profile=args.solver_profile, workers=len(blocks),
+        points=len(points), sweep_time_s=round(sweep_time, 2))
+    switch_mod.utilities.write_run_metrics(args.outputs_dir, metrics)
+    if switch_mod.utilities.interactive_session:
+        print("Solved {} points in {:.2f}s.".format(len(points), sweep_time))
+
+
+def make_points(param, multipliers, value_files):
+    """
+    Return a list of sweep points as (label, kind, spec) tuples. kind is
+    either 'multiplier', in which case spec is {param: multiplier}, or
+    'file', in which case spec is the parameter updates read from the
+    file.
+    """
+    points = []
+    for m in multipliers:
+        points.append(('{}_x{}'.format(param, m), 'multiplier', {param: m}))
+    for path in value_files:
+        label = os.path.splitext(os.path.basename(path))[0]
+        points.append(
+            (label, 'file', switch_mod.utilities.load_param_updates(path)))
+    return points
+
+
+def split_into_blocks(points, num_blocks):
+    """
+    Split a list of points into at most num_blocks contiguous blocks of
+    nearly equal size, so neighbouring points are solved by the same
+    worker and can warm-start from each other.
+
+    >>> split_into_blocks(range(7), 3)
+    [[0, 1, 2], [3, 4], [5, 6]]
+    >>> split_into_blocks(range(2), 4)
+    [[0], [1]]
+    """
+    num_blocks = max(1, min(num_blocks, len(points)))
+    (size, extra) = divmod(len(points), num_blocks)
+    blocks = []
+    start = 0
+    for i in range(num_blocks):
+        end = start + size + (1 if i < extra else 0)
+        blocks.append(list(points[start:end]))
+        start = end
+    return blocks
+
+
+def _init_worker(inputs_dir, model_args, mutable_params, settings,
+                 point_outputs_dir):
+    """
+    Construct the model instance that this worker will re-solve for each
+    of its points, and record the base values of the mutable parameters
+    so multipliers are always applied to the original inputs.
+    """
+    (switch_model, switch_instance) = switch_mod.solve.load(
+        inputs_dir, model_args, mutable_params)
+    # Duals of Energy_Balance are needed for marginal costs.
+    switch_mod.utilities.register_duals(switch_instance, 'Energy_Balance')
+    base_values = {}
+    for name in mutable_params:
+        param = getattr(switch_instance, name)
+        base_values[name] = dict((k, value(param[k])) for k in param)
+    _worker_state.clear()
+    _worker_state.update(
+        model=switch_model, instance=switch_instance,
+        opt=switch_mod.utilities.make_solver(settings), base_values=base_values,
+        point_outputs_dir=point_outputs_dir)
+
+
+def _solve_block(block):
+    """
+    Solve a contiguous block of points in order on this worker's
+    instance and return one results row per point.
+    """
+    switch_model = _worker_state['model']
+    switch_instance = _worker_state['instance']
+    opt = _worker_state['opt']
+    base_values = _worker_state['base_values']
+    rows = []
+    for (label, kind, spec) in block:
+        if kind == 'multiplier':
+            updates = dict(
+                (name, dict((k, v * m) for (k, v) in base_values[name].iteritems()))
+                for (name, m) in spec.iteritems())
+        else:
+            updates = dict(spec)
+        # Reset any parameters a previous point changed but this one doesn't.
+        for name in base_values:
+            if name not in updates:
+                updates[name] = base_values[name]
+        switch_instance.update_params(updates)
+        solve_kwargs = {}
+        if switch_mod.solution_reader.warm_start_capable(opt):
+            # The previous point's solution is still on the instance.
+            solve_kwargs['warmstart'] = True
+        start = time.time()
+        results = switch_mod.solve.solve_instance(
+            switch_model, switch_instance, opt, **solve_kwargs)
+        solve_time = time.time() - start
+        if _worker_state['point_outputs_dir'] is not None:
+            success = switch_model.save_results(
+                results, switch_instance,
+                os.path.join(_worker_state['point_outputs_dir'], label))
+        else:
+            success = switch_mod.utilities.load_solution(
+                switch_instance, results)
+        rows.append(summarize_point(switch_instance, label, success, solve_time))
+    return rows
+
+
+def summarize_point(instance, label, success, solve_time):
+    """
+    Return a dictionary summarizing the solution of one sweep point.
+    """
+    row = {
+        'point': label,
+        'status': 'optimal' if success else 'failed',
+        'solve_time_s': round(solve_time, 2),
+    }
+    if not success:
+        return row
+    row['objective'] = value(instance.SystemCost)
+    for g in instance.GENERATION_TECHNOLOGIES:
+        row['build_mw_' + str(g)] = 0.0
+    for (proj, bld_yr) in instance.NEW_PROJ_BUILDYEARS:
+        g = instance.proj_gen_tech[proj]
+        row['build_mw_' + str(g)] += value(instance.BuildProj[proj, bld_yr])
+    for lz in instance.LOAD_ZONES:
+        weighted_cost = 0.0
+        total_weight = 0.0
+        for t in instance.TIMEPOINTS:
+            dual = instance.dual.get(instance.Energy_Balance[lz, t])
+            if dual is None:
+                continue
+            weighted_cost += (
+                dual / instance.bring_timepoint_costs_to_base_year[t] *
+                instance.tp_weight[t])
+            total_weight += instance.tp_weight[t]
+        row['marginal_cost_' + str(lz)] = (
+            weighted_cost / total_weight if total_weight > 0 else None)
+    return row
+
+
+def write_sweep_results(rows, output_file):
+    """
+    Write the consolidated results table for a sweep. Columns are the
+    union of the keys of all rows, so failed points just leave the
+    solution columns blank.
+    """
+    first_columns = ['point', 'status', 'solve_time_s', 'objective']
+    other_columns = sorted(
+        set(k for row in rows for k in row) - set(first_columns))
+    columns = first_columns + other_columns
+    with open(output_file, 'wb') as f:
+        w = csv.writer(f, dialect='ampl-tab')
+        w.writerow(columns)
+        for row in rows:
+            w.writerow([
+                '.' if row.get(c) is None else row[c] for c in columns])
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -11,6 +11,7 @@ SYNOPSIS
 
 """
 
+import collections
 import os
 from pyomo.environ import *
 
@@ -390,3 +391,53 @@ def load_inputs(mod, switch_data, inputs_dir):
         select=('timepoint_id', 'timestamp', 'timeseries'),
         index=mod.TIMEPOINTS,
         param=(mod.tp_timestamp, mod.tp_ts))
+
+
+def validate_inputs(mod, switch_data):
+    """
+    Check the loaded timescale data before the model is constructed and
+    return a list of error messages. This repeats the
+    validate_time_weights check with a single pass over the timepoints,
+    so an inconsistent hourly dataset is reported before construction
+    starts. See utilities.validate_inputs().
+
+    EXAMPLE:
+    >>> from switch_mod.utilities import define_AbstractModel
+    >>> model = define_AbstractModel('timescales')
+    >>> from pyomo.environ import DataPortal
+    >>> data = DataPortal(model=model)
+    >>> data.load(filename='test_dat/timescales_bad_weights.dat')
+    >>> validate_inputs(model, data) # doctest: +NORMALIZE_WHITESPACE
+    ["Expected 87660.00 hours in period '2020', based on its length in
+    years, but the sum of timepoint weights is 79829.76."]
+
+    """
+    data = switch_data.data()
+    tp_ts = data.get('tp_ts', {})
+    ts_period = data.get('ts_period', {})
+    ts_duration_of_tp = data.get('ts_duration_of_tp', {})
+    ts_scale_to_period = data.get('ts_scale_to_period', {})
+    tps_in_ts = collections.Counter(tp_ts.itervalues())
+    hours_in_period = collections.defaultdict(float)
+    for (ts, num_tps) in tps_in_ts.iteritems():
+        try:
+            hours_in_period[ts_period[ts]] += (
+                num_tps * ts_duration_of_tp[ts] * ts_scale_to_period[ts])
+        except KeyError:
+            # Missing data is reported by the mandatory component checks.
+            pass
+    tol = 0.01
+    errors = []
+    period_start = data.get('period_start', {})
+    period_end = data.get('period_end', {})
+    for p in sorted(hours_in_period):
+        if p not in period_start or p not in period_end:
+            continue
+        period_hours = (
+            (period_end[p] - period_start[p] + 1) * hours_per_year)
+        if abs(hours_in_period[p] - period_hours) > tol * period_hours:
+            errors.append(
+                "Expected {:0.2f} hours in period '{}', based on its "
+                "length in years, but the sum of timepoint weights is "
+                "{:0.2f}.".format(period_hours, p, hours_in_period[p]))
+    return errors
@@ -342,7 +342,7 @@ def load_inputs(mod, switch_data, inputs_dir):
                mod.trans_efficiency, mod.existing_trans_cap))
     trans_optional_params_path = os.path.join(
         inputs_dir, 'trans_optional_params.tab')
-    if os.path.isfile(trans_optional_params_path):
+    if switch_data.input_exists(trans_optional_params_path):
         switch_data.load(
             filename=trans_optional_params_path,
             select=('TRANSMISSION_LINE', 'trans_dbid', 'trans_derating_factor',
@@ -350,5 +350,5 @@ def load_inputs(mod, switch_data, inputs_dir):
             param=(mod.trans_dbid, mod.trans_derating_factor,
                    mod.trans_terrain_multiplier, mod.trans_new_build_allowed))
     trans_params_path = os.path.join(inputs_dir, 'trans_params.dat')
-    if os.path.isfile(trans_params_path):
+    if switch_data.input_exists(trans_params_path):
         switch_data.load(filename=trans_params_path)
@@ -5,16 +5,39 @@
 Utility functions for SWITCH-pyomo.
 """
 
+import array
+import ast
+import ConfigParser
+import cPickle
 import csv
+import decimal
+import gc
+import gzip
+import hashlib
+import itertools
+import math
+import mmap
+import multiprocessing.pool
 import os
+import re
+import resource
+import shutil
+import struct
+import tempfile
+import time
 import types
 import importlib
 import sys
 import argparse
 import __main__ as main
 from pyomo.environ import *
+from pyomo.core.base.sets import _SetProduct
+from pyomo.core.data.TableData import TableData
 import pyomo.opt
+import pyomo.version
+import pyutilib.services
 import switch_mod.export # For ampl-tab dialect
+import switch_mod.matrix_constraints
 
 # This stores full names of modules that are dynamically loaded to
 # define a Switch model.
@@ -25,6 +48,10 @@ _full_module_names = {}
 # determine what level of output to display.
 interactive_session = not hasattr(main, '__file__')
 
+# Solver profiles are read from this file by default if it exists (see
+# solver_settings()).
+DEFAULT_SOLVER_PROFILES = 'solver_profiles.ini'
+
 def define_AbstractModel(*module_list, **kwargs):
     # stub to provide old functionality as we move to a simpler calling convention
     args = kwargs.get("args", sys.argv[1:])
@@ -64,6 +91,13 @@ def create_model(module_list, args=sys.argv[1:]):
     calling this function with an empty list for args: 
         create_model(module_list, args=[])
 
+    The --mutable-params option lists parameters that should be declared
+    mutable. Their values can be changed on a constructed instance with
+    instance.update_params() and the model re-solved without rebuilding
+    it, which is useful for sensitivity studies. With the experimental
+    --matrix-constraints option, the constraint families listed in
+    matrix_constraints.FAMILIES are not built as Pyomo constraints.
+
     SYNOPSIS:
     >>> from switch_mod.utilities import define_AbstractModel
     >>> model = define_AbstractModel(
@@ -78,9 +112,14 @@ def create_model(module_list, args=sys.argv[1:]):
 
     # Define and parse model configuration options
     argparser = _ArgumentParser(allow_abbrev=False)
+    _define_core_arguments(argparser)
     _define_arguments(model, argparser)
     model.options = argparser.parse_args(args)
     
+    # Names of the constraints whose duals are used by the modules, which
+    # are added with register_duals().
+    model.dual_constraints = []
+
     # Bind some utility functions to the model as class objects
     _add_min_data_check(model)
     model.load_inputs = types.MethodType(load_inputs, model)
@@ -93,16 +132,37 @@ def create_model(module_list, args=sys.argv[1:]):
     _define_components(model, model.module_list)
     _define_dynamic_components(model, model.module_list)
 
+    # Declare parameters mutable now that every module has defined them.
+    make_params_mutable(model, model.options.mutable_params)
+
+    if model.options.matrix_constraints:
+        switch_mod.matrix_constraints.replace_constraints(model)
+
     return model
 
 
-def load_inputs(model, inputs_dir=None, attachDataPortal=True):
+def load_inputs(model, inputs_dir=None, attachDataPortal=True,
+                db_inputs=None):
     """
 
     Load input data for an AbstractModel using the modules in the given
     list and return a model instance. This is implemented as calling the
     load_inputs() function of each module, if the module has that function.
 
+    The loaded data is checked with validate_inputs() before the
+    instance is constructed, unless the --skip-input-validation option
+    was given.
+
+    If db_inputs is a DatabaseInputs object, each module's inputs are
+    fetched from the matching database tables instead of from files in
+    inputs_dir, without writing any intermediate files.
+
+    The DataPortal holding the inputs is attached to the instance as
+    instance.DataPortal. With the --lean-memory option, it is released
+    after construction instead, garbage is collected and the peak and
+    current memory use of the process are printed. The inputs can then
+    be read again with instance.reload_inputs() when they are needed.
+
     SYNOPSIS:
     >>> from switch_mod.utilities import define_AbstractModel
     >>> model = define_AbstractModel(
@@ -112,26 +172,231 @@ def load_inputs(model, inputs_dir=None, attachDataPortal=True):
     """
     if inputs_dir is None:
         inputs_dir = getattr(model.options, "inputs_dir", "inputs")
+    data = _load_data_portal(model, inputs_dir, db_inputs)
+    if not model.options.skip_input_validation:
+        validate_inputs(model, data)
+
+    instance = _create_instance(model, data)
+
+    if model.options.lean_memory:
+        # Release the input data now that the instance holds its own
+        # copy, and keep a way to read it again for tools like
+        # save_inputs_as_dat().
+        del data
+        gc.collect()
+        instance.reload_inputs = lambda: _load_data_portal(
+            model, inputs_dir, db_inputs)
+        if interactive_session:
+            (rss, peak_rss) = memory_usage()
+            print ("Memory use: peak RSS {:.1f} MB, RSS after construction "
+                   "{:.1f} MB.".format(peak_rss, rss))
+    elif attachDataPortal:
+        instance.DataPortal = data
+    return instance
+
+
+def _create_instance(model, data, dense_params=None):
+    """
+    Construct an instance of model from a DataPortal (or a dictionary
+    of data in the same layout) and attach Switch's helpers to it.
+    dense_params ({name: DenseParamData}) defaults to the data read by
+    load_dense() and load_mapped() into the DataPortal. These become the
+    defaults of the parameters of the instance only; the abstract model
+    keeps its own defaults, so they don't carry over to the next
+    instance made from it.
+    """
+    if dense_params is None:
+        dense_params = getattr(data, 'dense_params', {})
+    # The instance is cloned from the model, along with the defaults of
+    # its parameters, before the data is loaded.
+    defaults = {}
+    try:
+        for (name, values) in dense_params.iteritems():
+            param = getattr(model, name)
+            defaults[name] = param._default_val
+            param.set_default(values)
+        # At some point, pyomo deprecated 'create' in favor of
+        # 'create_instance'. Determine which option is available
+        # and use that.
+        if hasattr(model, 'create_instance'):
+            instance = model.create_instance(data)
+        else:
+            instance = model.create(data)
+    finally:
+        for (name, default) in defaults.iteritems():
+            getattr(model, name).set_default(default)
+    instance.update_params = types.MethodType(update_params, instance)
+    if getattr(instance, 'matrix_constraints', None):
+        switch_mod.matrix_constraints.attach(instance)
+    return instance
+
+
+def _load_data_portal(model, inputs_dir, db_inputs=None):
+    """
+    Create a DataPortal with Switch's helper methods attached and load
+    the inputs of every module into it.
+    """
     data = DataPortal(model=model)
     # Attach an augmented load data function to the data portal object
     data.load_aug = types.MethodType(load_aug, data)
+    data.input_exists = types.MethodType(input_exists, data)
+    data.read_input_rows = types.MethodType(read_input_rows, data)
+    data.load_dense = types.MethodType(load_dense, data)
+    data.load_mapped = types.MethodType(load_mapped, data)
+    data.dense_params = {}
+    data.db_inputs = db_inputs
+    if db_inputs is not None:
+        data.load = types.MethodType(_load_from_db, data)
     _load_inputs(model, inputs_dir, model.module_list, data)
+    return data
 
-    # At some point, pyomo deprecated 'create' in favor of
-    # 'create_instance'. Determine which option is available
-    # and use that.
-    if hasattr(model, 'create_instance'):
-        instance = model.create_instance(data)
-    else:
-        instance = model.create(data)
 
-    if attachDataPortal:
-        instance.DataPortal = data
-    return instance
+def memory_usage():
+    """
+    Return the current and peak resident set size of this process in
+    megabytes. The current size is read from /proc, so it is None on
+    systems that don't have it.
+
+    >>> (rss, peak_rss) = memory_usage()
+    >>> rss is None or 0 < rss <= peak_rss
+    True
+
+    """
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on OS X and kilobytes elsewhere.
+    peak_rss /= 1024.0 ** 2 if sys.platform == 'darwin' else 1024.0
+    try:
+        with open('/proc/self/statm') as fh:
+            pages = int(fh.read().split()[1])
+        rss = pages * resource.getpagesize() / 1024.0 ** 2
+    except IOError:
+        rss = None
+    return (rss, peak_rss)
+
+
+def make_params_mutable(model, param_names):
+    """
+
+    Declare the named parameters of an AbstractModel as mutable. This
+    must be called before the model instance is constructed. It is
+    called by create_model() for any parameters listed in the
+    --mutable-params option.
+
+    Only parameters that are used directly in constraints, expressions
+    or the objective are refreshed when their values are updated.
+    Parameters that are derived from a mutable parameter during
+    construction (via initialize or default rules) keep the values
+    they had when the instance was constructed.
+
+    """
+    for name in param_names:
+        component = getattr(model, name, None)
+        if not isinstance(component, Param):
+            raise ValueError(
+                "Cannot make '{}' mutable because the model has no "
+                "parameter by that name.".format(name))
+        if component._constructed:
+            raise ValueError(
+                "Cannot make parameter '{}' mutable after it has been "
+                "constructed.".format(name))
+        component._mutable = True
+
+
+def update_params(instance, updates):
+    """
+
+    Apply a batch of new parameter values to a constructed model
+    instance so it can be re-solved in place, without reloading inputs
+    or rebuilding the model. This function is attached to every
+    instance created by load_inputs() as instance.update_params().
+
+    updates is a dictionary mapping parameter names to dictionaries of
+    {index: value}. A simple (non-indexed) parameter can be given a
+    single value instead of a dictionary. Each parameter must have been
+    declared mutable via the --mutable-params option or
+    make_params_mutable().
+
+    SYNOPSIS:
+    >>> from switch_mod.utilities import define_AbstractModel
+    >>> model = define_AbstractModel(
+    ...     'switch_mod', 'project.no_commit', 'fuel_cost',
+    ...     args=['--mutable-params', 'lz_demand_mw'])
+    >>> instance = model.load_inputs(inputs_dir='test_dat')
+    >>> instance.update_params({'lz_demand_mw': {('North', 1): 7.5}})
+    >>> value(instance.lz_demand_mw['North', 1])
+    7.5
+    >>> instance.update_params({'proj_max_capacity_factor': {}})
+    Traceback (most recent call last):
+        ...
+    ValueError: Parameter 'proj_max_capacity_factor' is not mutable. Include it in the --mutable-params option to allow updates.
+
+    """
+    # Check every parameter before changing anything so a bad batch
+    # doesn't leave the instance partially updated.
+    for name in updates:
+        param = getattr(instance, name, None)
+        if not isinstance(param, Param):
+            raise ValueError(
+                "Cannot update '{}' because the model has no parameter "
+                "by that name.".format(name))
+        if not param._mutable:
+            raise ValueError(
+                "Parameter '{}' is not mutable. Include it in the "
+                "--mutable-params option to allow updates.".format(name))
+    for name, new_values in updates.iteritems():
+        param = getattr(instance, name)
+        if not isinstance(new_values, dict):
+            new_values = {None: new_values}
+        for key, val in new_values.iteritems():
+            param[key] = val
+
+
+def load_param_updates(path):
+    """
+
+    Read a batch of parameter updates from a tab-separated file and
+    return it in the format accepted by update_params(). The header of
+    the last column is the name of the parameter; any columns before it
+    are the index of the parameter. Values are converted to numbers when
+    possible, matching the way DataPortal reads .tab files. Rows with a
+    dot . as their value are skipped.
+
+    For example, a file with updated fuel costs would look like:
+
+    load_zone	fuel	period	fuel_cost
+    North	NaturalGas	2020	5.6
+
+    """
+    with open(path, 'rb') as fh:
+        reader = csv.reader(fh, dialect='ampl-tab')
+        headers = next(reader)
+        param_name = headers[-1]
+        param_values = {}
+        for row in reader:
+            if not row or row[-1] == '.':
+                continue
+            key = tuple(_convert_tab_value(v) for v in row[:-1])
+            if len(key) == 0:
+                key = None
+            elif len(key) == 1:
+                key = key[0]
+            param_values[key] = _convert_tab_value(row[-1])
+    return {param_name: param_values}
+
+
+def _convert_tab_value(text):
+    """Convert a string from a .tab file to an int or float if possible."""
+    for convert in (int, float):
+        try:
+            return convert(text)
+        except ValueError:
+            pass
+    return text
 
 
 def save_inputs_as_dat(model, instance, save_path="inputs/complete_inputs.dat",
-                       exclude=[], determistic_order=False):
+                       exclude=[], determistic_order=False,
+                       split_components=False, num_workers=1):
     """
     Save input data to a .dat file for use with PySP or other command line
     tools that have not been fully integrated with DataPortal.
@@ -140,62 +405,158 @@ def save_inputs_as_dat(model, instance, save_path="inputs/complete_inputs.dat",
     that calls this function, imports the dat file, and verifies it matches
     the original data.
 
+    Rows are written to the file one at a time as they are generated, so
+    large indexed parameters such as hourly capacity factors are never
+    held in memory as a single string. If save_path ends in .gz, the file
+    is written with gzip compression. If determistic_order is True, the
+    elements of every set and parameter are written in sorted order so
+    the same data always produces an identical file.
+
+    If split_components is True, save_path is treated as a directory and
+    each component is written to its own file named <component>.dat
+    (or <component>.dat.gz if save_path ends in .gz). These files are
+    independent of each other, so they are written concurrently using up
+    to num_workers threads. The list of files that were written is
+    returned in either case.
+
     SYNOPSIS:
     >>> from switch_mod.utilities import define_AbstractModel
     >>> model = define_AbstractModel(
     ...     'switch_mod', 'project.no_commit', 'fuel_cost')
     >>> instance = model.load_inputs(inputs_dir='test_dat')
     >>> save_inputs_as_dat(model, instance, save_path="test_dat/complete_inputs.dat")
+    ['test_dat/complete_inputs.dat']
     
 
+    """
+    if not hasattr(instance, 'DataPortal'):
+        # The inputs were released after construction (--lean-memory),
+        # so read them again while the file is written.
+        instance.DataPortal = instance.reload_inputs()
+        try:
+            return save_inputs_as_dat(
+                model, instance, save_path, exclude, determistic_order,
+                split_components, num_workers)
+        finally:
+            del instance.DataPortal
+    dense_params = getattr(instance.DataPortal, 'dense_params', {})
+    component_names = [
+        component_name for component_name in
+        instance.DataPortal.data().keys() + dense_params.keys()
+        if component_name not in exclude]
+        # Components in the exclude list are in scenario-specific files.
+    if determistic_order:
+        component_names.sort()
+
+    if not split_components:
+        with _open_dat_file(save_path) as f:
+            for component_name in component_names:
+                _write_dat_component(
+                    f, model, instance, component_name, determistic_order)
+        return [save_path]
+
+    if save_path.endswith('.gz'):
+        save_dir = save_path[:-len('.gz')]
+        extension = '.dat.gz'
+    else:
+        save_dir = save_path
+        extension = '.dat'
+    if not os.path.exists(save_dir):
+        os.makedirs(save_dir)
+
+    def write_one_component(component_name):
+        path = os.path.join(save_dir, component_name + extension)
+        with _open_dat_file(path) as f:
+            _write_dat_component(
+                f, model, instance, component_name, determistic_order)
+        return path
+
+    if num_workers > 1 and len(component_names) > 1:
+        pool = multiprocessing.pool.ThreadPool(
+            min(num_workers, len(component_names)))
+        try:
+            paths = pool.map(write_one_component, component_names)
+        finally:
+            pool.close()
+            pool.join()
+    else:
+        paths = [write_one_component(c) for c in component_names]
+    return paths
+
+
+def _open_dat_file(path):
+    """
+    Open a .dat file for writing, using gzip compression if the path ends
+    in .gz.
+    """
+    if path.endswith('.gz'):
+        return gzip.open(path, 'wb')
+    return open(path, 'w')
+
+
+def _dat_rows(model, instance, component_name, determistic_order=False):
+    """
+    Generator that yields the text of a single component's data in .dat
+    format, one short string (usually one row) at a time. This is used by
+    save_inputs_as_dat() so large components can be streamed to disk.
     """
     # helper function to convert values to strings,
     # putting quotes around values that start as strings
     quote_str = lambda v: '"{}"'.format(v) if isinstance(v, basestring) else '{}'.format(str(v))
-    
-    with open(save_path, "w") as f:
-        for component_name in instance.DataPortal.data():
-            if component_name in exclude:
-                continue    # don't write data for components in exclude list 
-                            # (they're in scenario-specific files)
-            component = getattr(model, component_name)
-            comp_class = type(component).__name__
-            component_data = instance.DataPortal.data(name=component_name)
-            if comp_class == 'SimpleSet' or comp_class == 'OrderedSimpleSet':
-                f.write("set " + component_name + " := ")
-                f.write(' '.join(map(str, component_data))) # space-separated list
-                f.write(";\n")
-            elif comp_class == 'IndexedParam':
-                if len(component_data) > 0:  # omit components for which no data were provided
-                    f.write("param " + component_name + " := ")
-                    if component.index_set().dimen == 1:
-                        f.write(' '.join(str(key) + " " + quote_str(value)
-                                for key,value in component_data.iteritems()))
-                    else:
-                        f.write("\n")
-                        for key,value in (sorted(component_data.iteritems()) 
-                                          if determistic_order 
-                                          else component_data.iteritems()):
-                            f.write(" " + 
-                                    ' '.join(map(str, key)) + " " +
-                                    quote_str(value) + "\n")
-                    f.write(";\n")
-            elif comp_class == 'SimpleParam':
-                f.write("param " + component_name + " := " + str(component_data) + ";\n")
-            elif comp_class == 'IndexedSet':
-                # raise RuntimeError(
-                #     "Error with IndexedSet {}. Support for .dat export is not tested.".
-                #     format(component_name))
-                # print "Warning: exporting IndexedSet {}, but code has not been tested.".format(
-                #     component_name)
-                for key in component_data:  # note: key is always a tuple
-                    f.write("set " + component_name + "[" + ",".join(map(str, key)) + "] := ")
-                    f.write(' '.join(map(str, component_data[key]))) # space-separated list
-                    f.write(";\n")
-            else:
-                raise ValueError(
-                    "Error! Component type {} not recognized for model element '{}'.".
-                    format(comp_class, component_name))
+    maybe_sorted = lambda items: sorted(items) if determistic_order else items
+
+    component = getattr(model, component_name)
+    comp_class = type(component).__name__
+    dense_params = getattr(instance.DataPortal, 'dense_params', {})
+    if component_name in dense_params:
+        component_data = dense_params[component_name]
+    else:
+        component_data = instance.DataPortal.data(name=component_name)
+    if comp_class == 'SimpleSet' or comp_class == 'OrderedSimpleSet':
+        yield "set " + component_name + " :="
+        # Ordered sets must keep their original order.
+        elements = (component_data if comp_class == 'OrderedSimpleSet'
+                    else maybe_sorted(component_data))
+        for element in elements:
+            yield " " + str(element)
+        yield ";\n"
+    elif comp_class == 'IndexedParam':
+        if len(component_data) > 0:  # omit components for which no data were provided
+            yield "param " + component_name + " :=\n"
+            for key, value in maybe_sorted(component_data.iteritems()):
+                yield (" " + ' '.join(map(str, make_iterable(key))) + " " +
+                       quote_str(value) + "\n")
+            yield ";\n"
+    elif comp_class == 'SimpleParam':
+        yield "param " + component_name + " := " + str(component_data) + ";\n"
+    elif comp_class == 'IndexedSet':
+        for key in maybe_sorted(component_data):  # note: key is always a tuple
+            yield "set " + component_name + "[" + ",".join(map(str, key)) + "] :="
+            for element in component_data[key]:
+                yield " " + str(element)
+            yield ";\n"
+    else:
+        raise ValueError(
+            "Error! Component type {} not recognized for model element '{}'.".
+            format(comp_class, component_name))
+
+
+def _write_dat_component(f, model, instance, component_name,
+                         determistic_order=False):
+    """
+    Write one component's data to an open file in .dat format. Rows are
+    buffered in small batches to limit the number of write calls without
+    holding the whole component in memory.
+    """
+    batch = []
+    for row in _dat_rows(model, instance, component_name, determistic_order):
+        batch.append(row)
+        if len(batch) >= 1000:
+            f.write(''.join(batch))
+            batch = []
+    if batch:
+        f.write(''.join(batch))
+
 
 def post_solve(model, outputs_dir=None):
     """
@@ -224,6 +585,43 @@ def save_results(model, results, instance, outdir):
         os.makedirs(outdir)
     
     # Try to load the results and export.
+    success = load_solution(instance, results)
+
+    if success:
+        if interactive_session:
+            print "Model solved successfully."
+        export_results(model, instance, outdir)
+
+    return success
+
+def export_results(model, instance, outdir):
+    """
+
+    Write all output files for a solution that has already been loaded
+    onto the instance, either by a solver or from a solution snapshot.
+    If the --save-solution-snapshot option was given, a snapshot of the
+    solution is also written to solution_snapshot.pkl.gz in outdir.
+
+    """
+    if not os.path.exists(outdir):
+        os.makedirs(outdir)
+    _save_results(model, instance, outdir, model.module_list)
+    _save_generic_results(instance, outdir)
+    _save_total_cost_value(instance, outdir)
+    if model.options.save_solution_snapshot:
+        save_solution_snapshot(
+            instance, os.path.join(outdir, 'solution_snapshot.pkl.gz'))
+
+def load_solution(instance, results):
+    """
+
+    Load the solution in a solver results object into the model
+    instance. Returns False if the problem was infeasible or the results
+    could not be loaded, and True otherwise. If modules registered the
+    constraints whose duals they use (see register_duals()), the duals
+    of all other constraints are dropped.
+
+    """
     success = True
     
     if results.solver.termination_condition == pyomo.opt.TerminationCondition.infeasible:
@@ -240,15 +638,38 @@ def save_results(model, results, instance, outdir):
             success = False
             if interactive_session:
                 print ("ERROR: unable to load solver results (may be caused by infeasibililty).")
+    _drop_unregistered_duals(instance)
+    return success
 
-    if success:
-        if interactive_session:
-            print "Model solved successfully."
-        _save_results(model, instance, outdir, model.module_list)
-        _save_generic_results(instance, outdir)
-        _save_total_cost_value(instance, outdir)
 
-    return success
+def register_duals(model, *constraint_names):
+    """
+
+    Declare that a module uses the duals of the named constraints. This
+    adds an import suffix named dual to the model if it doesn't have one
+    yet. When any constraints are registered, only their duals are kept,
+    instead of the duals of every constraint in the model. Only GLPK and
+    CBC solutions are read selectively (see solution_reader.solve()),
+    which saves import time and memory. Other solver plugins still read
+    every dual, and the unregistered ones are dropped after the solution
+    is loaded (see load_solution()), so memory is only freed afterwards.
+
+    """
+    if not hasattr(model, 'dual'):
+        model.dual = Suffix(direction=Suffix.IMPORT)
+    for name in constraint_names:
+        if name not in model.dual_constraints:
+            model.dual_constraints.append(name)
+
+
+def _drop_unregistered_duals(instance):
+    names = set(getattr(instance, 'dual_constraints', []))
+    if not names or not hasattr(instance, 'dual'):
+        return
+    for con in list(instance.dual.keys()):
+        if con.parent_component().name not in names:
+            del instance.dual[con]
+
 
 def min_data_check(model, *mandatory_model_components):
     """
@@ -279,8 +700,13 @@ def min_data_check(model, *mandatory_model_components):
     already implemented this, and those other methods don't offer any clear
     advantages that I can see.
 
+    The names of the components are also recorded in
+    model.mandatory_components, so load_inputs() can check them against
+    the input data before construction begins (see validate_inputs()).
+
     """
     model.__num_min_data_checks += 1
+    model.mandatory_components.extend(mandatory_model_components)
     new_data_check_name = "min_data_check_" + str(model.__num_min_data_checks)
     setattr(model, new_data_check_name, BuildCheck(
         rule=lambda m: check_mandatory_components(
@@ -323,6 +749,7 @@ def _add_min_data_check(model):
     """
     if getattr(model, 'min_data_check', None) is None:
         model.__num_min_data_checks = 0
+        model.mandatory_components = []
         model.min_data_check = types.MethodType(min_data_check, model)
 
 
@@ -415,6 +842,208 @@ def check_mandatory_components(model, *mandatory_model_components):
     return True
 
 
+def validate_inputs(model, switch_data):
+    """
+
+    Check the data loaded into a DataPortal against an AbstractModel
+    before an instance is constructed, and raise a ValueError listing
+    every problem found. Construction of a large model can take minutes
+    and the BuildChecks set up by min_data_check() stop at the first
+    error, so this pass works directly on the loaded data, with one
+    dictionary or set lookup per value:
+
+    - Mandatory sets and simple parameters registered with
+      min_data_check() must have data, and mandatory indexed parameters
+      must have a value for every element of their index set.
+    - Every index of a parameter must be a member of its index set.
+    - Every value of a parameter and every member of a set must be
+      within its domain.
+    - Any validate_inputs(mod, switch_data) function defined by a module
+      is called and should return a list of error messages, e.g., the
+      time weight check in timescales.
+
+    Components that are initialized by rules or indexed by sets that are
+    derived during construction can't be checked until the instance is
+    built, so they are left to the BuildChecks.
+
+    EXAMPLE:
+    >>> import switch_mod.utilities as utilities
+    >>> mod = AbstractModel()
+    >>> utilities._add_min_data_check(mod)
+    >>> mod.set_A = Set()
+    >>> mod.set_B = Set()
+    >>> mod.paramA = Param(mod.set_A, within=PositiveReals)
+    >>> mod.paramB = Param(mod.set_B)
+    >>> mod.paramC = Param()
+    >>> mod.min_data_check('set_B', 'paramA', 'paramC')
+    >>> data = DataPortal(model=mod)
+    >>> data['set_A'] = {None: [1, 2]}
+    >>> data['paramA'] = {1: -5.0, 3: 1.0}
+    >>> utilities.validate_inputs(mod, data) # doctest: +NORMALIZE_WHITESPACE
+    Traceback (most recent call last):
+        ...
+    ValueError: Found 5 problems in the input data:
+      No data is defined for the mandatory set 'set_B'.
+      Values are not provided for 1 element(s) of the mandatory parameter
+      'paramA', e.g., 2
+      Value not provided for mandatory parameter 'paramC'
+      Parameter 'paramA' has 1 index(es) that are not members of its
+      index set 'set_A', e.g., 3
+      Parameter 'paramA' has 1 value(s) outside its domain
+      'PositiveReals', e.g., [1] = -5.0
+
+    """
+    try:
+        data = switch_data.data()
+    except IOError:
+        # Nothing has been loaded yet.
+        data = {}
+    dense_params = getattr(switch_data, 'dense_params', {})
+    errors = []
+    for name in getattr(model, 'mandatory_components', []):
+        errors.extend(_check_mandatory_data(model, data, name, dense_params))
+    for component in model.component_objects(Param):
+        values = dense_params.get(component.name, data.get(component.name))
+        if not values or component._rule is not None:
+            continue
+        if component.is_indexed():
+            in_index = _member_test(data, component._index)
+            if in_index is not None:
+                errors.extend(_describe_failures(
+                    "Parameter '{}' has {} index(es) that are not members "
+                    "of its index set '{}'".format(
+                        component.name, '{}', component._index.name),
+                    [k for k in values if not in_index(k)]))
+        in_domain = _member_test(data, component.domain)
+        if in_domain is not None:
+            errors.extend(_describe_failures(
+                "Parameter '{}' has {} value(s) outside its domain '{}'".
+                format(component.name, '{}', component.domain.name),
+                ['[{}] = {}'.format(k, v) if k is not None else v
+                 for (k, v) in values.iteritems() if not in_domain(v)]))
+    for component in model.component_objects(Set):
+        members = data.get(component.name, {}).get(None)
+        if members is None or component.is_indexed():
+            continue
+        in_domain = _member_test(data, component.domain)
+        if in_domain is not None:
+            errors.extend(_describe_failures(
+                "Set '{}' has {} member(s) outside its domain".format(
+                    component.name, '{}'),
+                [v for v in members if not in_domain(v)]))
+    for module in get_module_list(model, getattr(model, 'module_list', [])):
+        if hasattr(module, 'validate_inputs'):
+            errors.extend(module.validate_inputs(model, switch_data))
+    if errors:
+        raise ValueError(
+            'Found {} problem{} in the input data:\n  {}'.format(
+                len(errors), '' if len(errors) == 1 else 's',
+                '\n  '.join(errors)))
+
+
+def _check_mandatory_data(model, data, component_name, dense_params={}):
+    """
+    Return a list of messages describing any data that is missing for
+    a mandatory component, using the same wording as
+    check_mandatory_components(). dense_params holds the data read by
+    load_dense() and load_mapped().
+    """
+    obj = getattr(model, component_name)
+    values = data.get(component_name)
+    if isinstance(obj, Set):
+        if obj.initialize is not None or obj.is_indexed():
+            return []
+        if not values or not values.get(None):
+            return ["No data is defined for the mandatory set '{}'.".format(
+                component_name)]
+    elif isinstance(obj, Param):
+        if component_name in dense_params:
+            values = dense_params[component_name]
+        elif obj._rule is not None or obj._default_val is not None:
+            return []
+        if not obj.is_indexed():
+            if not values or values.get(None) is None:
+                return ["Value not provided for mandatory parameter "
+                        "'{}'".format(component_name)]
+            return []
+        index = _set_members(data, obj._index)
+        if index is not None:
+            values = values or {}
+            return _describe_failures(
+                "Values are not provided for {} element(s) of the "
+                "mandatory parameter '%s'" % component_name,
+                [k for k in index if k not in values])
+    return []
+
+
+def _set_members(data, s):
+    """
+    Return a list of the members of a set (or product of sets) as they
+    will be after construction, or None if they can't be determined from
+    the loaded data.
+    """
+    if s is None:
+        return None
+    if isinstance(s, _SetProduct):
+        factors = [_set_members(data, f) for f in s.set_tuple]
+        if any(f is None for f in factors):
+            return None
+        return [
+            tuple(v for m in combo for v in make_iterable(m))
+            for combo in itertools.product(*factors)]
+    if s.name in data and not s.virtual:
+        return data[s.name].get(None, [])
+    return None
+
+
+def _member_test(data, s):
+    """
+    Return a function that tests whether a value is a member of set s,
+    or None if that can't be determined before construction.
+    """
+    if s is None or s is Any:
+        return None
+    if isinstance(s, _SetProduct):
+        tests = [_member_test(data, f) for f in s.set_tuple]
+        if any(t is None for t in tests):
+            return None
+        dimens = [f.dimen for f in s.set_tuple]
+        if None in dimens:
+            return None
+
+        def in_product(v):
+            v = tuple(make_iterable(v))
+            if len(v) != sum(dimens):
+                return False
+            pos = 0
+            for (test, dimen) in zip(tests, dimens):
+                part = v[pos] if dimen == 1 else v[pos:pos + dimen]
+                if not test(part):
+                    return False
+                pos += dimen
+            return True
+        return in_product
+    if s.virtual:
+        return lambda v: v in s
+    if s.name in data:
+        members = set(data[s.name].get(None, []))
+        return lambda v: v in members
+    return None
+
+
+def _describe_failures(message, failures, num_examples=3):
+    """
+    Summarize a list of failing items as a single error message (with a
+    {} placeholder for the count), or return an empty list if there are
+    none.
+    """
+    if not failures:
+        return []
+    return ['{}, e.g., {}'.format(
+        message.format(len(failures)),
+        ', '.join(str(f) for f in failures[:num_examples]))]
+
+
 def _load_modules(module_list):
     """
 
@@ -484,6 +1113,35 @@ def get_module_list(model, module_list=None):
             for cm in get_module_list(model, module.core_modules):
                 yield cm
 
+def _define_core_arguments(argparser):
+    """
+    Define command-line options that apply to the model as a whole
+    rather than to any one module.
+    """
+    argparser.add_argument(
+        '--mutable-params', nargs='+', default=[], metavar='PARAM',
+        help='Parameters to declare as mutable, so they can be updated '
+             'on a constructed instance and re-solved without rebuilding it')
+    argparser.add_argument(
+        '--save-solution-snapshot', default=False, action='store_true',
+        help='Also save a compact binary snapshot of the solution with the '
+             'results, so outputs can be regenerated without re-solving')
+    argparser.add_argument(
+        '--skip-input-validation', default=False, action='store_true',
+        help='Construct the model without first checking the input data '
+             'for missing values, unknown indexes and values outside '
+             'their domains')
+    argparser.add_argument(
+        '--lean-memory', default=False, action='store_true',
+        help='Release the input data after the model instance is '
+             'constructed and report memory use')
+    argparser.add_argument(
+        '--matrix-constraints', default=False, action='store_true',
+        help='Experimental: generate the per-timepoint dispatch and energy '
+             'balance constraints as sparse arrays instead of Pyomo '
+             'objects (GLPK and CBC only; see switch_mod.matrix_constraints)')
+
+
 def _define_arguments(model, argparser):
     """
     Call define_arguments() (if present) in all modules that make up the model.
@@ -565,6 +1223,420 @@ def _save_generic_results(instance, outdir):
                 writer.writerow(tuple(make_iterable(key)) + (v.value,))
 
 
+def load_var_values(instance, outdir):
+    """
+
+    Read variable values that were written by _save_generic_results()
+    back onto the matching variables of a constructed instance, so they
+    can serve as a starting point for the next solve. Files are matched
+    to variables by name and rows are matched by index; variables without
+    a file, rows for indexes that no longer exist and blank values are
+    skipped. Returns the number of values that were set.
+
+    """
+    num_loaded = 0
+    for var in instance.component_objects():
+        if not isinstance(var, Var):
+            continue
+        path = os.path.join(outdir, '%s.tab' % var.name)
+        if not os.path.isfile(path):
+            continue
+        with open(path, 'rb') as fh:
+            reader = csv.reader(fh, dialect='ampl-tab')
+            next(reader)
+            for row in reader:
+                if not row or row[-1] in ('', '.'):
+                    continue
+                key = tuple(_convert_tab_value(v) for v in row[:-1])
+                if len(key) == 0:
+                    key = None
+                elif len(key) == 1:
+                    key = key[0]
+                if key not in var:
+                    continue
+                var[key].value = float(row[-1])
+                num_loaded += 1
+    return num_loaded
+
+
+def save_solution_snapshot(instance, path):
+    """
+
+    Save the values of all variables, the duals of all constraints (if
+    the instance has a dual suffix) and the value of each objective to a
+    compressed binary file. Values for each component are stored as an
+    array of doubles alongside the list of its keys, with NaN standing
+    in for variables that have no value. Use load_solution_snapshot() to
+    attach the solution to a freshly constructed instance.
+
+    """
+    snapshot = {
+        'version': 1,
+        'variables': {},
+        'duals': {},
+        'objectives': {},
+    }
+    for var in instance.component_objects(Var):
+        keys = list(var.keys())
+        values = array.array('d', (
+            float('nan') if var[k].value is None else var[k].value
+            for k in keys))
+        snapshot['variables'][var.name] = (keys, values)
+    if hasattr(instance, 'dual'):
+        for con in constraint_components(instance):
+            keys = []
+            values = array.array('d')
+            for k in con:
+                dual = instance.dual.get(con[k])
+                if dual is not None:
+                    keys.append(k)
+                    values.append(dual)
+            if keys:
+                snapshot['duals'][con.name] = (keys, values)
+    for obj in instance.component_objects(Objective):
+        snapshot['objectives'][obj.name] = value(obj, exception=False)
+    with gzip.open(path, 'wb') as fh:
+        cPickle.dump(snapshot, fh, cPickle.HIGHEST_PROTOCOL)
+
+
+def constraint_components(instance):
+    """
+
+    Return the constraint components of an instance, including the
+    MatrixConstraint objects that replace some of them with the
+    --matrix-constraints option (see switch_mod.matrix_constraints),
+    which are not Pyomo components.
+
+    """
+    components = list(instance.component_objects(Constraint))
+    for name in getattr(instance, 'matrix_constraints', None) or []:
+        component = getattr(instance, name)
+        if not isinstance(component, Constraint):
+            components.append(component)
+    return components
+
+
+def load_solution_snapshot(instance, path):
+    """
+
+    Attach a solution saved by save_solution_snapshot() to an instance
+    without solving it. The instance must have been constructed from the
+    same inputs and modules as the one that was saved; components and
+    keys that don't exist on the instance are ignored. A dual suffix is
+    added to the instance if the snapshot has duals and the instance
+    doesn't have one yet. Returns a dictionary of the saved objective
+    values.
+
+    """
+    with gzip.open(path, 'rb') as fh:
+        snapshot = cPickle.load(fh)
+    for (name, (keys, values)) in snapshot['variables'].iteritems():
+        var = getattr(instance, name, None)
+        if var is None:
+            continue
+        for (k, v) in zip(keys, values):
+            if k in var:
+                # NaN marks a variable that had no value
+                var[k].value = None if v != v else v
+    if snapshot['duals'] and not hasattr(instance, 'dual'):
+        instance.dual = Suffix(direction=Suffix.IMPORT)
+    for (name, (keys, values)) in snapshot['duals'].iteritems():
+        con = getattr(instance, name, None)
+        if con is None:
+            continue
+        for (k, v) in zip(keys, values):
+            if k in con:
+                instance.dual[con[k]] = v
+    return snapshot['objectives']
+
+
+def model_fingerprint(model, inputs_dir, extra=()):
+    """
+
+    Return a hash that identifies the instance that load_inputs() would
+    build for this model from inputs_dir. It covers the source code of
+    the Switch modules that make up the model, of this file and of
+    switch_mod.matrix_constraints, the
+    Pyomo and Python versions, the module list, the model options, the
+    names and contents of all files in inputs_dir and any extra values
+    given by the caller (e.g., solver options). Any change to one of
+    these produces a different fingerprint.
+
+    """
+    sha = hashlib.sha1()
+
+    def add(label, text):
+        sha.update('{}\0{}\0'.format(label, text))
+
+    add('python', sys.version)
+    add('pyomo', pyomo.version.version)
+    add('modules', repr(list(model.module_list)))
+    add('options', repr(sorted(vars(model.options).items())))
+    add('extra', repr(extra))
+    sources = set(
+        os.path.splitext(path)[0] + '.py'
+        for path in (__file__, switch_mod.matrix_constraints.__file__))
+    for module in get_module_list(model):
+        if getattr(module, '__file__', None):
+            sources.add(os.path.splitext(module.__file__)[0] + '.py')
+    for path in sorted(sources):
+        add('source', _file_digest(path) if os.path.isfile(path) else path)
+    for (dirpath, dirnames, filenames) in os.walk(inputs_dir):
+        dirnames.sort()
+        for filename in sorted(filenames):
+            path = os.path.join(dirpath, filename)
+            add(os.path.relpath(path, inputs_dir), _file_digest(path))
+    return sha.hexdigest()
+
+
+def _file_digest(path):
+    sha = hashlib.sha1()
+    with open(path, 'rb') as fh:
+        for block in iter(lambda: fh.read(1 << 20), ''):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+def save_instance_checkpoint(instance, path, fingerprint):
+    """
+
+    Save a constructed model instance to a binary checkpoint file along
+    with its fingerprint (see model_fingerprint()), so later runs with
+    the same code and inputs can load it with load_instance_checkpoint()
+    instead of constructing it again.
+
+    The rules and other functions that Pyomo components keep are not
+    saved. They are stored as references to the same functions in the
+    abstract model, which are filled in again when the checkpoint is
+    loaded. The DataPortal and methods attached to the instance are not
+    saved either. Returns False if the instance can't be saved, e.g.,
+    because a component refers to a function that the abstract model
+    does not.
+
+    """
+    functions = dict(
+        (id(f), key) for (key, f) in _model_functions(instance).iteritems())
+
+    def persistent_id(obj):
+        if isinstance(obj, types.FunctionType):
+            return functions.get(id(obj))
+        return None
+
+    detached = dict(
+        (name, val) for (name, val) in vars(instance).items()
+        if name in ('DataPortal', 'reload_inputs') or
+        isinstance(val, types.MethodType))
+    for name in detached:
+        delattr(instance, name)
+    temp_path = path + '.tmp'
+    gc_enabled = gc.isenabled()
+    try:
+        # The pickle module makes millions of small objects that the
+        # cyclic garbage collector would scan again and again.
+        gc.disable()
+        with open(temp_path, 'wb') as fh:
+            pickler = cPickle.Pickler(fh, cPickle.HIGHEST_PROTOCOL)
+            pickler.persistent_id = persistent_id
+            pickler.dump({'version': 1, 'fingerprint': fingerprint})
+            pickler.dump(instance)
+        os.rename(temp_path, path)
+    except (cPickle.PicklingError, TypeError) as e:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        if interactive_session:
+            print "Unable to save a checkpoint of the instance: {}".format(e)
+        return False
+    finally:
+        if gc_enabled:
+            gc.enable()
+        for (name, val) in detached.iteritems():
+            setattr(instance, name, val)
+    return True
+
+
+def load_instance_checkpoint(model, path, fingerprint, inputs_dir=None,
+                             db_inputs=None):
+    """
+
+    Load an instance saved by save_instance_checkpoint() for the given
+    abstract model, or return None if the file doesn't exist or was
+    saved with a different fingerprint. The loaded instance doesn't have
+    a DataPortal attached; as with the --lean-memory option, the inputs
+    can be read again from inputs_dir with instance.reload_inputs().
+
+    """
+    if not os.path.isfile(path):
+        return None
+    functions = _model_functions(model)
+    gc_enabled = gc.isenabled()
+    try:
+        # As in save_instance_checkpoint().
+        gc.disable()
+        with open(path, 'rb') as fh:
+            unpickler = cPickle.Unpickler(fh)
+            unpickler.persistent_load = lambda key: functions[key]
+            header = unpickler.load()
+            if header.get('fingerprint') != fingerprint:
+                return None
+            instance = unpickler.load()
+    finally:
+        if gc_enabled:
+            gc.enable()
+    # Re-attach the methods that were removed before saving.
+    for (name, val) in vars(model).items():
+        if isinstance(val, types.MethodType):
+            setattr(instance, name, val)
+    instance.update_params = types.MethodType(update_params, instance)
+    instance.reload_inputs = lambda: _load_data_portal(
+        model, inputs_dir, db_inputs)
+    return instance
+
+
+def _model_functions(model):
+    """
+    Return a dictionary of the functions (rules, defaults, filters,
+    etc.) referred to by each component of a model, keyed by component
+    name and attribute.
+    """
+    functions = {}
+    for component in model.component_objects():
+        for (attr, val) in vars(component).iteritems():
+            if isinstance(val, types.FunctionType):
+                functions[component.name, attr] = val
+    return functions
+
+
+def restore_cached_results(cache_dir, fingerprint, outdir):
+    """
+
+    Copy the outputs of a run saved by cache_results() under fingerprint
+    into outdir, overwriting files with the same names. Returns the path
+    of the solution snapshot stored with the outputs, or None if there
+    is no completed run with this fingerprint in cache_dir. Restoring an
+    entry marks it as recently used, so it is evicted last.
+
+    """
+    entry = os.path.join(cache_dir, fingerprint)
+    if not os.path.isdir(entry):
+        return None
+    cached_outdir = os.path.join(entry, 'outputs')
+    for (dirpath, dirnames, filenames) in os.walk(cached_outdir):
+        target_dir = os.path.join(
+            outdir, os.path.relpath(dirpath, cached_outdir))
+        if not os.path.exists(target_dir):
+            os.makedirs(target_dir)
+        for filename in filenames:
+            shutil.copy2(os.path.join(dirpath, filename), target_dir)
+    os.utime(entry, None)
+    return os.path.join(entry, 'solution_snapshot.pkl.gz')
+
+
+def output_file_times(outdir):
+    """
+
+    Return the modification time of each file in outdir and its
+    subdirectories, by path relative to outdir, so the files that a run
+    writes can be told from those left by earlier runs (see
+    files_written_since()).
+
+    """
+    times = {}
+    for (dirpath, dirnames, filenames) in os.walk(outdir):
+        for filename in filenames:
+            path = os.path.join(dirpath, filename)
+            times[os.path.relpath(path, outdir)] = os.path.getmtime(path)
+    return times
+
+
+def files_written_since(outdir, times):
+    """
+
+    Return the paths, relative to outdir, of the files in outdir that
+    are not in times (from output_file_times()) or were modified since.
+
+    """
+    return sorted(
+        relpath for (relpath, mtime) in output_file_times(outdir).iteritems()
+        if times.get(relpath) != mtime)
+
+
+def cache_results(cache_dir, fingerprint, outdir, files, snapshot_path):
+    """
+
+    Save a copy of the given files in outdir (paths relative to outdir,
+    e.g., from files_written_since()) and the solution snapshot at
+    snapshot_path (see save_solution_snapshot()) to cache_dir under
+    fingerprint, so restore_cached_results() can reuse them. Only the
+    files of this run are given, since outdir may also hold files from
+    other runs. The snapshot file is moved into the cache. The entry is
+    written to a temporary directory and renamed into place, so an
+    interrupted run never leaves a partial entry that would be restored
+    later.
+
+    """
+    if not os.path.exists(cache_dir):
+        os.makedirs(cache_dir)
+    entry = os.path.join(cache_dir, fingerprint)
+    temp_entry = tempfile.mkdtemp(suffix='.tmp', dir=cache_dir)
+    try:
+        cached_outdir = os.path.join(temp_entry, 'outputs')
+        os.makedirs(cached_outdir)
+        for relpath in files:
+            target_dir = os.path.dirname(os.path.join(cached_outdir, relpath))
+            if not os.path.exists(target_dir):
+                os.makedirs(target_dir)
+            shutil.copy2(os.path.join(outdir, relpath), target_dir)
+        shutil.move(snapshot_path,
+                    os.path.join(temp_entry, 'solution_snapshot.pkl.gz'))
+        if os.path.isdir(entry):
+            shutil.rmtree(entry)
+        os.rename(temp_entry, entry)
+    finally:
+        if os.path.isdir(temp_entry):
+            shutil.rmtree(temp_entry)
+
+
+def evict_cached_results(cache_dir, max_size=None, max_age=None):
+    """
+
+    Remove entries from a result cache that were last saved or restored
+    more than max_age days ago, then remove the least recently used
+    entries until the cache holds no more than max_size megabytes.
+    Temporary directories left by interrupted runs are removed once they
+    are a day old. Returns the number of entries removed.
+
+    """
+    now = time.time()
+    entries = []
+    for name in os.listdir(cache_dir):
+        path = os.path.join(cache_dir, name)
+        if not os.path.isdir(path):
+            continue
+        age = (now - os.path.getmtime(path)) / 86400.0
+        if name.endswith('.tmp'):
+            if age > 1:
+                shutil.rmtree(path, ignore_errors=True)
+            continue
+        size = sum(
+            os.path.getsize(os.path.join(dirpath, filename))
+            for (dirpath, dirnames, filenames) in os.walk(path)
+            for filename in filenames)
+        entries.append((age, size, path))
+    # Oldest first
+    entries.sort(reverse=True)
+    total_size = sum(size for (age, size, path) in entries)
+    num_removed = 0
+    for (age, size, path) in entries:
+        too_old = max_age is not None and age > max_age
+        too_big = max_size is not None and total_size > max_size * 1024 ** 2
+        if not (too_old or too_big):
+            break
+        shutil.rmtree(path)
+        total_size -= size
+        num_removed += 1
+    return num_removed
+
+
 def _save_total_cost_value(instance, outdir):
     values = instance.Minimize_System_Cost.values()
     assert len(values) == 1
@@ -599,14 +1671,25 @@ def load_aug(switch_data, optional=False, auto_select=False,
     """
     path = kwds['filename']
     # Skip if the file is missing
-    if optional and not os.path.isfile(path):
+    if optional and not input_exists(switch_data, path):
         return
     # copy the optional_params to avoid side-effects when the list is altered below
     optional_params=list(optional_params)
     # Parse header and first row
-    with open(path) as infile:
-        headers = infile.readline().strip().split('\t')
-        dat1 = infile.readline().strip().split('\t')
+    db_inputs = getattr(switch_data, 'db_inputs', None)
+    if db_inputs is None:
+        with open(path) as infile:
+            headers = infile.readline().strip().split('\t')
+            dat1 = infile.readline().strip().split('\t')
+    else:
+        headers = db_inputs.columns(path)
+        if headers is None:
+            raise InputError(
+                'Table {} for {} was not found in the inputs database.'
+                .format(db_inputs.table_name(path), os.path.basename(path)))
+        rows = db_inputs.rows(path)
+        dat1 = next(rows, [''])
+        rows.close()
     # Skip if the file is empty or has no data in the first row.
     if optional and (headers == [''] or dat1 == ['']):
         return
@@ -688,6 +1771,491 @@ def load_aug(switch_data, optional=False, auto_select=False,
     switch_data.load(**kwds)
 
 
+def load_dense(switch_data, filename, select, param, columns,
+               optional=False):
+    """
+
+    Load a parameter indexed by (entity, timepoint) or a similar pair of
+    sets from a tab-separated file (or its database table) into a
+    DenseParamData object, which becomes the default value of the
+    parameter in instances constructed from this data (see
+    _create_instance()), instead of passing the values to the
+    DataPortal. This is attached to the DataPortal object as
+    switch_data.load_dense().
+
+    select names the two index columns and the value column of the file.
+    columns is the set that the second index belongs to (usually
+    TIMEPOINTS); its data must already be loaded. Rows are read one at a
+    time, so the file is never held in memory as Python objects, and
+    the loaded data is recorded in switch_data.dense_params so it can be
+    saved by save_inputs_as_dat().
+
+    The parameter must be immutable for this to save memory: Pyomo reads
+    the default of an immutable parameter each time a value is used
+    instead of storing a copy in the instance.
+
+    """
+    if not input_exists(switch_data, filename):
+        if optional:
+            return
+        raise InputError('File {} was not found.'.format(filename))
+    column_members = _set_members(switch_data.data(), columns)
+    if column_members is None:
+        raise InputError(
+            'Data for {} must be loaded before {} can be read from {}.'
+            .format(columns.name, param.name, filename))
+    (headers, rows) = _input_table_rows(switch_data, filename)
+    try:
+        positions = [headers.index(col) for col in select]
+    except ValueError:
+        raise InputError('Columns {} not all found in file {}.'.format(
+            ', '.join(select), filename))
+    dense = DenseParamData(param.name, column_members)
+    for row in rows:
+        (r, c, val) = [row[i] for i in positions]
+        if val == '.':
+            continue
+        key = (_convert_tab_value(r), _convert_tab_value(c))
+        try:
+            dense[key] = float(val)
+        except KeyError:
+            raise InputError(
+                'Unknown {} {} for {} in {}.'.format(
+                    columns.name, c, param.name, filename))
+    switch_data.dense_params[param.name] = dense
+
+
+class DenseParamData(object):
+    """
+
+    Compact storage for the values of a parameter with a dense
+    two-dimensional index, such as demand or capacity factors indexed by
+    (load zone or project, timepoint). Each row is an array of doubles
+    with one slot per column, so a value takes 8 bytes instead of the
+    several hundred bytes of a tuple-keyed dictionary entry. Missing
+    values are stored as NaN. Rows and columns are addressed through
+    dictionaries that map their keys to positions.
+
+    This is normally created by load_dense() and used as the default of
+    an immutable Param of an instance, which model rules read like any
+    other parameter. It is shared rather than copied when the instance
+    is cloned.
+
+    >>> from switch_mod.utilities import DenseParamData
+    >>> dense = DenseParamData('lz_demand_mw', [1, 2, 3])
+    >>> dense['North', 2] = 5.5
+    >>> dense['North', 2], len(dense), ('North', 1) in dense
+    (5.5, 1, False)
+    >>> dense['North', 1]
+    Traceback (most recent call last):
+        ...
+    ValueError: No value was provided for lz_demand_mw[North,1].
+
+    """
+
+    def __init__(self, name, columns):
+        self.name = name
+        self.columns = dict((c, i) for (i, c) in enumerate(columns))
+        self.column_keys = list(columns)
+        self.rows = {}
+        self._empty_row = array.array('d', [float('nan')]) * len(columns)
+
+    def _get(self, key):
+        (r, c) = key
+        row = self.rows.get(r)
+        if row is None or c not in self.columns:
+            return float('nan')
+        return row[self.columns[c]]
+
+    def __getitem__(self, key):
+        val = self._get(key)
+        if val != val:
+            raise ValueError('No value was provided for {}[{}].'.format(
+                self.name, ','.join(map(str, key))))
+        return val
+
+    def __setitem__(self, key, val):
+        (r, c) = key
+        col = self.columns[c]
+        if r not in self.rows:
+            self.rows[r] = array.array('d', self._empty_row)
+        self.rows[r][col] = val
+
+    def __contains__(self, key):
+        val = self._get(key)
+        return val == val
+
+    def iteritems(self):
+        for (r, row) in self.rows.iteritems():
+            for (c, val) in itertools.izip(self.column_keys, row):
+                if val == val:
+                    yield ((r, c), val)
+
+    def __iter__(self):
+        return (key for (key, val) in self.iteritems())
+
+    def __len__(self):
+        return sum(1 for key in self)
+
+    def __deepcopy__(self, memo):
+        # The data is read-only once loaded, so clones of the model can
+        # share it.
+        return self
+
+
+def load_mapped(switch_data, filename, param, rows_filename,
+                columns_filename):
+    """
+
+    Memory-map a two-dimensional parameter, such as capacity factors
+    indexed by (project, timepoint), from a binary .npy file and use it
+    as the default value of the parameter, like load_dense(). This is
+    attached to the DataPortal object as switch_data.load_mapped().
+
+    The .npy file must hold a C-ordered matrix of little-endian doubles
+    ('<f8'), with NaN for missing values. rows_filename and
+    columns_filename are text files listing the key of each row (e.g.,
+    project) and column (e.g., timepoint), one per line. Columns that
+    aren't timepoints of the current model are ignored, so one file can
+    serve scenarios that use different subsets of timepoints. Use
+    write_npy_param() to create these files.
+
+    Values are read from the file on demand through the operating
+    system's page cache, so concurrent workers that map the same file
+    share one copy of it in memory.
+
+    """
+    row_keys = _read_key_file(rows_filename)
+    column_keys = _read_key_file(columns_filename)
+    mapped = MappedParamData(param.name, filename, row_keys, column_keys)
+    switch_data.dense_params[param.name] = mapped
+
+
+class MappedParamData(DenseParamData):
+    """
+
+    Read-only DenseParamData whose values stay in a memory-mapped .npy
+    file instead of in arrays in memory. See load_mapped().
+
+    """
+
+    def __init__(self, name, path, row_keys, column_keys):
+        DenseParamData.__init__(self, name, column_keys)
+        self.path = path
+        self.row_positions = dict((r, i) for (i, r) in enumerate(row_keys))
+        self.row_keys = list(row_keys)
+        with open(path, 'rb') as fh:
+            (self._offset, shape) = _read_npy_header(fh)
+            if shape != (len(row_keys), len(column_keys)):
+                raise InputError(
+                    '{} holds a {} matrix, but its index files list {} '
+                    'rows and {} columns.'.format(
+                        path, 'x'.join(map(str, shape)),
+                        len(row_keys), len(column_keys)))
+            self._map = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def _get(self, key):
+        (r, c) = key
+        i = self.row_positions.get(r)
+        j = self.columns.get(c)
+        if i is None or j is None:
+            return float('nan')
+        return struct.unpack_from(
+            '<d', self._map,
+            self._offset + 8 * (i * len(self.column_keys) + j))[0]
+
+    def __setitem__(self, key, val):
+        raise TypeError('{} is read-only.'.format(self.path))
+
+    def __getstate__(self):
+        # Pickle a reference to the file rather than its contents.
+        state = dict(self.__dict__)
+        del state['_map']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        with open(self.path, 'rb') as fh:
+            self._map = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def iteritems(self):
+        num_columns = len(self.column_keys)
+        row_format = '<{}d'.format(num_columns)
+        for (i, r) in enumerate(self.row_keys):
+            row = struct.unpack_from(
+                row_format, self._map, self._offset + 8 * i * num_columns)
+            for (c, val) in itertools.izip(self.column_keys, row):
+                if val == val:
+                    yield ((r, c), val)
+
+
+def write_npy_param(dense, path, rows_path, columns_path):
+    """
+
+    Save the values of a DenseParamData (e.g., switch_data.dense_params
+    ['proj_max_capacity_factor'] after loading the inputs) to a .npy
+    file and its row and column index files, in the format read by
+    load_mapped(). NumPy is not needed to read or write these files.
+
+    """
+    row_keys = sorted(dense.rows)
+    with open(rows_path, 'w') as fh:
+        fh.writelines('{}\n'.format(r) for r in row_keys)
+    with open(columns_path, 'w') as fh:
+        fh.writelines('{}\n'.format(c) for c in dense.column_keys)
+    header = "{{'descr': '<f8', 'fortran_order': False, 'shape': ({}, {}), }}".format(
+        len(row_keys), len(dense.column_keys))
+    # Pad the header so the data starts on a 16-byte boundary.
+    header += ' ' * (15 - (10 + len(header)) % 16) + '\n'
+    with open(path, 'wb') as fh:
+        fh.write('\x93NUMPY\x01\x00' + struct.pack('<H', len(header)))
+        fh.write(header)
+        for r in row_keys:
+            row = dense.rows[r]
+            if sys.byteorder != 'little':
+                row = array.array('d', row)
+                row.byteswap()
+            row.tofile(fh)
+
+
+def _read_npy_header(fh):
+    """
+    Read the header of a .npy file holding a C-ordered matrix of
+    little-endian doubles, and return the offset of the data and the
+    shape of the matrix.
+    """
+    if fh.read(6) != '\x93NUMPY':
+        raise InputError('{} is not a .npy file.'.format(fh.name))
+    (major, minor) = struct.unpack('<BB', fh.read(2))
+    if major == 1:
+        (header_len,) = struct.unpack('<H', fh.read(2))
+    else:
+        (header_len,) = struct.unpack('<I', fh.read(4))
+    header = ast.literal_eval(fh.read(header_len).strip())
+    if (header['descr'] not in ('<f8', 'float64') or
+            header['fortran_order'] or len(header['shape']) != 2):
+        raise InputError(
+            '{} must hold a two-dimensional C-ordered matrix of '
+            'little-endian doubles.'.format(fh.name))
+    return (fh.tell(), tuple(header['shape']))
+
+
+def _read_key_file(path):
+    """Read the keys listed one per line in an index file."""
+    with open(path) as fh:
+        return [_convert_tab_value(line.strip()) for line in fh
+                if line.strip()]
+
+
+def _input_table_rows(switch_data, path):
+    """
+    Return the headers of an input file or its database table and an
+    iterator over its rows, without reading them all into memory.
+    """
+    db_inputs = getattr(switch_data, 'db_inputs', None)
+    if db_inputs is not None:
+        return (db_inputs.columns(path),
+                ([_value_text(v) for v in row]
+                 for row in db_inputs.rows(path)))
+
+    # Split lines on tabs and spaces, the same way Pyomo reads .tab files.
+    def file_rows():
+        with open(path) as fh:
+            next(fh)
+            for line in fh:
+                row = re.split('[\t ]+', line.strip())
+                if row != ['']:
+                    yield row
+    with open(path) as fh:
+        headers = re.split('[\t ]+', fh.readline().strip())
+    return (headers, file_rows())
+
+
+def input_exists(switch_data, path):
+    """
+
+    Check whether an input file exists, or if the data portal is reading
+    from a database, whether the table for that file exists. This is
+    attached to the DataPortal object as switch_data.input_exists() so
+    modules can check for optional inputs without caring where they come
+    from.
+
+    """
+    db_inputs = getattr(switch_data, 'db_inputs', None)
+    if db_inputs is None:
+        return os.path.isfile(path)
+    return db_inputs.columns(path) is not None
+
+
+def read_input_rows(switch_data, path):
+    """
+
+    Return the rows of a tab-separated input file (or its database
+    table) as a list of dictionaries of strings keyed by column name,
+    like csv.DictReader. This is attached to the DataPortal object as
+    switch_data.read_input_rows() for modules that parse their inputs
+    themselves instead of using load() or load_aug().
+
+    """
+    db_inputs = getattr(switch_data, 'db_inputs', None)
+    if db_inputs is None:
+        with open(path, 'rb') as fh:
+            return list(csv.DictReader(fh, delimiter='\t'))
+    columns = db_inputs.columns(path)
+    return [dict(zip(columns, [_value_text(v) for v in row]))
+            for row in db_inputs.rows(path)]
+
+
+def _value_text(val):
+    """
+    Convert a value read from the database to text. Floats keep all of
+    their digits, which str() would round to 12 on Python 2.
+
+    >>> _value_text(0.1 + 0.2), _value_text(7), _value_text('a')
+    ('0.30000000000000004', '7', 'a')
+    """
+    return repr(val) if isinstance(val, float) else str(val)
+
+
+class DatabaseInputs(object):
+    """
+
+    Reads model inputs from database tables instead of from files in an
+    inputs directory. Pass an instance of this class to load_inputs()
+    as db_inputs.
+
+    Each input file corresponds to a table named after the file without
+    its extension (e.g., loads.tab is read from the loads table), with
+    the same column names as the file plus a scenario_id column. Only
+    the rows for the given scenario_id are read, batch_size rows at a
+    time. Tables that replace .dat files of scalar parameters, such as
+    financials.dat, have one column per parameter and one row per
+    scenario. Other .dat files and inputs that modules read straight from
+    disk are not available from a database. NULL values are treated as
+    missing data ('.').
+
+    connection can be any DB-API connection, e.g., from sqlite3 or
+    psycopg2. placeholder is the parameter marker used by its driver
+    ('?' for sqlite3, '%s' for psycopg2).
+
+    """
+
+    def __init__(self, connection, scenario_id, placeholder='?',
+                 batch_size=10000):
+        self.connection = connection
+        self.scenario_id = scenario_id
+        self.placeholder = placeholder
+        self.batch_size = batch_size
+        self._columns = {}
+
+    def table_name(self, path):
+        return os.path.splitext(os.path.basename(path))[0]
+
+    def columns(self, path):
+        """
+        Return the names of the input columns of the table for path, or
+        None if there is no such table.
+        """
+        table = self.table_name(path)
+        if table not in self._columns:
+            cur = self.connection.cursor()
+            try:
+                cur.execute('SELECT * FROM {} WHERE 1 = 0'.format(table))
+                self._columns[table] = [
+                    d[0] for d in cur.description if d[0] != 'scenario_id']
+            except Exception:
+                # Clear the failed transaction, if the driver uses one.
+                self.connection.rollback()
+                self._columns[table] = None
+            finally:
+                cur.close()
+        return self._columns[table]
+
+    def rows(self, path):
+        """
+        Generate the rows of the table for path that belong to this
+        scenario, as lists of values in the order given by columns().
+        """
+        cur = self.connection.cursor()
+        try:
+            cur.execute(
+                'SELECT {} FROM {} WHERE scenario_id = {}'.format(
+                    ', '.join(self.columns(path)), self.table_name(path),
+                    self.placeholder),
+                (self.scenario_id,))
+            while True:
+                batch = cur.fetchmany(self.batch_size)
+                if not batch:
+                    break
+                for row in batch:
+                    yield [_convert_db_value(v) for v in row]
+        finally:
+            cur.close()
+
+
+def _convert_db_value(val):
+    """Convert a value from a database driver to what a .tab file gives."""
+    if val is None:
+        return '.'
+    if isinstance(val, decimal.Decimal):
+        val = float(val)
+    if isinstance(val, float) and val in (float('inf'), float('-inf')):
+        # Pyomo's data processing only accepts infinity as text.
+        return str(val)
+    if isinstance(val, unicode):
+        return val.encode('utf-8')
+    return val
+
+
+class _DatabaseTable(TableData):
+    """
+    Pyomo data manager that passes the rows of a DatabaseInputs table to
+    the DataPortal, so they are processed exactly like a .tab file with
+    the same select, param, index and set options.
+    """
+
+    def __init__(self, db_inputs):
+        TableData.__init__(self)
+        self.db_inputs = db_inputs
+
+    def read(self):
+        self._set_data(
+            self.db_inputs.columns(self.filename),
+            list(self.db_inputs.rows(self.filename)))
+
+
+def _load_from_db(switch_data, **kwds):
+    """
+    Replacement for DataPortal.load() that reads the table matching the
+    filename argument from switch_data.db_inputs.
+    """
+    db_inputs = switch_data.db_inputs
+    path = kwds.pop('filename')
+    columns = db_inputs.columns(path)
+    if columns is None:
+        raise InputError(
+            'Table {} for {} was not found in the inputs database.'
+            .format(db_inputs.table_name(path), os.path.basename(path)))
+    if path.endswith('.dat'):
+        rows = list(db_inputs.rows(path))
+        if len(rows) != 1:
+            raise InputError(
+                'Table {} should have exactly one row for scenario {}.'
+                .format(db_inputs.table_name(path), db_inputs.scenario_id))
+        for (name, val) in zip(columns, rows[0]):
+            if val != '.':
+                switch_data[name] = {None: val}
+        return
+    table = _DatabaseTable(db_inputs)
+    table.initialize(filename=path, **kwds)
+    # DataPortal.load() uses an already-connected data manager as is.
+    switch_data._data_manager = table
+    try:
+        DataPortal.load(switch_data)
+    finally:
+        switch_data._data_manager = None
+
+
 # Define an argument parser that accepts the allow_abbrev flag to 
 # prevent partial matches, even on versions of Python before 3.5.
 # See https://bugs.python.org/issue14910
@@ -727,8 +2295,240 @@ def approx_equal(a, b, tolerance=0.01):
     return abs(a-b) <= (abs(a) + abs(b)) / 2.0 * tolerance
 
 
-def default_solver():
-    return pyomo.opt.SolverFactory('glpk')
+def default_solver(profile=None, profiles_file=DEFAULT_SOLVER_PROFILES):
+    """
+    Return a solver configured with the named profile from profiles_file
+    (see solver_settings()), or with the default profile if there is
+    one. Without a profiles file, this is GLPK with its default options.
+    """
+    return make_solver(
+        solver_settings(profile=profile, profiles_file=profiles_file))
+
+
+# Solver-specific names of the settings in a solver profile. Algorithm
+# choices map to an (option, value) pair, with an empty value for options
+# that are given as flags.
+_SOLVER_OPTION_NAMES = {
+    'glpk': {
+        'time_limit': 'tmlim',
+        'mip_gap': 'mipgap',
+        'lp_algorithm': {
+            'primal': ('primal', ''), 'dual': ('dual', ''),
+            'barrier': ('interior', '')},
+    },
+    # CBC chooses the LP algorithm with the primalS, dualS and barrier
+    # actions, but Pyomo puts actions after -solve on the command line,
+    # where they have no effect, so lp_algorithm is not supported.
+    'cbc': {
+        'threads': 'threads',
+        'time_limit': 'sec',
+        'mip_gap': 'ratio',
+    },
+    'cplex': {
+        'threads': 'threads',
+        'time_limit': 'timelimit',
+        'mip_gap': 'mip_tolerances_mipgap',
+        'lp_algorithm': {
+            'primal': ('lpmethod', 1), 'dual': ('lpmethod', 2),
+            'barrier': ('lpmethod', 4)},
+    },
+    'gurobi': {
+        'threads': 'Threads',
+        'time_limit': 'TimeLimit',
+        'mip_gap': 'MIPGap',
+        'lp_algorithm': {
+            'primal': ('Method', 0), 'dual': ('Method', 1),
+            'barrier': ('Method', 2)},
+    },
+}
+
+LP_ALGORITHMS = ('primal', 'dual', 'barrier')
+
+# Settings of a solver profile and the functions that convert them from
+# text, in the order they are reported.
+_SOLVER_SETTING_TYPES = [
+    ('solver', str),
+    ('threads', int),
+    ('time_limit', float),
+    ('mip_gap', float),
+    ('lp_algorithm', str),
+    ('tmp_dir', str),
+    ('options', str),
+]
+
+
+def add_solver_arguments(argparser):
+    """
+    Define the command-line options that select a solver profile and
+    override its settings. These are used by switch_mod.solve and
+    switch_mod.sweep; see solver_settings().
+    """
+    argparser.add_argument(
+        '--solver', type=str, default=None,
+        help='Linear program solver to use (default is "glpk")')
+    argparser.add_argument(
+        '--solver-profile', type=str, default=None, metavar='NAME',
+        help='Section of the solver profiles file to take solver settings '
+             'from (default is "default" if the file has that section)')
+    argparser.add_argument(
+        '--solver-profiles', type=str, default=DEFAULT_SOLVER_PROFILES,
+        metavar='FILE',
+        help='File of named solver profiles (default is "{}")'.format(
+            DEFAULT_SOLVER_PROFILES))
+    argparser.add_argument(
+        '--threads', type=int, default=None,
+        help='Number of threads the solver may use')
+    argparser.add_argument(
+        '--time-limit', type=float, default=None, metavar='SECONDS',
+        help='Stop the solver after this many seconds')
+    argparser.add_argument(
+        '--mip-gap', type=float, default=None,
+        help='Relative optimality gap at which to stop solving a mixed '
+             'integer program')
+    argparser.add_argument(
+        '--lp-algorithm', choices=LP_ALGORITHMS, default=None,
+        help='Algorithm to use for linear programs')
+    argparser.add_argument(
+        '--solver-tmp-dir', type=str, default=None, metavar='DIR',
+        help='Directory for the problem and solution files passed to and '
+             'from the solver')
+    argparser.add_argument(
+        '--solver-options', type=str, default=None, metavar='OPTIONS',
+        help='Other solver options, as a quoted string of name=value pairs')
+
+
+def solver_settings(args=None, profile=None,
+                    profiles_file=DEFAULT_SOLVER_PROFILES):
+    """
+
+    Return a dictionary of solver settings: the solver name plus any of
+    threads, time_limit (seconds), mip_gap, lp_algorithm, tmp_dir and
+    options (other solver options as name=value pairs). Settings come
+    from a profile, which is a section of an INI-style profiles file:
+
+        [default]
+        solver = glpk
+
+        [cluster]
+        solver = cbc
+        threads = 32
+        time_limit = 3600
+        mip_gap = 0.001
+        tmp_dir = /scratch/switch
+
+    If args (parsed with the options of add_solver_arguments()) is given,
+    it selects the profile and profiles file, and any settings given on
+    the command line override the profile. If no profile is named, the
+    default profile is used if the file has one. The solver defaults to
+    glpk. Raises InputError if a named profile doesn't exist or a setting
+    is not valid.
+
+    >>> solver_settings()
+    {'solver': 'glpk'}
+
+    """
+    if args is not None:
+        profile = args.solver_profile
+        profiles_file = args.solver_profiles
+    parser = ConfigParser.RawConfigParser()
+    if not parser.read([profiles_file]) and profile is not None:
+        raise InputError('Solver profiles file {} was not found.'.format(
+            profiles_file))
+    if profile is None and parser.has_section('default'):
+        profile = 'default'
+    settings = {'solver': 'glpk'}
+    if profile is not None:
+        if not parser.has_section(profile):
+            raise InputError('Solver profile {} is not defined in {}.'.format(
+                profile, profiles_file))
+        for (name, text) in parser.items(profile):
+            settings[name] = text
+    if args is not None:
+        overrides = {
+            'solver': args.solver, 'threads': args.threads,
+            'time_limit': args.time_limit, 'mip_gap': args.mip_gap,
+            'lp_algorithm': args.lp_algorithm,
+            'tmp_dir': args.solver_tmp_dir, 'options': args.solver_options}
+        settings.update(
+            (name, val) for (name, val) in overrides.iteritems()
+            if val is not None)
+    types_by_name = dict(_SOLVER_SETTING_TYPES)
+    for (name, val) in settings.items():
+        if name not in types_by_name:
+            raise InputError('Unknown solver setting {} in profile {}.'.format(
+                name, profile))
+        try:
+            settings[name] = types_by_name[name](val)
+        except ValueError:
+            raise InputError('Solver setting {} must be a {}, not {}.'.format(
+                name, types_by_name[name].__name__, val))
+    if settings.get('lp_algorithm', LP_ALGORITHMS[0]) not in LP_ALGORITHMS:
+        raise InputError('lp_algorithm must be one of {}.'.format(
+            ', '.join(LP_ALGORITHMS)))
+    return settings
+
+
+def make_solver(settings):
+    """
+
+    Return a Pyomo solver for a dictionary of settings from
+    solver_settings(). The generic settings are translated to the
+    solver's own option names for the solvers listed in
+    _SOLVER_OPTION_NAMES; settings that the solver doesn't support, such
+    as threads for GLPK or lp_algorithm for CBC, are reported and
+    ignored. The options setting is passed through as is.
+    tmp_dir becomes the directory for all of Pyomo's temporary files.
+
+    >>> opt = make_solver({'solver': 'glpk', 'time_limit': 60.0,
+    ...                    'lp_algorithm': 'barrier'})
+    >>> sorted(opt.options.items())
+    [('interior', ''), ('tmlim', 60)]
+    >>> opt = make_solver({'solver': 'cbc', 'lp_algorithm': 'dual'})
+    Ignoring solver setting lp_algorithm, which is not supported for cbc.
+
+    """
+    opt = pyomo.opt.SolverFactory(settings['solver'])
+    option_names = _SOLVER_OPTION_NAMES.get(settings['solver'], {})
+    for name in ('threads', 'time_limit', 'mip_gap', 'lp_algorithm'):
+        if name not in settings:
+            continue
+        val = settings[name]
+        if name not in option_names:
+            # This is reported in batch runs too, since the run would
+            # otherwise differ silently from what was asked for.
+            print "Ignoring solver setting {}, which is not supported " \
+                "for {}.".format(name, settings['solver'])
+            continue
+        if name == 'lp_algorithm':
+            (option, val) = option_names[name][val]
+        else:
+            option = option_names[name]
+        if option == 'tmlim':
+            # glpsol only accepts whole seconds.
+            val = int(math.ceil(val))
+        opt.options[option] = val
+    for pair in settings.get('options', '').split():
+        (option, sep, val) = pair.partition('=')
+        opt.options[option] = val
+    if 'tmp_dir' in settings:
+        if not os.path.exists(settings['tmp_dir']):
+            os.makedirs(settings['tmp_dir'])
+        pyutilib.services.TempfileManager.tempdir = settings['tmp_dir']
+    return opt
+
+
+def write_run_metrics(outdir, metrics):
+    """
+    Write a dictionary of run metrics (solver settings, timings, solver
+    status, etc.) to run_metrics.tab in outdir, one metric per row.
+    """
+    if not os.path.exists(outdir):
+        os.makedirs(outdir)
+    with open(os.path.join(outdir, 'run_metrics.tab'), 'wb') as f:
+        w = csv.writer(f, dialect='ampl-tab')
+        w.writerow(['metric', 'value'])
+        for name in sorted(metrics):
+            w.writerow([name, '.' if metrics[name] is None else metrics[name]])
 
 def make_iterable(item):
     """Return an iterable for the one or more items passed."""
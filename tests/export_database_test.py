@@ -0,0 +1,61 @@
+# Copyright 2016 The Switch Authors. All rights reserved.
+# Licensed under the Apache License, Version 2, which is in the LICENSE file.
+
+import sqlite3
+import unittest
+
+from pyomo.environ import Suffix, Var
+
+import switch_mod.solve
+from switch_mod.export.database import save_results_to_db
+
+
+class ExportDatabaseTest(unittest.TestCase):
+
+    def test_save_results_to_db(self):
+        (model, instance) = switch_mod.solve.load("test_dat")
+        for var in instance.component_objects(Var):
+            for (i, key) in enumerate(var):
+                var[key].value = i + 0.5 if i % 2 else None
+        instance.dual = Suffix(direction=Suffix.IMPORT)
+        for (i, key) in enumerate(instance.Energy_Balance):
+            instance.dual[instance.Energy_Balance[key]] = i * 2.0
+        con = sqlite3.connect(':memory:')
+
+        def count(table, scenario_id):
+            return con.execute(
+                'SELECT COUNT(*) FROM {} WHERE scenario_id = ?'.format(table),
+                (scenario_id,)).fetchone()[0]
+
+        save_results_to_db(instance, con, 1, batch_size=5)
+        num_rows = count('DispatchProj', 1)
+        self.assertEqual(num_rows, len(instance.DispatchProj))
+        self.assertEqual(
+            count('dual_Energy_Balance', 1), len(instance.Energy_Balance))
+        # The objective, plus each cost component and the total cost in
+        # each period.
+        self.assertEqual(
+            count('summary', 1),
+            1 + len(instance.PERIODS) * (
+                len(instance.cost_components_annual) +
+                len(instance.cost_components_tp) + 1))
+        self.assertEqual(
+            con.execute(
+                'SELECT Energy_Balance_index_1, Energy_Balance_index_2, dual '
+                'FROM dual_Energy_Balance ORDER BY dual LIMIT 1').fetchone(),
+            tuple(instance.Energy_Balance.keys()[0]) + (0.0,))
+        # Saving the same scenario again replaces its rows, while other
+        # scenarios are kept.
+        save_results_to_db(instance, con, 1)
+        save_results_to_db(instance, con, 2)
+        self.assertEqual(count('DispatchProj', 1), num_rows)
+        self.assertEqual(count('DispatchProj', 2), num_rows)
+        self.assertEqual(
+            con.execute('SELECT COUNT(*) FROM DispatchProj '
+                        'WHERE DispatchProj IS NULL').fetchone()[0],
+            2 * sum(1 for v in instance.DispatchProj.values()
+                    if v.value is None))
+
+
+if __name__ == '__main__':
+    unittest.main()
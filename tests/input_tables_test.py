@@ -0,0 +1,156 @@
+# Copyright 2016 The Switch Authors. All rights reserved.
+# Licensed under the Apache License, Version 2, which is in the LICENSE file.
+
+import imp
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+
+TOP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+input_tables = imp.load_source(
+    'get_switch_pyomo_input_tables',
+    os.path.join(TOP_DIR, 'python_utility_scripts',
+                 'get_switch_pyomo_input_tables.py'))
+
+
+class InputTablesTest(unittest.TestCase):
+    """
+    Runs the input extraction against an SQLite stand-in for the
+    chile_new schema.
+    """
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp(prefix='switch_test_')
+        self.db_path = os.path.join(self.temp_dir, 'chile_new.db')
+        self.inputs_dir = os.path.join(self.temp_dir, 'inputs')
+        os.makedirs(self.inputs_dir)
+        con = sqlite3.connect(self.db_path)
+        con.executescript("""
+            CREATE TABLE scenarios_switch_chile (
+                scenario_id, scenario_name, scenario_notes, hyd_id,
+                carbon_cap_id, carbon_tax_id, rps_id, fuel_cost_id,
+                overnight_cost_id, new_project_portfolio_id,
+                demand_scenario_id, timescales_set_id);
+            INSERT INTO scenarios_switch_chile VALUES
+                (1, 'Base', 'Test scenario', 1, 0, 2, 0, 1, 1, 1, 1, 3);
+            CREATE TABLE timescales_sets (
+                timescales_set_id, timescales_set_notes, study_start_year,
+                number_of_timepoints, number_of_periods);
+            INSERT INTO timescales_sets VALUES (3, 'Two periods', 2015, 4, 2);
+            CREATE TABLE timescales_set_periods (
+                timescales_set_id, period_name, period_start, period_end);
+            INSERT INTO timescales_set_periods VALUES
+                (3, 2030, 2026, 2035), (3, 2020, 2016, 2025),
+                (4, 2050, 2046, 2055);
+            CREATE TABLE timescales_set_timeseries (
+                timescales_set_id, timeseries_name, period_name,
+                duration_of_tps, num_tps, scale_to_period);
+            INSERT INTO timescales_set_timeseries VALUES
+                (3, '2020_all', 2020, 12, 2, 1826.1234567890124),
+                (3, '2030_all', 2030, 12, 2, NULL);
+        """)
+        con.commit()
+        con.close()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def connect(self):
+        con = sqlite3.connect(':memory:', check_same_thread=False)
+        con.execute("ATTACH DATABASE ? AS chile_new", (self.db_path,))
+        return con
+
+    def read_file(self, filename):
+        with open(os.path.join(self.inputs_dir, filename)) as f:
+            return f.read()
+
+    def test_export(self):
+        pool = input_tables.ConnectionPool(self.connect, 2)
+        try:
+            with pool.connection() as con:
+                scenario = input_tables.read_scenario(con, 1)
+            input_tables.write_scenario_files(self.inputs_dir, scenario)
+            tables = [t for t in input_tables.INPUT_TABLES
+                      if t[0] in ('periods.tab', 'timeseries.tab')]
+            paths = input_tables.export_tables(
+                pool, tables, scenario, self.inputs_dir)
+        finally:
+            pool.close()
+        self.assertEqual(
+            paths, [os.path.join(self.inputs_dir, t[0]) for t in tables])
+        self.assertEqual(
+            self.read_file('periods.tab'),
+            'INVESTMENT_PERIOD\tperiod_start\tperiod_end\n'
+            '2020\t2016\t2025\n'
+            '2030\t2026\t2035\n')
+        self.assertEqual(
+            self.read_file('timeseries.tab'),
+            'TIMESERIES\tts_period\tts_duration_of_tp\tts_num_tps\t'
+            'ts_scale_to_period\n'
+            '2020_all\t2020\t12\t2\t1826.1234567890124\n'
+            '2030_all\t2030\t12\t2\t.\n')
+        self.assertEqual(
+            self.read_file('modules').split(),
+            ['project.no_commit', 'fuel_cost', 'trans_build',
+             'trans_dispatch', 'Chile.exporting', 'Chile.carbon_tax'])
+        self.assertIn(
+            'Number of periods: 2\n', self.read_file('scenario_params_doc.txt'))
+        self.assertEqual(
+            sorted(os.listdir(self.inputs_dir)),
+            ['financials.dat', 'modules', 'periods.tab',
+             'scenario_params_doc.txt', 'timeseries.tab', 'trans_params.dat'])
+
+    def test_export_cache(self):
+        cache_dir = os.path.join(self.temp_dir, 'cache')
+        tables = [t for t in input_tables.INPUT_TABLES
+                  if t[0] in ('periods.tab', 'load_zones.tab')]
+        scenario = {'timescales_set_id': 3}
+        con = sqlite3.connect(self.db_path)
+        con.execute("CREATE TABLE load_zones (lz_name, lz_dbid, "
+                    "existing_local_td, local_td_annual_cost_per_mw)")
+        con.execute("INSERT INTO load_zones VALUES ('SIC', 1, 100, 50)")
+        con.commit()
+        pool = input_tables.ConnectionPool(self.connect, 2)
+        try:
+            input_tables.export_tables(
+                pool, tables, scenario, self.inputs_dir, cache_dir)
+            first_periods = self.read_file('periods.tab')
+            first_lz = self.read_file('load_zones.tab')
+            # Changes to the tables are not seen while the IDs that
+            # each file depends on stay the same.
+            con.execute("DELETE FROM timescales_set_periods")
+            con.execute("DELETE FROM load_zones")
+            con.commit()
+            input_tables.export_tables(
+                pool, tables, scenario, self.inputs_dir, cache_dir)
+            self.assertEqual(self.read_file('periods.tab'), first_periods)
+            self.assertEqual(self.read_file('load_zones.tab'), first_lz)
+            # periods.tab depends on timescales_set_id, but load_zones.tab
+            # doesn't.
+            scenario['timescales_set_id'] = 4
+            input_tables.export_tables(
+                pool, tables, scenario, self.inputs_dir, cache_dir)
+            self.assertEqual(
+                self.read_file('periods.tab'),
+                'INVESTMENT_PERIOD\tperiod_start\tperiod_end\n')
+            self.assertEqual(self.read_file('load_zones.tab'), first_lz)
+        finally:
+            pool.close()
+            con.close()
+        self.assertEqual(len(os.listdir(cache_dir)), 3)
+
+    def test_query_ids(self):
+        self.assertEqual(
+            [(t[0], input_tables.query_ids(t[2]))
+             for t in input_tables.INPUT_TABLES
+             if t[0] in ('loads.tab', 'fuels.tab', 'gen_new_build_costs.tab')],
+            [('loads.tab', ['demand_scenario_id', 'timescales_set_id']),
+             ('fuels.tab', []),
+             ('gen_new_build_costs.tab',
+              ['overnight_cost_id', 'timescales_set_id'])])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,115 @@
+# Copyright 2016 The Switch Authors. All rights reserved.
+# Licensed under the Apache License, Version 2, which is in the LICENSE file.
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from pyomo.environ import Constraint, Suffix, value
+from pyomo.opt import SolverResults
+from pyomo.repn import generate_canonical_repn
+
+import switch_mod.solve
+import switch_mod.utilities
+from switch_mod import matrix_constraints, scaling, solution_reader
+
+
+class MatrixConstraintsTest(unittest.TestCase):
+
+    def setUp(self):
+        (self.model, self.instance) = switch_mod.solve.load(
+            "test_dat", args=['--matrix-constraints'])
+
+    def test_rows_match_pyomo_constraints(self):
+        (model, instance) = switch_mod.solve.load("test_dat", args=[])
+        self.assertEqual(
+            self.instance.matrix_constraints,
+            [name for (name, module, builder) in matrix_constraints.FAMILIES])
+        for name in self.instance.matrix_constraints:
+            family = getattr(self.instance, name)
+            self.assertIsInstance(family, matrix_constraints.MatrixConstraint)
+            constraint = getattr(instance, name)
+            self.assertEqual(family.keys(), list(constraint.keys()))
+            rows = family.matrix()
+            for (k, key) in enumerate(family.index):
+                con = constraint[key]
+                repn = generate_canonical_repn(con.body)
+                constant = repn.constant or 0.0
+                expected = dict(
+                    (var.cname(True), a) for (var, a) in
+                    zip(repn.variables or [], repn.linear or []) if a != 0)
+                (cols, coefs) = rows.row(k)
+                self.assertEqual(dict(
+                    (rows.variables[j].cname(True), a)
+                    for (j, a) in zip(cols, coefs)), expected)
+                self.assertEqual(
+                    rows.lower[k], float('-inf') if con.lower is None
+                    else value(con.lower) - constant)
+                self.assertEqual(
+                    rows.upper[k], float('inf') if con.upper is None
+                    else value(con.upper) - constant)
+
+    def test_duals_are_stored_by_index(self):
+        instance = self.instance
+        instance.dual = Suffix(direction=Suffix.IMPORT)
+        problem = scaling.ScaledProblem(instance, passes=0)
+        temp_dir = tempfile.mkdtemp(prefix='switch_test_')
+        try:
+            path = os.path.join(temp_dir, 'problem.soln')
+            labels = sorted(
+                (int(label[5:-1]), label) for label in
+                problem.symbol_map().aliases)
+            labels.extend(
+                (i, 'c_e_r{}_'.format(i)) for (i, con) in
+                enumerate(problem.constraints) if isinstance(con, tuple))
+            with open(path, 'w') as f:
+                f.write('Optimal - objective value 123.45\n')
+                for (k, (i, label)) in enumerate(labels):
+                    f.write('{} {} 0 {!r}\n'.format(k, label, i + 0.5))
+                for j in range(len(problem.variables)):
+                    f.write('{} x{} 1.0 0\n'.format(j, j))
+            loader = problem.loader(duals=['Energy_Balance'])
+            solution_reader.read_cbc_solution(path, SolverResults(), loader)
+            loader.finish()
+        finally:
+            shutil.rmtree(temp_dir)
+        for (i, con) in enumerate(problem.constraints):
+            if not isinstance(con, tuple):
+                continue
+            (family, k) = con
+            row = family[family.index[k]]
+            if family.name == 'Energy_Balance':
+                self.assertEqual(instance.dual[row], i + 0.5)
+                self.assertIs(row.parent_component(), family)
+            else:
+                self.assertNotIn(row, instance.dual)
+        for var in problem.variables:
+            self.assertEqual(var.value, 1.0)
+
+    def test_duals_are_saved(self):
+        import sqlite3
+        from switch_mod.export.database import save_results_to_db
+        instance = self.instance
+        instance.dual = Suffix(direction=Suffix.IMPORT)
+        for (i, row) in enumerate(instance.Energy_Balance.itervalues()):
+            instance.dual[row] = i * 2.0
+        temp_dir = tempfile.mkdtemp(prefix='switch_test_')
+        try:
+            path = os.path.join(temp_dir, 'snapshot.pkl.gz')
+            switch_mod.utilities.save_solution_snapshot(instance, path)
+            new_instance = self.model.load_inputs(inputs_dir="test_dat")
+            switch_mod.utilities.load_solution_snapshot(new_instance, path)
+        finally:
+            shutil.rmtree(temp_dir)
+        for (i, row) in enumerate(new_instance.Energy_Balance.itervalues()):
+            self.assertEqual(new_instance.dual[row], i * 2.0)
+        con = sqlite3.connect(':memory:')
+        save_results_to_db(instance, con, 1)
+        self.assertEqual(
+            con.execute('SELECT COUNT(*) FROM dual_Energy_Balance').fetchone(),
+            (len(instance.Energy_Balance),))
+
+
+if __name__ == '__main__':
+    unittest.main()
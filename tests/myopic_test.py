@@ -0,0 +1,103 @@
+# Copyright 2016 The Switch Authors. All rights reserved.
+# Licensed under the Apache License, Version 2, which is in the LICENSE file.
+
+import unittest
+
+from pyomo.environ import Var, value
+from pyomo.opt import SolverResults, TerminationCondition
+
+import switch_mod.solve
+import switch_mod.utilities
+from switch_mod import myopic
+
+
+class MyopicTest(unittest.TestCase):
+
+    def setUp(self):
+        self.model = switch_mod.solve.define_model("test_dat", args=[])
+        self.data = switch_mod.utilities._load_data_portal(
+            self.model, "test_dat")
+        self.steps = []
+
+    def solve_step(self, instance):
+        # Stand in for a solver: build 2 MW of every new project and
+        # 1 MW of every new transmission line and local T&D.
+        self.steps.append(instance)
+        for var in instance.component_data_objects(Var):
+            if var.value is None:
+                var.value = var.lb if var.lb is not None else 0.0
+        for (proj, bld_yr) in instance.NEW_PROJ_BUILDYEARS:
+            instance.BuildProj[proj, bld_yr].value = 2.0
+        for key in instance.NEW_TRANS_BLD_YRS:
+            instance.BuildTrans[key].value = 1.0
+        for (lz, bld_yr) in instance.LOCAL_TD_BUILD_YEARS:
+            if bld_yr != 'Legacy':
+                instance.BuildLocalTD[lz, bld_yr].value = 1.0
+        results = SolverResults()
+        results.solver.termination_condition = TerminationCondition.optimal
+        return results
+
+    def test_periods_are_solved_in_order(self):
+        (instance, step_results) = myopic.solve(
+            self.model, self.data, self.solve_step)
+        self.assertEqual([p for (p, results) in step_results], [2020, 2030])
+        (first, second) = self.steps
+        self.assertEqual(list(first.PERIODS), [2020])
+        self.assertEqual(list(second.PERIODS), [2030])
+        self.assertEqual(
+            set(first.TIMEPOINTS) | set(second.TIMEPOINTS),
+            set(instance.TIMEPOINTS))
+        self.assertTrue(all(
+            bld_yr == 2020 for (g, bld_yr) in first.NEW_GENERATION_BUILDYEARS))
+        self.assertTrue(all(
+            p == 2030 for (r, p, st) in second.RFM_SUPPLY_TIERS))
+
+    def test_builds_become_existing_capacity(self):
+        (instance, step_results) = myopic.solve(
+            self.model, self.data, self.solve_step)
+        (first, second) = self.steps
+        for (proj, bld_yr) in first.NEW_PROJ_BUILDYEARS:
+            self.assertIn((proj, bld_yr), second.EXISTING_PROJ_BUILDYEARS)
+            self.assertEqual(second.proj_existing_cap[proj, bld_yr], 2.0)
+            self.assertEqual(
+                second.proj_overnight_cost[proj, bld_yr],
+                first.proj_overnight_cost[proj, bld_yr])
+        for tx in first.TRANSMISSION_LINES:
+            self.assertEqual(
+                second.existing_trans_cap[tx],
+                first.existing_trans_cap[tx] + 1.0)
+        for lz in first.LOAD_ZONES:
+            self.assertEqual(
+                second.existing_local_td[lz],
+                first.existing_local_td[lz] + 1.0)
+        # The whole model holds the decisions of each period, with the
+        # existing capacity of the first one.
+        for (key, var) in instance.BuildProj.iteritems():
+            if key in first.NEW_PROJ_BUILDYEARS:
+                self.assertEqual(var.value, 2.0)
+            elif key in second.NEW_PROJ_BUILDYEARS:
+                self.assertEqual(var.value, 2.0)
+            else:
+                self.assertEqual(var.value, first.proj_existing_cap[key])
+        for (tx, bld_yr) in instance.EXISTING_TRANS_BLD_YRS:
+            self.assertEqual(
+                instance.BuildTrans[tx, bld_yr].value,
+                first.existing_trans_cap[tx])
+        self.assertEqual(
+            value(instance.TransCapacity['N-C', 2030]),
+            value(second.TransCapacity['N-C', 2030]))
+
+    def test_stops_at_infeasible_period(self):
+        def solve_step(instance):
+            results = self.solve_step(instance)
+            results.solver.termination_condition = (
+                TerminationCondition.infeasible)
+            return results
+        (instance, step_results) = myopic.solve(
+            self.model, self.data, solve_step)
+        self.assertIsNone(instance)
+        self.assertEqual([p for (p, results) in step_results], [2020])
+
+
+if __name__ == '__main__':
+    unittest.main()
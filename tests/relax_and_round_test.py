@@ -0,0 +1,66 @@
+# Copyright 2016 The Switch Authors. All rights reserved.
+# Licensed under the Apache License, Version 2, which is in the LICENSE file.
+
+import unittest
+
+from pyomo.environ import (
+    ConcreteModel, NonNegativeIntegers, NonNegativeReals, Objective, Var)
+from pyomo.opt import SolverResults, TerminationCondition
+
+from switch_mod import relax_and_round
+
+
+class RelaxAndRoundTest(unittest.TestCase):
+
+    def setUp(self):
+        m = self.model = ConcreteModel()
+        m.units = Var([1, 2], within=NonNegativeIntegers, bounds=(0, 5))
+        m.dispatch = Var(within=NonNegativeReals)
+        m.cost = Objective(expr=10 * m.units[1] + 10 * m.units[2] + m.dispatch)
+        self.calls = []
+
+    def solve_step(self, instance, warmstart=False):
+        # Stands in for a solver: the relaxation builds 2.4 and 0.2
+        # units, and only 3 units of the first kind are feasible.
+        m = self.model
+        self.calls.append((warmstart, m.units[1].is_continuous(),
+                           m.units[1].fixed and m.units[1].value))
+        results = SolverResults()
+        results.solver.termination_condition = TerminationCondition.optimal
+        if not m.units[1].fixed:
+            if m.units[1].is_continuous():
+                (m.units[1].value, m.units[2].value) = (2.4, 0.2)
+            m.dispatch.value = 1.0
+        elif m.units[1].value != 3:
+            results.solver.termination_condition = (
+                TerminationCondition.infeasible)
+        else:
+            m.dispatch.value = 1.0
+        return results
+
+    def test_repair_rounds_up(self):
+        (results, summary) = relax_and_round.solve(
+            self.model, self.solve_step)
+        m = self.model
+        self.assertEqual(
+            self.calls,
+            [(False, True, False), (False, True, 2.0), (False, True, 3.0)])
+        self.assertEqual(summary['heuristic_rounding'], 'up')
+        self.assertEqual(summary['relaxation_objective'], 27.0)
+        self.assertEqual(summary['heuristic_objective'], 41.0)
+        self.assertEqual(summary['heuristic_gap'], (41.0 - 27.0) / 41.0)
+        self.assertEqual((m.units[1].value, m.units[2].value), (3.0, 1.0))
+        self.assertFalse(m.units[1].fixed)
+        self.assertFalse(m.units[1].is_continuous())
+
+    def test_mip_start(self):
+        (results, summary) = relax_and_round.solve(
+            self.model, self.solve_step, mip_start=True)
+        self.assertEqual(self.calls[-1], (True, False, False))
+        self.assertEqual(summary['mip_objective'], 41.0)
+        self.assertEqual(
+            summary['mip_gap'], relax_and_round.gap(41.0, 27.0))
+
+
+if __name__ == '__main__':
+    unittest.main()
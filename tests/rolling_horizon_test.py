@@ -0,0 +1,117 @@
+# Copyright 2016 The Switch Authors. All rights reserved.
+# Licensed under the Apache License, Version 2, which is in the LICENSE file.
+
+import unittest
+
+from pyomo.environ import Var, value
+from pyomo.opt import SolverResults, TerminationCondition
+
+import switch_mod.utilities
+from switch_mod import myopic, rolling_horizon
+
+
+class _AssignSolver(object):
+    """
+    Stands in for a solver by setting every variable that isn't fixed to
+    1, except that local T&D is built up to the last timepoint number.
+    """
+
+    def solve(self, instance, **kwds):
+        for var in instance.component_data_objects(Var):
+            if not var.fixed:
+                var.value = 1.0
+        for (key, var) in instance.BuildLocalTD.iteritems():
+            if not var.fixed:
+                var.value = float(max(instance.TIMEPOINTS))
+        results = SolverResults()
+        results.solver.termination_condition = TerminationCondition.optimal
+        return results
+
+
+class RollingHorizonTest(unittest.TestCase):
+
+    def setUp(self):
+        self.model = switch_mod.utilities.define_AbstractModel(
+            'switch_mod', 'local_td', 'project.unitcommit', 'fuel_markets',
+            'trans_build', 'trans_dispatch', args=[])
+        self.portal = switch_mod.utilities._load_data_portal(
+            self.model, 'test_dat')
+        self.data = self.portal.data()
+        self.kinds = myopic.data_kinds(self.model, self.data)
+        rolling_horizon._worker_state.clear()
+        rolling_horizon._worker_state.update(
+            inputs_dir='test_dat', model=self.model, portal=self.portal,
+            kinds=self.kinds, opt=_AssignSolver())
+
+    def tearDown(self):
+        rolling_horizon._worker_state.clear()
+
+    def test_window_weights_fill_period(self):
+        (data, factor) = rolling_horizon.window_data(
+            self.data, self.kinds, ['2020_01winter'])
+        instance = switch_mod.utilities._create_instance(
+            self.model, {None: data}, self.portal.dense_params)
+        self.assertEqual(list(instance.PERIODS), [2020])
+        self.assertEqual(list(instance.TIMEPOINTS), [1, 2, 3, 4])
+        # The time weights are checked when the instance is constructed.
+        self.assertAlmostEqual(
+            sum(value(instance.tp_weight[t]) for t in instance.TIMEPOINTS),
+            value(instance.period_length_hours[2020]), delta=1.0)
+        self.assertGreater(factor, 1)
+
+    def test_joined_timeseries_start_from_initial_commit(self):
+        (data, factor) = rolling_horizon.window_data(
+            self.data, self.kinds, ['2020_01winter'], True, {'S-NG_CC': 3.0})
+        instance = switch_mod.utilities._create_instance(
+            self.model, {None: data}, self.portal.dense_params)
+        self.assertEqual(dict(instance.proj_initial_commit.iteritems()),
+                         {('S-NG_CC', 1): 3.0})
+        self.assertEqual(instance.tp_previous[1], 4)
+        body = str(instance.Commit_Startup_Shutdown_Consistency[
+            'S-NG_CC', 1].body)
+        self.assertNotIn('CommitProject[S-NG_CC,4]', body)
+        # Timeseries with different weights can't be joined.
+        self.assertRaises(
+            switch_mod.utilities.InputError, rolling_horizon.window_data,
+            self.data, self.kinds, ['2020_01winter', '2020_06summer'], True)
+
+    def test_only_kept_timeseries_are_loaded(self):
+        solution = rolling_horizon._solve_window(
+            (['2020_01winter', '2020_06summer'], ['2020_01winter'], False,
+             None, None))
+        self.assertTrue(solution['success'])
+        dispatch = dict(solution['values']['DispatchProj'])
+        self.assertEqual(
+            set(t for (proj, t) in dispatch), set([1, 2, 3, 4]))
+        self.assertEqual(
+            sorted(solution['terminal_commit']),
+            sorted(proj for (proj, t) in dispatch if t == 4))
+        instance = switch_mod.utilities._create_instance(
+            self.model, self.portal)
+        rolling_horizon.load_window_solutions(instance, [solution])
+        for ((proj, t), var) in instance.DispatchProj.iteritems():
+            self.assertEqual(var.value, 1.0 if t <= 4 else None)
+
+    def test_windows_share_capacity(self):
+        windows = rolling_horizon.make_windows(
+            ['2020_01winter', '2020_06summer'], 1)
+        (solutions, resolved) = rolling_horizon.solve_windows(
+            windows, [['2020_01winter', '2020_06summer']])
+        # The first window built less local T&D than the second, so it
+        # was solved again with the capacity of the second.
+        self.assertEqual(
+            [s['window'] for s in resolved], [['2020_01winter']])
+        for solution in solutions:
+            self.assertTrue(solution['success'])
+            self.assertEqual(
+                set(val for (key, val) in solution['values']['BuildLocalTD']
+                    if key[1] == 2020),
+                set([6.0]))
+        self.assertEqual(
+            set(val for (key, val) in resolved[0]['values']['BuildLocalTD']
+                if key[1] == 2020),
+            set([4.0]))
+
+
+if __name__ == '__main__':
+    unittest.main()
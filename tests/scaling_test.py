@@ -0,0 +1,78 @@
+# Copyright 2016 The Switch Authors. All rights reserved.
+# Licensed under the Apache License, Version 2, which is in the LICENSE file.
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from pyomo.environ import Suffix
+from pyomo.opt import SolverResults, TerminationCondition
+
+import switch_mod.solve
+from switch_mod import scaling, solution_reader
+
+
+class ScalingTest(unittest.TestCase):
+
+    def setUp(self):
+        (self.model, self.instance) = switch_mod.solve.load("test_dat")
+        self.instance.dual = Suffix(direction=Suffix.IMPORT)
+        self.problem = scaling.ScaledProblem(self.instance)
+        self.temp_dir = tempfile.mkdtemp(prefix='switch_test_')
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_scaling_narrows_coefficient_range(self):
+        (smallest, largest) = self.problem.coefficient_range(scaled=False)
+        (scaled_smallest, scaled_largest) = self.problem.coefficient_range()
+        self.assertLess(scaled_largest / scaled_smallest, largest / smallest)
+        for (var, c) in zip(self.problem.variables, self.problem.col_scale):
+            if not var.is_continuous():
+                self.assertEqual(c, 1.0)
+
+    def test_solution_is_unscaled(self):
+        problem = self.problem
+        path = os.path.join(self.temp_dir, 'problem.lp')
+        problem.write(path)
+        with open(path) as f:
+            text = f.read()
+        self.assertTrue(text.endswith('end\n'))
+        # Values in the units of the original model, and the values and
+        # duals of the scaled problem that correspond to them.
+        values = [j + 0.5 for j in range(len(problem.variables))]
+        scaled_duals = [i * 2.0 for i in range(len(problem.rows))]
+        soln_path = os.path.join(self.temp_dir, 'problem.soln')
+        with open(soln_path, 'w') as f:
+            f.write('Optimal - objective value 123.45\n')
+            # Rows are labeled like c_e_r12_; range constraints have two
+            # rows, and the dual of the upper one is left at zero.
+            labels = sorted(
+                problem.symbol_map().aliases, key=lambda l: int(l[5:-1]))
+            for (k, label) in enumerate(labels):
+                dual = 0.0 if label[:4] == 'r_u_' else scaled_duals[
+                    int(label[5:-1])]
+                f.write('{} {} 0 {!r}\n'.format(k, label, dual))
+            for (j, val) in enumerate(values):
+                f.write('{} x{} {!r} 0\n'.format(
+                    j, j, val / problem.col_scale[j]))
+        loader = problem.loader(duals=['Energy_Balance'])
+        results = SolverResults()
+        solution_reader.read_cbc_solution(soln_path, results, loader)
+        loader.finish()
+        self.assertEqual(results.solver.termination_condition,
+                         TerminationCondition.optimal)
+        for (var, val) in zip(problem.variables, values):
+            self.assertEqual(var.value, val)
+        for (i, con) in enumerate(problem.constraints):
+            if con.parent_component().name == 'Energy_Balance':
+                self.assertEqual(
+                    self.instance.dual[con], scaled_duals[i] *
+                    problem.row_scale[i] / problem.obj_scale)
+            else:
+                self.assertNotIn(con, self.instance.dual)
+
+
+if __name__ == '__main__':
+    unittest.main()
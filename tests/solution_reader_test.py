@@ -0,0 +1,193 @@
+# Copyright 2016 The Switch Authors. All rights reserved.
+# Licensed under the Apache License, Version 2, which is in the LICENSE file.
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from pyomo.environ import (
+    ConcreteModel, Constraint, NonNegativeIntegers, Objective, Suffix, Var)
+from pyomo.opt import SolverResults, TerminationCondition
+from pyomo.solvers.plugins.solvers.CBCplugin import CBCSHELL
+
+import switch_mod.solve
+import switch_mod.utilities
+from switch_mod import solution_reader
+
+
+class SolutionReaderTest(unittest.TestCase):
+
+    def setUp(self):
+        (self.model, self.instance) = switch_mod.solve.load("test_dat")
+        self.instance.dual = Suffix(direction=Suffix.IMPORT)
+        self.temp_dir = tempfile.mkdtemp(prefix='switch_test_')
+        (lp_path, smap_id) = self.instance.write(
+            os.path.join(self.temp_dir, 'problem.lp'))
+        self.symbol_map = self.instance.solutions.symbol_map[smap_id]
+        # Columns and rows of the problem in the order a solver would
+        # report them, with made-up values. Variables that don't appear
+        # in any constraint are not written to the problem file.
+        self.cols = [
+            (self.symbol_map.byObject[id(v)], v, i + 0.5) for (i, v) in
+            enumerate(self.instance.component_data_objects(Var))
+            if id(v) in self.symbol_map.byObject]
+        self.rows = [
+            (label, ref(), i * 2.0) for (i, (label, ref)) in
+            enumerate(sorted(self.symbol_map.aliases.items()))
+            if label[:2] == 'c_']
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_read_cbc_solution(self):
+        soln_path = os.path.join(self.temp_dir, 'problem.soln')
+        with open(soln_path, 'w') as f:
+            f.write('Optimal - objective value 123.45\n')
+            for (i, (label, con, dual)) in enumerate(self.rows):
+                f.write('{:>6} {} 0 {!r}\n'.format(i, label, dual))
+            for (i, (label, var, val)) in enumerate(self.cols):
+                f.write('{:>6} {} {!r} 0\n'.format(i, label, val))
+        loader = solution_reader.SolutionLoader(
+            self.instance, self.symbol_map, variables=['BuildProj'],
+            duals=['Energy_Balance'])
+        results = SolverResults()
+        solution_reader.read_cbc_solution(soln_path, results, loader)
+        loader.finish()
+        for (label, var, val) in self.cols:
+            self.assertEqual(
+                var.value, val if var.parent_component().name == 'BuildProj'
+                else None)
+        for (label, con, dual) in self.rows:
+            self.assertEqual(
+                self.instance.dual.get(con),
+                dual if con.parent_component().name == 'Energy_Balance'
+                else None)
+
+    def test_read_cbc_solution_without_rows(self):
+        # Without -printingOptions all, CBC writes only the nonzero
+        # columns and no rows.
+        soln_path = os.path.join(self.temp_dir, 'problem.soln')
+        nonzero = self.cols[1::2]
+        with open(soln_path, 'w') as f:
+            f.write('Optimal - objective value 123.45\n')
+            for (i, (label, var, val)) in enumerate(self.cols):
+                if (label, var, val) in nonzero:
+                    f.write('{:>6} {} {!r} 0\n'.format(i, label, val))
+        loader = solution_reader.SolutionLoader(self.instance, self.symbol_map)
+        results = SolverResults()
+        solution_reader.read_cbc_solution(soln_path, results, loader)
+        loader.finish()
+        for (label, var, val) in nonzero:
+            self.assertEqual(var.value, val)
+        self.assertEqual(len(self.instance.dual), 0)
+        # A solution without any columns can't be loaded.
+        with open(soln_path, 'w') as f:
+            f.write('Optimal - objective value 123.45\n')
+        self.assertRaises(
+            ValueError, solution_reader.read_cbc_solution, soln_path,
+            SolverResults(), solution_reader.SolutionLoader(
+                self.instance, self.symbol_map))
+
+    def test_read_glpk_solution(self):
+        glp_path = os.path.join(self.temp_dir, 'problem.glp')
+        raw_path = os.path.join(self.temp_dir, 'problem.raw')
+        with open(glp_path, 'w') as f:
+            f.write('p lp min {} {} 0\n'.format(
+                len(self.rows), len(self.cols)))
+            for (i, (label, con, dual)) in enumerate(self.rows):
+                f.write('n i {} {}\n'.format(i + 1, label))
+            for (i, (label, var, val)) in enumerate(self.cols):
+                f.write('n j {} {}\n'.format(i + 1, label))
+        with open(raw_path, 'w') as f:
+            f.write('{} {}\n'.format(len(self.rows), len(self.cols)))
+            # 5 is GLPK's status code for an optimal solution.
+            f.write('5 5 123.45\n')
+            for (label, con, dual) in self.rows:
+                f.write('1 0 {!r}\n'.format(dual))
+            for (label, var, val) in self.cols:
+                f.write('1 {!r} 0\n'.format(val))
+        loader = solution_reader.SolutionLoader(self.instance, self.symbol_map)
+        results = SolverResults()
+        solution_reader.read_glpk_solution(
+            glp_path, raw_path, results, loader)
+        loader.finish()
+        self.assertEqual(results.solver.termination_condition,
+                         TerminationCondition.optimal)
+        self.assertEqual(results.problem.upper_bound, 123.45)
+        for (label, var, val) in self.cols:
+            self.assertEqual(var.value, val)
+        for (label, con, dual) in self.rows:
+            self.assertEqual(self.instance.dual[con], dual)
+
+    def test_export_and_ingest(self):
+        problem_dir = os.path.join(self.temp_dir, 'offline')
+        solution_reader.export_problem(self.instance, problem_dir, 'abc')
+        self.assertTrue(
+            os.path.isfile(os.path.join(problem_dir, 'problem.lp')))
+        # The solution is read onto a new instance of the same model,
+        # using the labels saved with the problem.
+        instance = switch_mod.utilities._create_instance(
+            self.model, self.instance.DataPortal)
+        instance.dual = Suffix(direction=Suffix.IMPORT)
+        with open(os.path.join(problem_dir, 'problem.soln'), 'w') as f:
+            f.write('Optimal - objective value 123.45\n')
+            for (i, (label, con, dual)) in enumerate(self.rows):
+                f.write('{:>6} {} 0 {!r}\n'.format(i, label, dual))
+            for (i, (label, var, val)) in enumerate(self.cols):
+                f.write('{:>6} {} {!r} 0\n'.format(i, label, val))
+        self.assertRaises(
+            solution_reader.SolutionMismatchError,
+            solution_reader.ingest_solution, instance, problem_dir, 'xyz')
+        results = solution_reader.ingest_solution(
+            instance, problem_dir, 'abc')
+        self.assertEqual(results.solver.termination_condition,
+                         TerminationCondition.optimal)
+        for (label, var, val) in self.cols:
+            new_var = getattr(instance, var.parent_component().name)[
+                var.index()]
+            self.assertEqual(new_var.value, val)
+        for (label, con, dual) in self.rows:
+            new_con = getattr(instance, con.parent_component().name)[
+                con.index()]
+            self.assertEqual(instance.dual[new_con], dual)
+
+    def test_cbc_mip_start(self):
+        m = ConcreteModel()
+        m.units = Var([1, 2], within=NonNegativeIntegers)
+        m.flow = Var()
+        m.limit = Constraint(expr=m.units[1] + m.units[2] + m.flow >= 3)
+        m.cost = Objective(expr=m.units[1] + 2 * m.units[2] + m.flow)
+        m.units[1].value = 2.0
+        m.flow.value = 1.0
+        opt = CBCSHELL()
+        commands = []
+
+        def fake_solve(instance, **kwds):
+            # Write the problem and build the command line, like the
+            # plugin's _presolve(), without running CBC.
+            self.assertNotIn('warmstart', kwds)
+            (lp_path, opt._smap_id) = instance.write(
+                os.path.join(self.temp_dir, 'mip.lp'))
+            opt._timelimit = None
+            commands.append(
+                opt.create_command_line('cbc', [lp_path]).cmd)
+            with open(commands[-1][commands[-1].index('-mipstart') + 1]) as f:
+                commands.append(f.read())
+            return SolverResults()
+
+        opt.solve = fake_solve
+        solution_reader.solve(opt, m, warmstart=True)
+        (cmd, mip_start) = commands
+        # The MIP start is read after the problem and before the solve.
+        self.assertLess(cmd.index('-import'), cmd.index('-mipstart'))
+        self.assertLess(cmd.index('-mipstart'), cmd.index('-solve'))
+        # Only integer variables with values are in the MIP start.
+        label = m.solutions.symbol_map[opt._smap_id].byObject[id(m.units[1])]
+        self.assertEqual(mip_start, 'Solution\n0 {} 2.0\n'.format(label))
+        # The plugin is left as it was.
+        self.assertNotIn('create_command_line', opt.__dict__)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,10 @@
 # Copyright 2015 The Switch Authors. All rights reserved.
 # Licensed under the Apache License, Version 2, which is in the LICENSE file.
 
+import gzip
+import os
+import shutil
+import tempfile
 import unittest
 
 import switch_mod.utilities as utilities
@@ -14,6 +18,13 @@ class UtilitiesTest(unittest.TestCase):
         assert utilities.approx_equal(1, 1.01)
         assert utilities.approx_equal(1, 1)
 
+    def saved_data(self, instance):
+        # Parameters stored densely are saved along with the data portal.
+        data = dict(instance.DataPortal.data())
+        for (name, dense) in instance.DataPortal.dense_params.iteritems():
+            data[name] = dict(dense.iteritems())
+        return data
+
     def test_save_inputs_as_dat(self):
         import switch_mod.solve
         from pyomo.environ import DataPortal
@@ -25,8 +36,320 @@ class UtilitiesTest(unittest.TestCase):
         utilities.save_inputs_as_dat(model, instance, save_path=dat_path)
         reloaded_data = DataPortal(model=model)
         reloaded_data.load(filename=dat_path)
-        compare(reloaded_data.data(), instance.DataPortal.data())
-    
+        compare(reloaded_data.data(), self.saved_data(instance))
+
+    def test_save_inputs_as_dat_split_gzip(self):
+        import switch_mod.solve
+        from pyomo.environ import DataPortal
+        from testfixtures import compare
+        (model, instance) = switch_mod.solve.load("test_dat")
+        temp_dir = tempfile.mkdtemp(prefix='switch_test_')
+        try:
+            paths = utilities.save_inputs_as_dat(
+                model, instance,
+                save_path=os.path.join(temp_dir, 'inputs.gz'),
+                split_components=True, num_workers=4)
+            reloaded_data = DataPortal(model=model)
+            for path in paths:
+                # DataPortal can't read compressed files directly.
+                dat_path = path[:-len('.gz')]
+                with gzip.open(path, 'rb') as src:
+                    with open(dat_path, 'wb') as dst:
+                        shutil.copyfileobj(src, dst)
+                reloaded_data.load(filename=dat_path)
+            compare(reloaded_data.data(), self.saved_data(instance))
+        finally:
+            shutil.rmtree(temp_dir)
+
+    def test_lean_memory(self):
+        import switch_mod.solve
+        (model, instance) = switch_mod.solve.load("test_dat")
+        (lean_model, lean_instance) = switch_mod.solve.load(
+            "test_dat", args=['--lean-memory'])
+        self.assertFalse(hasattr(lean_instance, 'DataPortal'))
+        temp_dir = tempfile.mkdtemp(prefix='switch_test_')
+        try:
+            paths = [os.path.join(temp_dir, name)
+                     for name in ('inputs.dat', 'lean_inputs.dat')]
+            utilities.save_inputs_as_dat(
+                model, instance, save_path=paths[0], determistic_order=True)
+            utilities.save_inputs_as_dat(
+                lean_model, lean_instance, save_path=paths[1],
+                determistic_order=True)
+            (full, lean) = [open(path).read() for path in paths]
+        finally:
+            shutil.rmtree(temp_dir)
+        self.assertEqual(lean, full)
+        self.assertFalse(hasattr(lean_instance, 'DataPortal'))
+
+    def test_load_inputs_from_database(self):
+        import csv
+        import sqlite3
+        import switch_mod.solve
+        from testfixtures import compare
+        # Copy test_dat into an SQLite database, one table per file.
+        con = sqlite3.connect(':memory:')
+        for filename in os.listdir('test_dat'):
+            (table, ext) = os.path.splitext(filename)
+            if ext != '.tab':
+                continue
+            with open(os.path.join('test_dat', filename), 'rb') as f:
+                rows = list(csv.reader(f, delimiter='\t'))
+            # Only the first of any repeated columns is ever read.
+            keep = [i for (i, c) in enumerate(rows[0])
+                    if rows[0].index(c) == i]
+            columns = [rows[0][i] for i in keep] + ['scenario_id']
+            con.execute('CREATE TABLE {} ({})'.format(
+                table, ', '.join('"{}"'.format(c) for c in columns)))
+            con.executemany(
+                'INSERT INTO {} VALUES ({})'.format(
+                    table, ', '.join('?' * len(columns))),
+                [[None if row[i] == '.'
+                  else utilities._convert_tab_value(row[i])
+                  for i in keep] + [1]
+                 for row in rows[1:] if row])
+        con.execute('CREATE TABLE financials (base_financial_year, '
+                    'interest_rate, discount_rate, scenario_id)')
+        con.execute('INSERT INTO financials VALUES (2015, .07, .05, 1)')
+        con.execute('INSERT INTO financials VALUES (2020, .1, .1, 2)')
+        con.execute('CREATE TABLE modules (module, scenario_id)')
+        with open(os.path.join('test_dat', 'modules')) as f:
+            con.executemany(
+                'INSERT INTO modules VALUES (?, 1)',
+                [(line.strip(),) for line in f if line.strip()])
+        db_inputs = utilities.DatabaseInputs(con, 1, batch_size=7)
+        (model, instance) = switch_mod.solve.load("test_dat")
+        (db_model, db_instance) = switch_mod.solve.load(
+            "no_such_dir", db_inputs=db_inputs)
+        compare(db_instance.DataPortal.data(), instance.DataPortal.data())
+        compare(self.saved_data(db_instance), self.saved_data(instance))
+
+    def test_load_mapped_capacity_factors(self):
+        import switch_mod.solve
+        (model, instance) = switch_mod.solve.load("test_dat")
+        temp_dir = tempfile.mkdtemp(prefix='switch_test_')
+        try:
+            inputs_dir = os.path.join(temp_dir, 'inputs')
+            shutil.copytree('test_dat', inputs_dir)
+            os.remove(os.path.join(
+                inputs_dir, 'variable_capacity_factors.tab'))
+            utilities.write_npy_param(
+                instance.DataPortal.dense_params['proj_max_capacity_factor'],
+                os.path.join(inputs_dir, 'variable_capacity_factors.npy'),
+                os.path.join(
+                    inputs_dir, 'variable_capacity_factors_projects.txt'),
+                os.path.join(
+                    inputs_dir, 'variable_capacity_factors_timepoints.txt'))
+            (model, mapped_instance) = switch_mod.solve.load(inputs_dir)
+        finally:
+            shutil.rmtree(temp_dir)
+        mapped = mapped_instance.DataPortal.dense_params[
+            'proj_max_capacity_factor']
+        self.assertIsInstance(mapped, utilities.MappedParamData)
+        self.assertEqual(
+            dict(mapped.iteritems()),
+            dict(instance.proj_max_capacity_factor.iteritems()))
+        for key in instance.proj_max_capacity_factor:
+            self.assertEqual(
+                mapped_instance.proj_max_capacity_factor[key],
+                instance.proj_max_capacity_factor[key])
+
+    def test_dense_data_stays_with_instance(self):
+        import switch_mod.solve
+        (model, instance) = switch_mod.solve.load("test_dat")
+        self.assertIsNone(model.proj_max_capacity_factor.default())
+        self.assertIsInstance(
+            instance.proj_max_capacity_factor.default(),
+            utilities.DenseParamData)
+        # Inputs without capacity factors don't get those of the last
+        # instance made from the model.
+        temp_dir = tempfile.mkdtemp(prefix='switch_test_')
+        try:
+            inputs_dir = os.path.join(temp_dir, 'inputs')
+            shutil.copytree('test_dat', inputs_dir)
+            os.remove(os.path.join(
+                inputs_dir, 'variable_capacity_factors.tab'))
+            self.assertRaises(
+                ValueError, model.load_inputs, inputs_dir=inputs_dir)
+        finally:
+            shutil.rmtree(temp_dir)
+
+    def test_instance_checkpoint(self):
+        import switch_mod.solve
+        temp_dir = tempfile.mkdtemp(prefix='switch_test_')
+        try:
+            path = os.path.join(temp_dir, 'instance.pkl')
+            (model, instance) = switch_mod.solve.load(
+                "test_dat", checkpoint=path)
+            self.assertTrue(os.path.isfile(path))
+            (model, loaded) = switch_mod.solve.load(
+                "test_dat", checkpoint=path)
+            self.assertFalse(hasattr(loaded, 'DataPortal'))
+            lp_paths = [os.path.join(temp_dir, name)
+                        for name in ('built.lp', 'loaded.lp')]
+            for (m, lp_path) in zip((instance, loaded), lp_paths):
+                m.write(lp_path, io_options={'symbolic_solver_labels': True})
+            (built_lp, loaded_lp) = [open(p).read() for p in lp_paths]
+            # A checkpoint saved with different options is not used.
+            fingerprint = utilities.model_fingerprint(model, "test_dat")
+            self.assertIsNone(utilities.load_instance_checkpoint(
+                model, path, fingerprint + 'x'))
+        finally:
+            shutil.rmtree(temp_dir)
+        self.assertEqual(loaded_lp, built_lp)
+
+    def test_result_cache(self):
+        import filecmp
+        import switch_mod.solve
+        from pyomo.environ import Var
+        (model, instance) = switch_mod.solve.load("test_dat")
+        for var in instance.component_objects(Var):
+            for (i, key) in enumerate(var):
+                var[key].value = i + 0.5
+        temp_dir = tempfile.mkdtemp(prefix='switch_test_')
+        try:
+            cache_dir = os.path.join(temp_dir, 'cache')
+            outputs_dir = os.path.join(temp_dir, 'outputs')
+            # Files of other runs in the outputs directory aren't cached.
+            os.makedirs(os.path.join(outputs_dir, 'other_case'))
+            for path in ('stale.txt', os.path.join('other_case', 'x.txt')):
+                with open(os.path.join(outputs_dir, path), 'w') as f:
+                    f.write('from another run\n')
+            output_times = utilities.output_file_times(outputs_dir)
+            utilities.export_results(model, instance, outputs_dir)
+            snapshot_path = os.path.join(temp_dir, 'snapshot.pkl.gz')
+            utilities.save_solution_snapshot(instance, snapshot_path)
+            fingerprint = utilities.model_fingerprint(model, "test_dat")
+            self.assertIsNone(utilities.restore_cached_results(
+                cache_dir, fingerprint, outputs_dir))
+            utilities.cache_results(
+                cache_dir, fingerprint, outputs_dir,
+                utilities.files_written_since(outputs_dir, output_times),
+                snapshot_path)
+            self.assertFalse(os.path.exists(snapshot_path))
+            restored_dir = os.path.join(temp_dir, 'restored')
+            restored_snapshot = utilities.restore_cached_results(
+                cache_dir, fingerprint, restored_dir)
+            new_instance = model.load_inputs(inputs_dir="test_dat")
+            utilities.load_solution_snapshot(new_instance, restored_snapshot)
+            names = sorted(
+                set(os.listdir(outputs_dir)) - set(['stale.txt', 'other_case']))
+            self.assertEqual(sorted(os.listdir(restored_dir)), names)
+            (match, mismatch, errors) = filecmp.cmpfiles(
+                outputs_dir, restored_dir, names, shallow=False)
+            self.assertEqual(match, names)
+            self.assertEqual(utilities.evict_cached_results(
+                cache_dir, max_size=100, max_age=1), 0)
+            self.assertEqual(utilities.evict_cached_results(
+                cache_dir, max_size=0), 1)
+            self.assertEqual(os.listdir(cache_dir), [])
+        finally:
+            shutil.rmtree(temp_dir)
+        for var in instance.component_objects(Var):
+            new_var = getattr(new_instance, var.name)
+            for key in var:
+                self.assertEqual(new_var[key].value, var[key].value)
+
+    def test_solver_profiles(self):
+        import argparse
+        parser = argparse.ArgumentParser()
+        utilities.add_solver_arguments(parser)
+        temp_dir = tempfile.mkdtemp(prefix='switch_test_')
+        try:
+            path = os.path.join(temp_dir, 'solver_profiles.ini')
+            with open(path, 'w') as f:
+                f.write('[default]\nsolver = glpk\nmip_gap = 0.01\n\n'
+                        '[cluster]\nsolver = cbc\nthreads = 32\n'
+                        'time_limit = 3600\noptions = cuts=off\n')
+            settings = utilities.solver_settings(parser.parse_args(
+                ['--solver-profiles', path]))
+            self.assertEqual(settings, {'solver': 'glpk', 'mip_gap': 0.01})
+            settings = utilities.solver_settings(parser.parse_args(
+                ['--solver-profiles', path, '--solver-profile', 'cluster',
+                 '--threads', '8', '--solver-tmp-dir', temp_dir]))
+            self.assertEqual(settings, {
+                'solver': 'cbc', 'threads': 8, 'time_limit': 3600.0,
+                'options': 'cuts=off', 'tmp_dir': temp_dir})
+            opt = utilities.make_solver(settings)
+            self.assertEqual(dict(opt.options), {
+                'threads': 8, 'sec': 3600.0, 'cuts': 'off'})
+            with self.assertRaises(utilities.InputError):
+                utilities.solver_settings(parser.parse_args(
+                    ['--solver-profiles', path, '--solver-profile', 'none']))
+        finally:
+            import pyutilib.services
+            pyutilib.services.TempfileManager.tempdir = None
+            shutil.rmtree(temp_dir)
+
+    def test_register_duals(self):
+        import switch_mod.solve
+        (model, instance) = switch_mod.solve.load("test_dat")
+        utilities.register_duals(instance, 'Energy_Balance')
+        self.assertEqual(instance.dual_constraints, ['Energy_Balance'])
+        self.assertEqual(model.dual_constraints, [])
+        for con in (instance.Energy_Balance, instance.Max_Build_Potential):
+            for key in con:
+                instance.dual[con[key]] = 1.0
+        utilities._drop_unregistered_duals(instance)
+        self.assertEqual(
+            set(con.parent_component().name for con in instance.dual),
+            set(['Energy_Balance']))
+        self.assertEqual(len(instance.dual), len(instance.Energy_Balance))
+
+    def test_load_var_values(self):
+        import switch_mod.solve
+        from pyomo.environ import Var
+        (model, instance) = switch_mod.solve.load("test_dat")
+        variables = list(instance.component_objects(Var))
+        expected = {}
+        for var in variables:
+            for (i, key) in enumerate(var):
+                var[key].value = i + 0.5
+                expected[var.name, key] = i + 0.5
+        temp_dir = tempfile.mkdtemp(prefix='switch_test_')
+        try:
+            utilities._save_generic_results(instance, temp_dir)
+            for var in variables:
+                for key in var:
+                    var[key].value = None
+            num_loaded = utilities.load_var_values(instance, temp_dir)
+        finally:
+            shutil.rmtree(temp_dir)
+        self.assertEqual(num_loaded, len(expected))
+        for var in variables:
+            for key in var:
+                self.assertEqual(
+                    var[key].value, expected[var.name, key])
+
+    def test_solution_snapshot(self):
+        import switch_mod.solve
+        from pyomo.environ import Suffix, Var
+        (model, instance) = switch_mod.solve.load("test_dat")
+        for var in instance.component_objects(Var):
+            for (i, key) in enumerate(var):
+                # Leave every other variable without a value.
+                var[key].value = i + 0.5 if i % 2 else None
+        instance.dual = Suffix(direction=Suffix.IMPORT)
+        con = instance.Energy_Balance
+        for (i, key) in enumerate(con):
+            instance.dual[con[key]] = i * 2.0
+        temp_dir = tempfile.mkdtemp(prefix='switch_test_')
+        try:
+            path = os.path.join(temp_dir, 'solution_snapshot.pkl.gz')
+            utilities.save_solution_snapshot(instance, path)
+            new_instance = model.load_inputs(inputs_dir="test_dat")
+            utilities.load_solution_snapshot(new_instance, path)
+        finally:
+            shutil.rmtree(temp_dir)
+        for var in instance.component_objects(Var):
+            new_var = getattr(new_instance, var.name)
+            for key in var:
+                self.assertEqual(new_var[key].value, var[key].value)
+        for key in con:
+            self.assertEqual(
+                new_instance.dual[new_instance.Energy_Balance[key]],
+                instance.dual[con[key]])
+
 
 if __name__ == '__main__':
     unittest.main()